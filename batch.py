@@ -0,0 +1,208 @@
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+
+import numpy as np
+import pandas as pd
+
+from indicators import Indicators
+from strategy import ema_crossover_strategy, simulate_ema_strategy_trades
+from veri_onisleme import load_processed
+
+# Çoklu sembol toplu backtest
+# Tüm sembollerin OHLC verisi tek bir bitişik panelde (paylaşımlı bellek) tutulur; işçi süreçler
+# paneli isimle bağlar ve büyük DataFrame'ler hiçbir zaman pickle edilmez.
+
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'TickVolume']
+
+
+class OHLCPanel:
+    """
+    Sembol x alan x bar boyutlarında float64 fiyat paneli ve sembol x bar boyutlarında int64 zaman damgaları.
+    Kısa seriler NaN / NaT ile doldurulur; her sembolün gerçek uzunluğu lengths içinde tutulur.
+    """
+
+    def __init__(self, symbols, lengths, values_shm, dates_shm, owner=False):
+        self.symbols = list(symbols)
+        self.lengths = list(lengths)
+        self.owner = owner
+        self._values_shm = values_shm
+        self._dates_shm = dates_shm
+        shape = (len(self.symbols), len(PANEL_FIELDS), max(self.lengths, default=0))
+        self.values = np.ndarray(shape, dtype=np.float64, buffer=values_shm.buf)
+        self.dates = np.ndarray((shape[0], shape[2]), dtype=np.int64, buffer=dates_shm.buf)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        :param frames: {sembol: OHLC DataFrame} sözlüğü (Date, Open, High, Low, Close, TickVolume)
+        :return: Paylaşımlı bellekte oluşturulmuş panel (sahibi bu süreç)
+        """
+        symbols = list(frames)
+        lengths = [len(frames[s]) for s in symbols]
+        n_bars = max(lengths, default=0)
+        segments = []
+        try:
+            segments.append(shared_memory.SharedMemory(create=True,
+                                                       size=max(1, len(symbols) * len(PANEL_FIELDS) * n_bars * 8)))
+            segments.append(shared_memory.SharedMemory(create=True, size=max(1, len(symbols) * n_bars * 8)))
+            panel = cls(symbols, lengths, *segments, owner=True)
+            panel.values[:] = np.nan
+            panel.dates[:] = np.iinfo(np.int64).min  # NaT
+            for i, symbol in enumerate(symbols):
+                df = frames[symbol]
+                n = lengths[i]
+                for j, field in enumerate(PANEL_FIELDS):
+                    if field in df.columns:
+                        panel.values[i, j, :n] = df[field].to_numpy(dtype=np.float64)
+                panel.dates[i, :n] = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        except BaseException:
+            # Oluşturulan segmentler silinmezse /dev/shm'de yeniden başlatmaya kadar kalır
+            panel = None
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+            raise
+        return panel
+
+    @classmethod
+    def attach(cls, spec):
+        """
+        Başka bir süreçte oluşturulmuş panele kopyalamadan bağlanır.
+        :param spec: spec() ile üretilen küçük tanım
+        """
+        symbols, lengths, values_name, dates_name = spec
+        return cls(symbols, lengths,
+                   shared_memory.SharedMemory(name=values_name),
+                   shared_memory.SharedMemory(name=dates_name))
+
+    def spec(self):
+        """
+        İşçi süreçlere gönderilecek (pickle edilebilir) panel tanımı.
+        """
+        return self.symbols, self.lengths, self._values_shm.name, self._dates_shm.name
+
+    def frame(self, i):
+        """
+        i. sembolün verisini DataFrame olarak döndürür.
+        """
+        n = self.lengths[i]
+        data = {'Date': pd.to_datetime(self.dates[i, :n].view('datetime64[ns]'))}
+        for j, field in enumerate(PANEL_FIELDS):
+            data[field] = self.values[i, j, :n]
+        return pd.DataFrame(data)
+
+    def close(self):
+        # numpy görünümleri bırakılmadan paylaşımlı bellek kapatılamaz
+        self.values = None
+        self.dates = None
+        self._values_shm.close()
+        self._dates_shm.close()
+        if self.owner:
+            self._values_shm.unlink()
+            self._dates_shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_worker_panel = None
+
+
+def _init_worker(spec):
+    global _worker_panel
+    _worker_panel = OHLCPanel.attach(spec)
+    # İşçi çıkarken paneli kapat; havuz işçilerinde atexit çalışmaz, multiprocessing sonlandırıcıları çalışır
+    util.Finalize(None, _worker_panel.close, exitpriority=10)
+
+
+def _summarize_symbol(panel, i, ema_window, stop_buffer, risk_reward, use_high_low):
+    df = panel.frame(i)
+    df_with_ind = Indicators(df).get_all_indicators()
+    if f'EMA_{ema_window}' not in df_with_ind.columns:
+        df_with_ind[f'EMA_{ema_window}'] = df_with_ind['Close'].ewm(span=ema_window, adjust=False).mean()
+    result = ema_crossover_strategy(df_with_ind, ema_window=ema_window, stop_buffer=stop_buffer, risk_reward=risk_reward)
+    simulated = simulate_ema_strategy_trades(result, use_high_low=use_high_low)
+
+    wins = int((simulated['result'] == 'TP').sum())
+    losses = int((simulated['result'] == 'SL').sum())
+    trades = wins + losses
+    return {
+        'symbol': panel.symbols[i],
+        'bars': len(df),
+        'start': df['Date'].iloc[0] if len(df) else pd.NaT,
+        'end': df['Date'].iloc[-1] if len(df) else pd.NaT,
+        'signals': int(simulated['signal'].notna().sum()),
+        'trades': trades,
+        'win_rate': wins / trades if trades else np.nan,
+        'total_r': risk_reward * wins - losses,
+        'avg_bars_to_exit': float(simulated['bars_to_exit'].mean()) if trades else np.nan,
+        'last_close': float(df['Close'].iloc[-1]) if len(df) else np.nan,
+        'last_rsi': float(df_with_ind['RSI_14'].iloc[-1]) if len(df) else np.nan,
+        'last_atr': float(df_with_ind['ATR_14'].iloc[-1]) if len(df) else np.nan,
+    }
+
+
+def _run_symbol(args):
+    return _summarize_symbol(_worker_panel, *args)
+
+
+def run_batch(frames, ema_window=20, stop_buffer=0.001, risk_reward=2, n_jobs=None, use_high_low=False):
+    """
+    Her sembol için indikatörleri, EMA stratejisini ve işlem simülasyonunu çalıştırır.
+    :param frames: {sembol: OHLC DataFrame} sözlüğü
+    :param n_jobs: İşçi süreç sayısı (None: tüm çekirdekler, 1: aynı süreçte çalıştır)
+    :return: Sembol başına özet tablo
+    """
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(1, len(frames)))
+    with OHLCPanel.from_frames(frames) as panel:
+        tasks = [(i, ema_window, stop_buffer, risk_reward, use_high_low) for i in range(len(panel.symbols))]
+        if n_jobs == 1:
+            rows = [_summarize_symbol(panel, *task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(panel.spec(),)) as pool:
+                rows = list(pool.map(_run_symbol, tasks))
+    return pd.DataFrame(rows)
+
+
+def load_symbols(paths):
+    """
+    İşlenmiş dosyaları veri deposundan okur (bkz. veri_onisleme.load_processed).
+    Sembol adı dosya adının ilk '_' öncesi kısmıdır (ör: EURUSD_Daily_Processed.xlsx -> EURUSD). Aynı sembol birden çok kez gelirse dosya adının tamamı kullanılır.
+    :param paths: Dosya yolları
+    :return: {sembol: DataFrame}
+    """
+    frames = {}
+    for path in paths:
+        name = os.path.basename(path).rsplit('.', 1)[0]
+        symbol = name.split('_')[0]
+        if symbol in frames:
+            symbol = name
+        frames[symbol] = load_processed(path)
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Çoklu sembol toplu backtest")
+    parser.add_argument('files', nargs='*', help="İşlenmiş veri dosyaları (varsayılan: *_Processed.xlsx)")
+    parser.add_argument('--ema-window', type=int, default=20)
+    parser.add_argument('--stop-buffer', type=float, default=0.001)
+    parser.add_argument('--risk-reward', type=float, default=2)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--high-low', action='store_true', help="TP/SL temaslarını High/Low ile kontrol et")
+    parser.add_argument('--out', default=None, help="Özet tablonun yazılacağı CSV dosyası")
+    args = parser.parse_args()
+
+    frames = load_symbols(args.files or sorted(glob.glob("*_Processed.xlsx")))
+    summary = run_batch(frames, ema_window=args.ema_window, stop_buffer=args.stop_buffer,
+                        risk_reward=args.risk_reward, n_jobs=args.jobs, use_high_low=args.high_low)
+    print(summary.to_string(index=False))
+    if args.out:
+        summary.to_csv(args.out, index=False)
+        print(f"Özet {args.out} olarak kaydedildi.")
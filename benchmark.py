@@ -0,0 +1,491 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Performans ölçümleri
+# Kullanım: python benchmark.py kernels --bars 1000000
+#           python benchmark.py imports
+#           python benchmark.py structures --bars 50000
+#           python benchmark.py extremes --bars 1000000
+#           python benchmark.py scales --bars 1000000
+#           python benchmark.py features --bars 1000000
+
+
+def _best_time(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def synthetic_ohlc(bars, seed=0):
+    """
+    Rastgele yürüyüşten sentetik OHLC verisi üretir.
+    """
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-4, bars))
+    spread = np.abs(rng.normal(0, 1e-4, (2, bars)))
+    return pd.DataFrame({
+        'Date': pd.date_range('2000-01-01', periods=bars, freq='min'),
+        'Open': np.concatenate(([close[0]], close[:-1])),
+        'High': close + spread[0],
+        'Low': close - spread[1],
+        'Close': close,
+        'TickVolume': rng.integers(1, 100, bars),
+    })
+
+
+def bench_kernels(bars=1_000_000, repeat=3):
+    """
+    Indicators'ın pandas yolu ile NumPy çekirdeklerini (float64 ve float32) karşılaştırır.
+    Her ölçümde önceden oluşturulmuş yeni bir Indicators örneği kullanılır; böylece ara sonuç
+    önbelleği devre dışı kalır ve veri kopyalama süresi ölçüme girmez.
+    """
+    from indicators import Indicators
+
+    df = synthetic_ohlc(bars)
+    cases = {
+        'RSI_14': lambda ind: ind.calculate_rsi(14),
+        'ATR_14': lambda ind: ind.calculate_atr(14),
+        'MACD': lambda ind: ind.calculate_macd(),
+        'SMA_20': lambda ind: ind.calculate_sma(20),
+        'EMA_20': lambda ind: ind.calculate_ema(20),
+    }
+    rows = []
+    for name, case in cases.items():
+        timings = {}
+        for label, options in [('pandas', {'engine': 'pandas'}),
+                               ('numpy', {'engine': 'numpy'}),
+                               ('numpy_f32', {'engine': 'numpy', 'float32': True})]:
+            instances = [Indicators(df, **options) for _ in range(repeat)]
+            timings[label] = _best_time(lambda: case(instances.pop()), repeat)
+        reference = case(Indicators(df, engine='pandas'))
+        result = case(Indicators(df, engine='numpy'))
+        rows.append({
+            'indicator': name,
+            'pandas_s': timings['pandas'],
+            'numpy_s': timings['numpy'],
+            'numpy_f32_s': timings['numpy_f32'],
+            'speedup': timings['pandas'] / timings['numpy'],
+            'max_abs_diff': float(np.nanmax(np.abs(np.asarray(result, dtype=float) - np.asarray(reference, dtype=float)))),
+        })
+    table = pd.DataFrame(rows)
+    output_mb = {'float64': bars * 8 / 1e6, 'float32': bars * 4 / 1e6}
+    print(f"{bars} bar, en iyi {repeat} ölçüm")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    print(f"Sütun başına çıktı belleği: float64 {output_mb['float64']:.1f} MB, float32 {output_mb['float32']:.1f} MB")
+    return table
+
+
+# Karşılaştırma için visualize.py'deki yapı başına scatter/annotate/axvspan çizen eski döngülerin kopyaları
+def _legacy_visualize_all_structures_v2(dates, close_prices, trend_data):
+    """
+    Daha net ve anlaşılır bir tepe ve dip noktaları görselleştirme fonksiyonu.
+
+    :param dates: Fiyatların tarih bilgilerinin pandas Series formatında listesi.
+    :param close_prices: Fiyatların pandas Series formatında listesi.
+    :param trend_data: find_all_structures fonksiyonundan dönen yapılandırılmış trend verileri.
+    """
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(16, 8))
+    plt.plot(dates, close_prices, label="Close Prices", color="blue", alpha=0.7)
+
+    # Tepe ve dip noktalarını işaretle
+    for data in trend_data:
+        # Dip noktaları (yeşil)
+        plt.scatter(data["low"]["dates"], data["low"]["current_value"], color="green", s=50,
+                    label="Troughs" if "Troughs" not in plt.gca().get_legend_handles_labels()[1] else "")
+        plt.annotate(f"{data['low']['structure']}",
+                     (data["low"]["dates"], data["low"]["current_value"]),
+                     textcoords="offset points", xytext=(-10, 10), ha='center', fontsize=8, color="green")
+
+        # Tepe noktaları (kırmızı)
+        plt.scatter(data["high"]["dates"], data["high"]["current_value"], color="red", s=50,
+                    label="Peaks" if "Peaks" not in plt.gca().get_legend_handles_labels()[1] else "")
+        plt.annotate(f"{data['high']['structure']}",
+                     (data["high"]["dates"], data["high"]["current_value"]),
+                     textcoords="offset points", xytext=(10, -10), ha='center', fontsize=8, color="red")
+
+    # Grafik düzenlemeleri
+    plt.title("Trend Analysis Visualization", fontsize=16)
+    plt.xlabel("Date", fontsize=12)
+    plt.ylabel("Price", fontsize=12)
+    plt.xticks(rotation=45)  # Tarihlerin daha net görünmesi için eğimli gösterim
+    plt.legend()
+    plt.grid(alpha=0.3)
+    plt.tight_layout()  # Eksik kenar boşluklarını düzenler
+    # plt.show()
+    return plt.gcf()
+
+
+def _legacy_plot_structures(dates, close_prices, structures):
+    """
+    find_structure fonksiyonundan dönen yapıları görselleştirir.
+    HL ve HH noktalarını yeşil, LL ve LH noktalarını kırmızı gösterir.
+    High noktaları yukarı üçgen (^), low noktaları aşağı üçgen (v) ile gösterilir.
+    """
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(15, 7))
+    plt.plot(dates, close_prices, color='gray', alpha=0.5, label='Close Price')
+
+    for structure in structures:
+        # Low noktası
+        low_date = structure['low']['dates']
+        low_value = structure['low']['current_value']
+        low_structure = structure['low']['structure']
+        # High noktası
+        high_date = structure['high']['dates']
+        high_value = structure['high']['current_value']
+        high_structure = structure['high']['structure']
+
+        # Low için renk ve marker
+        if low_structure == "HL":
+            color_low = 'green'
+        elif low_structure == "LL":
+            color_low = 'red'
+        else:
+            color_low = 'gray'
+        plt.scatter(low_date, low_value, color=color_low, s=100, marker='v', label=f'Low: {low_structure}')
+
+        # High için renk ve marker
+        if high_structure == "HH":
+            color_high = 'green'
+        elif high_structure == "LH":
+            color_high = 'red'
+        else:
+            color_high = 'gray'
+        plt.scatter(high_date, high_value, color=color_high, s=100, marker='^', label=f'High: {high_structure}')
+
+    plt.title('Market Structure Analysis')
+    plt.xlabel('Date')
+    plt.ylabel('Price')
+    # Legend tekrarını önle
+    handles, labels = plt.gca().get_legend_handles_labels()
+    by_label = dict(zip(labels, handles))
+    plt.legend(by_label.values(), by_label.keys())
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    # plt.show()
+    return plt.gcf()
+
+
+def _legacy_plot_trend_by_extremes(dates, close_prices, trend_data):
+    """
+    find_trend_by_extremes fonksiyonundan dönen trend_data listesini fiyat grafiği üzerinde
+    trend tipine göre (Bullish, Bearish, Acumulation) renklendirerek gösterir.
+    """
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(15, 7))
+    plt.plot(dates, close_prices, color='gray', alpha=0.5, label='Close Price')
+
+    color_map = {
+        "Bullish": 'green',
+        "Bearish": 'red',
+        "Acumulation": 'blue'
+    }
+
+    for i, struct in enumerate(trend_data):
+        if i == 0:
+            continue  # İlk elemana trend atanamaz
+        trend = struct.get("trend_by_extremes", "Acumulation")
+        low_date = struct["low"]["dates"]
+        high_date = struct["high"]["dates"]
+        low_value = struct["low"]["current_value"]
+        high_value = struct["high"]["current_value"]
+
+        # Trend rengine göre noktaları çiz
+        plt.scatter(low_date, low_value, color=color_map[trend], marker='v', s=100, label=f"{trend} Low" if i == 1 else "")
+        plt.scatter(high_date, high_value, color=color_map[trend], marker='^', s=100, label=f"{trend} High" if i == 1 else "")
+
+        # İki yapı arası arka planı renklendir (isteğe bağlı)
+        if i > 0:
+            prev_date = trend_data[i-1]["high"]["dates"]
+            plt.axvspan(prev_date, high_date, color=color_map[trend], alpha=0.08)
+
+    # Legend tekrarını önle
+    handles, labels = plt.gca().get_legend_handles_labels()
+    by_label = dict(zip(labels, handles))
+    plt.legend(by_label.values(), by_label.keys())
+    plt.title('Trend by Extremes')
+    plt.xlabel('Date')
+    plt.ylabel('Price')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    # plt.show()
+    return plt.gcf()
+
+
+def bench_structures(bars=50_000, distance=5, repeat=1):
+    """
+    visualize.py'deki toplu (batched) yapı çizimlerini eski yapı başına çizim döngüleriyle karşılaştırır.
+    Süreler PNG'ye kaydetmeyi de içerir (Agg).
+    """
+    import io
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import visualize
+    from structers import find_all_structures, find_trend_by_extremes, structures_to_records
+
+    df = synthetic_ohlc(bars)
+    dates, close = df['Date'], df['Close']
+    trend_data = find_trend_by_extremes(find_all_structures(close, distance, dates))
+    # Eski döngüler sözlük listesiyle çalışır
+    records = structures_to_records(trend_data)
+
+    def render(plot, *args):
+        fig = plot(*args)
+        fig.savefig(io.BytesIO(), format='png')
+        artists = len(fig.axes[0].get_children())
+        plt.close(fig)
+        return artists
+
+    cases = [
+        ('visualize_all_structures_v2', _legacy_visualize_all_structures_v2, visualize.visualize_all_structures_v2),
+        ('plot_structures', _legacy_plot_structures, visualize.plot_structures),
+        ('plot_trend_by_extremes', _legacy_plot_trend_by_extremes, visualize.plot_trend_by_extremes),
+    ]
+    rows = []
+    for name, legacy, batched in cases:
+        artists = {}
+        timings = {}
+        for label, plot, data in [('legacy', legacy, records), ('batched', batched, trend_data)]:
+            timings[label] = _best_time(lambda: artists.__setitem__(label, render(plot, dates, close, data)), repeat)
+        rows.append({'plot': name, 'legacy_s': timings['legacy'], 'batched_s': timings['batched'],
+                     'speedup': timings['legacy'] / timings['batched'],
+                     'legacy_artists': artists['legacy'], 'batched_artists': artists['batched']})
+    table = pd.DataFrame(rows)
+    print(f"{bars} bar, {len(trend_data)} yapı, en iyi {repeat} ölçüm")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+    return table
+
+
+# Karşılaştırma için structers.py'deki olay sözlükleriyle çalışan eski alternation filtresinin ve yapı döngülerinin kopyaları
+def _legacy_find_all_structures(close_prices, distance, dates):
+    from structers import find_local_extremes, find_current_structure
+    peaks, troughs, p_vals, t_vals, p_dates, t_dates = find_local_extremes(close_prices, distance, dates)
+    events = []
+    for idx, val, dt in zip(peaks, p_vals, p_dates):
+        events.append({'type': 'peak', 'index': idx, 'value': val, 'date': dt})
+    for idx, val, dt in zip(troughs, t_vals, t_dates):
+        events.append({'type': 'trough', 'index': idx, 'value': val, 'date': dt})
+    events.sort(key=lambda x: x['index'])
+    filtered = []
+    for ev in events:
+        if not filtered or ev['type'] != filtered[-1]['type']:
+            filtered.append(ev)
+        elif ev['type'] == 'peak' and ev['value'] > filtered[-1]['value']:
+            filtered[-1] = ev
+        elif ev['type'] == 'trough' and ev['value'] < filtered[-1]['value']:
+            filtered[-1] = ev
+    peak_values = [ev['value'] for ev in filtered if ev['type'] == 'peak']
+    peak_dates = [ev['date'] for ev in filtered if ev['type'] == 'peak']
+    trough_values = [ev['value'] for ev in filtered if ev['type'] == 'trough']
+    trough_dates = [ev['date'] for ev in filtered if ev['type'] == 'trough']
+
+    trend_data = []
+    for i in range(1, min(len(trough_values), len(peak_values))):
+        trend_data.append({
+            "low": {"dates": trough_dates[i],
+                    "structure": find_current_structure(trough_values[i], trough_values[i - 1], 'low'),
+                    "current_value": trough_values[i], "previous_value": trough_values[i - 1]},
+            "high": {"dates": peak_dates[i],
+                     "structure": find_current_structure(peak_values[i], peak_values[i - 1], 'high'),
+                     "current_value": peak_values[i], "previous_value": peak_values[i - 1]},
+        })
+    for i in range(1, len(trend_data)):
+        prev, curr = trend_data[i - 1], trend_data[i]
+        low_now, low_prev = curr["low"]["current_value"], prev["low"]["current_value"]
+        high_now, high_prev = curr["high"]["current_value"], prev["high"]["current_value"]
+        if low_now < low_prev and high_now < high_prev:
+            curr["trend_by_extremes"] = "Bearish"
+        elif low_now > low_prev and high_now > high_prev:
+            curr["trend_by_extremes"] = "Bullish"
+        else:
+            curr["trend_by_extremes"] = "Acumulation"
+    if trend_data:
+        trend_data[0]["trend_by_extremes"] = None
+    return trend_data
+
+
+def bench_extremes(bars=1_000_000, distance=5, repeat=3):
+    """
+    Olay sözlükleriyle çalışan eski alternation filtresi + yapı döngüleri ile dizi tabanlı
+    (alternating_extremes, find_all_structures, find_trend_by_extremes) hattı karşılaştırır ve sonuçların
+    aynı olduğunu doğrular.
+    """
+    from structers import find_all_structures, find_trend_by_extremes, structures_to_records
+
+    df = synthetic_ohlc(bars)
+    dates, close = df['Date'], df['Close']
+    results = {}
+    pipelines = {
+        'legacy': lambda: _legacy_find_all_structures(close, distance, dates),
+        'arrays': lambda: find_trend_by_extremes(find_all_structures(close, distance, dates)),
+    }
+    timings = {label: _best_time(lambda: results.__setitem__(label, run()), repeat)
+               for label, run in pipelines.items()}
+    table = pd.DataFrame([{'structures': len(results['arrays']), 'legacy_s': timings['legacy'],
+                           'arrays_s': timings['arrays'], 'speedup': timings['legacy'] / timings['arrays'],
+                           'identical': structures_to_records(results['arrays']) == results['legacy']}])
+    print(f"{bars} bar, distance={distance}, en iyi {repeat} ölçüm")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+    return table
+
+
+def bench_scales(bars=1_000_000, repeat=1):
+    """
+    Ölçek başına ayrı find_all_structures çağrıları ile tek seferde kurulan çok ölçekli indeksi
+    (kesinleşme barları dahil) ve indeksten ölçek değiştirme süresini karşılaştırır.
+    """
+    from structers import find_all_structures, find_trend_by_extremes, structures_to_records
+    from multiscale import build_scale_index, DEFAULT_DISTANCES
+
+    df = synthetic_ohlc(bars)
+    dates, close = df['Date'], df['Close']
+    build_scale_index(close[:1000])  # scipy importu ölçüme girmesin
+    results = {}
+    per_scale = _best_time(lambda: results.__setitem__('per_scale', {
+        d: find_trend_by_extremes(find_all_structures(close, d, dates)) for d in DEFAULT_DISTANCES}), repeat)
+    index_s = _best_time(lambda: results.__setitem__('index', build_scale_index(close)), repeat)
+    scales = results['index']
+    rows = []
+    for distance in DEFAULT_DISTANCES:
+        switch_s = _best_time(lambda: results.__setitem__('table', scales.structures(close, dates, distance)), repeat)
+        rows.append({'distance': distance, 'structures': len(results['table']), 'switch_s': switch_s,
+                     'identical': structures_to_records(results['table']) == structures_to_records(results['per_scale'][distance])})
+    table = pd.DataFrame(rows)
+    print(f"{bars} bar, ölçek başına ayrı: {per_scale:.3g} s, çok ölçekli indeks: {index_s:.3g} s "
+          f"({(scales.index.nbytes + scales.kind.nbytes + scales.confirmed.nbytes) / 1e6:.1f} MB)")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+    return table
+
+
+def _full_frame_features(df, factory):
+    # FeatureFactory'nin fiyat özelliklerinin tüm seri boyunca pandas sütunlarıyla hesaplanması (karşılaştırma için)
+    close, columns = df['Close'], {}
+    for lag in factory.lags:
+        columns[f'ret_{lag}'] = close.pct_change(lag)
+    log_returns = np.log(close).diff()
+    for w in factory.windows:
+        columns[f'vol_{w}'] = log_returns.rolling(w).std()
+    prev_close = close.shift(1)
+    true_range = pd.concat([df['High'] - df['Low'], (df['High'] - prev_close).abs(),
+                            (df['Low'] - prev_close).abs()], axis=1).max(axis=1)
+    atr = true_range.rolling(factory.atr_window).mean()
+    columns['ema_dist_atr'] = (close - df[f'EMA_{factory.ema_window}']) / atr
+    for w in factory.windows:
+        columns[f'high_dist_{w}_atr'] = (df['High'].rolling(w).max() - close) / atr
+        columns[f'low_dist_{w}_atr'] = (close - df['Low'].rolling(w).min()) / atr
+    return pd.DataFrame(columns)
+
+
+def bench_features(bars=1_000_000, repeat=1):
+    """
+    FeatureFactory'nin yalnızca sinyal barlarında ürettiği fiyat özelliklerini, aynı özelliklerin tüm seri
+    boyunca pandas sütunlarıyla hesaplanıp sinyal satırlarının seçilmesiyle karşılaştırır; tam özellik
+    matrisinin (yapı ve destek/direnç dahil) süresini de ölçer.
+    """
+    from features import FeatureFactory
+    from strategy import crossover_signals
+
+    df = synthetic_ohlc(bars)
+    df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
+    signal, _, _ = crossover_signals(df['Close'], df['EMA_20'])
+    rows = np.flatnonzero(signal)
+    price_only = FeatureFactory(structure_distances=(), sr_order=None, base_columns=())
+    full = FeatureFactory(base_columns=())
+    FeatureFactory(base_columns=()).build(df.iloc[:1000], rows[rows < 1000])  # scipy importu ölçüme girmesin
+    results = {}
+    frame_s = _best_time(lambda: results.__setitem__('frame', _full_frame_features(df, price_only).iloc[rows]), repeat)
+    rows_s = _best_time(lambda: results.__setitem__('rows', price_only.build(df, rows)), repeat)
+    full_s = _best_time(lambda: results.__setitem__('full', full.build(df, rows)), repeat)
+    identical = np.allclose(results['rows'], results['frame'].to_numpy(), rtol=1e-4, atol=1e-6, equal_nan=True)
+    print(f"{bars} bar, {len(rows)} sinyal")
+    print(f"fiyat özellikleri, tüm seri (pandas): {frame_s:.3g} s, sinyal barlarında: {rows_s:.3g} s, aynı: {identical}")
+    print(f"tam matris {results['full'].shape}: {full_s:.3g} s, {results['full'].nbytes / 1e6:.1f} MB")
+    return {'frame_s': frame_s, 'rows_s': rows_s, 'full_s': full_s, 'identical': identical}
+
+
+LIBRARY_MODULES = ['veri_onisleme', 'resample', 'kernels', 'indicators', 'strategy', 'structers',
+                   'stream', 'multiscale', 'features', 'visualize', 'candlestick', 'destek_direnc', 'ml',
+                   'model_store', 'tuning', 'sweep', 'batch']
+HEAVY_MODULES = ['matplotlib.pyplot', 'scipy.signal', 'sklearn', 'seaborn']
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def bench_imports(modules=None, repeat=3):
+    """
+    Her modülün soğuk import süresini ayrı bir Python sürecinde ölçer ve import sırasında
+    yüklenen ağır bağımlılıkları listeler. Import yan etkisiz olmalı: dosya okumamalı, grafik çizmemeli.
+    """
+    rows = []
+    for module in modules or LIBRARY_MODULES:
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+        best, loaded = float('inf'), []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                  env={**os.environ, 'MPLBACKEND': 'Agg'})
+            if proc.returncode != 0:
+                raise RuntimeError(f"{module} import edilemedi:\n{proc.stderr}")
+            probe = json.loads(proc.stdout.strip().splitlines()[-1])
+            best, loaded = min(best, probe['seconds']), probe['loaded']
+        rows.append({'module': module, 'import_s': best, 'heavy_loaded': ', '.join(loaded) or '-'})
+    table = pd.DataFrame(rows)
+    print(f"Soğuk import süreleri (en iyi {repeat} ölçüm)")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performans ölçümleri")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('kernels', help="İndikatör çekirdekleri: pandas ve NumPy karşılaştırması")
+    p.add_argument('--bars', type=int, default=1_000_000)
+    p.add_argument('--repeat', type=int, default=3)
+    p = sub.add_parser('imports', help="Modüllerin soğuk import süreleri")
+    p.add_argument('modules', nargs='*', help="Ölçülecek modüller (varsayılan: tüm kütüphane modülleri)")
+    p.add_argument('--repeat', type=int, default=3)
+    p = sub.add_parser('structures', help="Yapı çizimleri: eski döngü ve toplu çizim karşılaştırması")
+    p.add_argument('--bars', type=int, default=50_000)
+    p.add_argument('--distance', type=int, default=5)
+    p.add_argument('--repeat', type=int, default=1)
+    p = sub.add_parser('extremes', help="Tepe/dip alternation filtresi ve yapılar: eski döngü ve dizi karşılaştırması")
+    p.add_argument('--bars', type=int, default=1_000_000)
+    p.add_argument('--distance', type=int, default=5)
+    p.add_argument('--repeat', type=int, default=3)
+    p = sub.add_parser('scales', help="Çok ölçekli yapı indeksi: ölçek başına ayrı hesapla karşılaştırma")
+    p.add_argument('--bars', type=int, default=1_000_000)
+    p.add_argument('--repeat', type=int, default=1)
+    p = sub.add_parser('features', help="Sinyal barlarında özellik matrisi: tüm seri sütunlarıyla karşılaştırma")
+    p.add_argument('--bars', type=int, default=1_000_000)
+    p.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == 'kernels':
+        bench_kernels(args.bars, args.repeat)
+    elif args.command == 'imports':
+        bench_imports(args.modules, args.repeat)
+    elif args.command == 'structures':
+        bench_structures(args.bars, args.distance, args.repeat)
+    elif args.command == 'extremes':
+        bench_extremes(args.bars, args.distance, args.repeat)
+    elif args.command == 'scales':
+        bench_scales(args.bars, args.repeat)
+    elif args.command == 'features':
+        bench_features(args.bars, args.repeat)
@@ -0,0 +1,137 @@
+import hashlib
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Bellek bütçeli LRU sonuç önbelleği
+# Arayüzde (ui.py) ayrıştırılmış veri, indikatörler, yapılar, simülasyon ve model gibi ara sonuçlar
+# veri içeriğinin özeti + parametrelerden oluşan anahtarlarla saklanır; bütçe aşılınca en eski kullanılan silinir.
+# Önbellek iş parçacığı güvenlidir: arka planda ön-hesaplanan (prefetch) bir anahtar istenirse
+# ikinci kez hesaplanmaz, mevcut hesaplamanın bitmesi beklenir.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(data):
+    """
+    Verinin (bytes) sha1 özeti; aynı içerikli yüklemeler aynı anahtarı üretir.
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+def estimate_nbytes(value, _seen=None):
+    """
+    Bir sonucun bellekteki yaklaşık boyutu (byte).
+    DataFrame/Series ve ndarray için gerçek boyut, kaplar ve sıradan nesneler (__dict__) için elemanların
+    toplamı, diğerleri (ör. derlenmiş model ağaçları) için pickle boyutu kullanılır. Paylaşılan nesneler bir kez sayılır.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen)
+                                          for k, v in value.items())
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_nbytes(vars(value), _seen)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Toplam boyutu max_bytes ile sınırlı, iş parçacığı güvenli LRU önbellek.
+    Saklanan sonuçlar paylaşılır; çağıranlar bunları değiştirmemeli (gerekirse kopyalamalı).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}  # hesaplanmakta olan anahtar -> threading.Event
+        self._lock = threading.RLock()
+
+    def get_or_compute(self, key, compute):
+        """
+        :param key: Hashlenebilir anahtar (ör: ('indicators', veri_özeti, zaman_dilimi))
+        :param compute: Önbellekte yoksa çağrılacak argümansız fonksiyon
+        :return: Önbellekteki ya da yeni hesaplanan sonuç
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                done = self._pending.get(key)
+                if done is None:
+                    done = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Başka bir iş parçacığı hesaplıyor: bitmesini bekle ve tekrar bak
+            # (sonuç bütçeye sığmadıysa ya da hata oluştuysa bu kez burada hesaplanır)
+            done.wait()
+        try:
+            value = compute()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            done.set()
+
+    def prefetch(self, executor, key, compute):
+        """
+        Anahtar önbellekte ya da hesaplanmakta değilse arka planda hesaplatır.
+        :param executor: concurrent.futures yürütücüsü (ör: ThreadPoolExecutor)
+        :return: Future ya da gönderim yapılmadıysa None
+        """
+        with self._lock:
+            if key in self._entries or key in self._pending:
+                return None
+        return executor.submit(self.get_or_compute, key, compute)
+
+    def put(self, key, value):
+        size = estimate_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            # Bütçeden büyük sonuçlar saklanmaz, yalnızca döndürülür
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
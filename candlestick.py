@@ -1,31 +1,67 @@
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.dates as mdates
-from matplotlib.patches import Rectangle
+from matplotlib.collections import LineCollection, PolyCollection
+import numpy as np
 import pandas as pd
 
-def plot_candlestick(df, date_col='Date', open_col='Open', high_col='High', low_col='Low', close_col='Close'):
+from lod import axes_pixels
+
+
+def decimate_ohlc(dates, o, h, l, c, max_bars):
+    """
+    Bar sayısı max_bars'ı aşarsa ardışık barları eşit büyüklükte kovalara toplar
+    (açılış ilk, en yüksek max, en düşük min, kapanış son, tarih kovanın ilk barı).
+    :param dates: date2num ile sayıya çevrilmiş tarihler
+    :return: (dates, o, h, l, c) -> en fazla max_bars uzunluğunda diziler
+    """
+    n = len(dates)
+    if not max_bars or n <= max_bars:
+        return dates, o, h, l, c
+    step = int(np.ceil(n / max_bars))
+    starts = np.arange(0, n, step)
+    ends = np.minimum(starts + step, n) - 1
+    return (dates[starts], o[starts],
+            np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts), c[ends])
+
+
+def plot_candlestick(df, date_col='Date', open_col='Open', high_col='High', low_col='Low', close_col='Close',
+                     max_bars='auto'):
     """
     Klasik mum grafiği (candlestick) çizer. Yükselen mumlar yeşil, düşenler kırmızı olur.
+    Tüm gövdeler tek bir PolyCollection, tüm iğneler tek bir LineCollection olarak çizilir.
     :param df: OHLC içeren DataFrame
+    :param max_bars: Bu sayıdan fazla bar varsa ardışık barlar OHLC kovalarına toplanır; 'auto' ise eksenin
+                     piksel genişliği kullanılır (piksel başına en fazla bir mum), None ise indirgeme yapılmaz
     :return: fig
     """
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-    fig, ax = plt.subplots(figsize=(15, 7))
-    width = 0.6  # mum gövdesi genişliği
-    width2 = 0.1 # iğne genişliği
-    for idx, row in df.iterrows():
-        o = row[open_col]
-        h = row[high_col]
-        l = row[low_col]
-        c = row[close_col]
-        date = row[date_col]
-        color = 'green' if c >= o else 'red'
-        # Mum gövdesi
-        ax.add_patch(Rectangle((mdates.date2num(date) - width/2, min(o, c)),
-                               width, abs(c - o), color=color, alpha=0.8))
-        # İğneler
-        ax.plot([mdates.date2num(date), mdates.date2num(date)], [l, h], color=color, linewidth=1.5)
+    dates = mdates.date2num(pd.to_datetime(df[date_col]).to_numpy())
+    o = df[open_col].to_numpy(dtype=np.float64)
+    h = df[high_col].to_numpy(dtype=np.float64)
+    l = df[low_col].to_numpy(dtype=np.float64)
+    c = df[close_col].to_numpy(dtype=np.float64)
+
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    # Piksel başına birden fazla mum ayırt edilemez
+    if max_bars == 'auto':
+        max_bars = axes_pixels(ax)
+    dates, o, h, l, c = decimate_ohlc(dates, o, h, l, c, max_bars)
+    # mum gövdesi genişliği barlar arası medyan mesafenin %60'ı (günlük veride 0.6 gün)
+    width = 0.6 * (np.median(np.diff(dates)) if len(dates) > 1 else 1.0)
+    up = c >= o
+    colors = np.where(up, 'green', 'red')
+
+    # Mum gövdeleri: (bar, köşe, xy) boyutlu dikdörtgenler
+    left, right = dates - width / 2, dates + width / 2
+    bottom, top = np.minimum(o, c), np.maximum(o, c)
+    bodies = np.stack([np.column_stack([left, bottom]), np.column_stack([left, top]),
+                       np.column_stack([right, top]), np.column_stack([right, bottom])], axis=1)
+    ax.add_collection(PolyCollection(bodies, facecolors=colors, edgecolors=colors, alpha=0.8))
+    # İğneler: (bar, uç, xy) boyutlu doğru parçaları
+    wicks = np.stack([np.column_stack([dates, l]), np.column_stack([dates, h])], axis=1)
+    ax.add_collection(LineCollection(wicks, colors=colors, linewidths=1.5))
+    ax.autoscale_view()
+
     ax.xaxis_date()
     ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
     fig.autofmt_xdate()
@@ -33,4 +69,4 @@ def plot_candlestick(df, date_col='Date', open_col='Open', high_col='High', low_
     ax.set_xlabel('Tarih')
     ax.set_ylabel('Fiyat')
     ax.grid(alpha=0.3)
-    return fig 
\ No newline at end of file
+    return fig
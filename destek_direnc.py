@@ -1,8 +1,7 @@
+import bisect
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from scipy.signal import argrelextrema
 
 def find_support_resistance_levels(df, price_col='Close', order=10, tolerance=0.002):
     """
@@ -13,6 +12,7 @@ def find_support_resistance_levels(df, price_col='Close', order=10, tolerance=0.
     :param tolerance: Yakın seviyeleri gruplayacak tolerans oranı (ör: 0.002 = %0.2)
     :return: (destekler, dirençler)
     """
+    from scipy.signal import argrelextrema
     prices = df[price_col].values
     # Lokal min ve max bul
     min_idx = argrelextrema(prices, np.less, order=order)[0]
@@ -29,6 +29,151 @@ def find_support_resistance_levels(df, price_col='Close', order=10, tolerance=0.
         return grouped
     return group_levels(supports), group_levels(resistances)
 
+
+# Destek/direnç bölgeleri (zones)
+# Ekstremum fiyatları sıralanır ve ardışık iki fiyat arasındaki boşluk tolerance * fiyat'ı aştığında yeni bölge
+# başlar (O(n log n)). Her bölge fiyat bandını (low, high), ortalama seviyesini, dokunma sayısını ve son dokunma
+# zamanını taşır. Bölgeler fiyata göre sıralı tutulur; en yakın destek/direnç bisect ile bulunur ve yeni
+# ekstremumlar eklendikçe bölgeler yerinde güncellenir (gerekirse komşu bölgelerle birleşir).
+
+SIDES = ('support', 'resistance')
+ZONE_COLUMNS = ['side', 'low', 'high', 'level', 'touches', 'last_touch']
+
+
+def cluster_levels(prices, tolerance=0.002):
+    """
+    Fiyatları boşluk (gap) bölmesiyle kümeler.
+    :param prices: Ekstremum fiyatları
+    :param tolerance: Ardışık (sıralı) iki fiyat arası boşluk tolerance * üst fiyat'tan büyükse yeni küme başlar
+    :return: (order, starts) -> sıralama permütasyonu ve sıralı dizide kümelerin başlangıç konumları
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    order = np.argsort(prices, kind='stable')
+    ordered = prices[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(ordered) > tolerance * ordered[1:]) + 1] if len(prices) else \
+        np.zeros(0, dtype=np.int64)
+    return order, starts
+
+
+class SRLevelIndex:
+    """
+    Taraf (support / resistance) başına fiyata göre sıralı bölgeler.
+    Bölgeler birbirine değmez; bir fiyat bir bölgenin bandına ya da tolerance kadar yakınına düşerse o bölgeye
+    katılır, iki bölgenin arasını kapatırsa ikisini birleştirir. Böylece artımlı ekleme, tüm fiyatların
+    cluster_levels ile yeniden kümelenmesiyle aynı sonucu verir.
+    """
+
+    def __init__(self, tolerance=0.002):
+        self.tolerance = tolerance
+        # Bölge: [low, high, fiyat toplamı, dokunma sayısı, son dokunma]
+        self._zones = {side: [] for side in SIDES}
+        self._lows = {side: [] for side in SIDES}
+
+    def add(self, side, price, time=None):
+        """
+        Yeni bir ekstremum ekler.
+        :param side: 'support' (dip) veya 'resistance' (tepe)
+        :param price: Ekstremum fiyatı
+        :param time: Ekstremumun zamanı (son dokunma için; sıralanabilir olmalı)
+        """
+        zones, lows = self._zones[side], self._lows[side]
+        price = float(price)
+        at = bisect.bisect_right(lows, price)
+        joined = []
+        # Soldaki bölge: fiyat bandın içinde ya da üst ucuna yakın
+        if at > 0 and price - zones[at - 1][1] <= self.tolerance * price:
+            joined.append(at - 1)
+        # Sağdaki bölge: alt ucu fiyata yakın
+        if at < len(zones) and zones[at][0] - price <= self.tolerance * zones[at][0]:
+            joined.append(at)
+        zone = [price, price, price, 1, time]
+        for k in joined:
+            zone = self._merge(zones[k], zone)
+        if joined:
+            del zones[joined[0]:joined[-1] + 1]
+            del lows[joined[0]:joined[-1] + 1]
+            at = joined[0]
+        zones.insert(at, zone)
+        lows.insert(at, zone[0])
+
+    def extend(self, side, prices, times=None):
+        """
+        Birden fazla ekstremum ekler; taraf boşsa tek bir sıralama ile kümelenir.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        times = list(times) if times is not None else [None] * len(prices)
+        if self._zones[side]:
+            for price, time in zip(prices, times):
+                self.add(side, price, time)
+            return
+        order, starts = cluster_levels(prices, self.tolerance)
+        ends = np.r_[starts[1:], len(prices)]
+        ordered = prices[order]
+        for start, end in zip(starts, ends):
+            members = order[start:end]
+            stamps = [times[i] for i in members if times[i] is not None]
+            self._zones[side].append([ordered[start], ordered[end - 1], float(ordered[start:end].sum()),
+                                      int(end - start), max(stamps) if stamps else None])
+            self._lows[side].append(ordered[start])
+
+    @staticmethod
+    def _merge(a, b):
+        stamps = [t for t in (a[4], b[4]) if t is not None]
+        return [min(a[0], b[0]), max(a[1], b[1]), a[2] + b[2], a[3] + b[3], max(stamps) if stamps else None]
+
+    def levels(self, side):
+        """
+        :return: Bölgelerin ortalama seviyeleri (artan sırada)
+        """
+        return [zone[2] / zone[3] for zone in self._zones[side]]
+
+    def nearest_support(self, price):
+        """
+        Fiyatın altındaki (ya da bandı fiyatı içeren) en yakın destek bölgesi; yoksa None.
+        """
+        zones = self._zones['support']
+        at = bisect.bisect_right(self._lows['support'], price)
+        return self._record('support', zones[at - 1]) if at > 0 else None
+
+    def nearest_resistance(self, price):
+        """
+        Fiyatın üstündeki (ya da bandı fiyatı içeren) en yakın direnç bölgesi; yoksa None.
+        """
+        zones = self._zones['resistance']
+        at = bisect.bisect_right(self._lows['resistance'], price)
+        if at > 0 and zones[at - 1][1] >= price:
+            return self._record('resistance', zones[at - 1])
+        return self._record('resistance', zones[at]) if at < len(zones) else None
+
+    @staticmethod
+    def _record(side, zone):
+        low, high, total, touches, last_touch = zone
+        return {'side': side, 'low': low, 'high': high, 'level': total / touches,
+                'touches': touches, 'last_touch': last_touch}
+
+    def zones(self, side=None):
+        """
+        :return: DataFrame (ZONE_COLUMNS), taraf ve fiyata göre sıralı
+        """
+        rows = [self._record(s, zone) for s in ([side] if side else SIDES) for zone in self._zones[s]]
+        return pd.DataFrame(rows, columns=ZONE_COLUMNS)
+
+
+def find_support_resistance_zones(df, price_col='Close', order=10, tolerance=0.002, date_col='Date'):
+    """
+    find_support_resistance_levels'ın bölge karşılığı: aynı ekstremumlar gap bölmesiyle kümelenir.
+    :return: SRLevelIndex (zones() ile tablo, levels() ile seviye listeleri)
+    """
+    from scipy.signal import argrelextrema
+    prices = df[price_col].values
+    dates = df[date_col].tolist() if date_col in df else None
+    index = SRLevelIndex(tolerance)
+    for side, comparator in (('support', np.less), ('resistance', np.greater)):
+        idx = argrelextrema(prices, comparator, order=order)[0]
+        index.extend(side, prices[idx], [dates[i] for i in idx] if dates is not None else None)
+    return index
+
+
 def plot_candlestick_with_sr(df, supports, resistances, date_col='Date', open_col='Open', high_col='High', low_col='Low', close_col='Close'):
     """
     Mum grafiği ile birlikte destek ve direnç seviyelerini çizer.
@@ -36,12 +181,12 @@ def plot_candlestick_with_sr(df, supports, resistances, date_col='Date', open_co
     from candlestick import plot_candlestick
     fig = plot_candlestick(df, date_col, open_col, high_col, low_col, close_col)
     ax = fig.gca()
-    for s in supports:
-        ax.axhline(s, color='blue', linestyle='--', alpha=0.6, label='Destek')
-    for r in resistances:
-        ax.axhline(r, color='orange', linestyle='--', alpha=0.6, label='Direnç')
-    # Tekrarlanan legend'ları önle
-    handles, labels = ax.get_legend_handles_labels()
-    by_label = dict(zip(labels, handles))
-    ax.legend(by_label.values(), by_label.keys())
+    # Her seviye grubu tek bir LineCollection olarak, grafiğin tüm genişliği boyunca çizilir
+    xlim = ax.get_xlim()
+    if len(supports):
+        ax.hlines(supports, *xlim, colors='blue', linestyles='--', alpha=0.6, label='Destek')
+    if len(resistances):
+        ax.hlines(resistances, *xlim, colors='orange', linestyles='--', alpha=0.6, label='Direnç')
+    ax.set_xlim(xlim)
+    ax.legend()
     return fig
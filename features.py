@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from destek_direnc import SRLevelIndex
+from multiscale import build_scale_index, structure_features_at
+
+# Sinyal satırları için özellik fabrikası
+# Özellikler yalnızca istenen barlarda (ör. EMA kesişim sinyalleri) ve yalnızca o bara kadar bilinen veriyle
+# hesaplanır: her satır için geriye dönük pencereler fiyat dizilerinden doğrudan toplanır (gather), tam
+# uzunlukta ara sütun oluşturulmaz. Sonuç tek parça (C-contiguous) float32 matristir; satırlar chunk_rows'luk
+# bloklar halinde işlendiğinden bellek kullanımı sinyal sayısıyla sınırlı kalır.
+
+DEFAULT_LAGS = (1, 2, 3, 5, 10, 20)
+DEFAULT_WINDOWS = (10, 20, 50)
+STRUCTURE_DISTANCES = (10, 20, 50)
+BASE_COLUMNS = ('RSI_14', 'MACD_Line', 'Signal_Line', 'MACD_Histogram')
+ATR_WINDOW = 14
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def _windows(values, rows, width):
+    """
+    rows barlarında biten width uzunluklu pencereler: (len(rows), width); serinin başından taşan kısım NaN.
+    """
+    idx = rows[:, None] + np.arange(1 - width, 1)
+    out = values[np.maximum(idx, 0)]
+    out[idx < 0] = np.nan
+    return out
+
+
+class FeatureFactory:
+    """
+    Sinyal barlarında özellik matrisi üretir. Özellikler:
+    - ret_L: L bar geriye getiri
+    - vol_w: son w log getirinin standart sapması
+    - ema_dist_atr, high_dist_w_atr, low_dist_w_atr: EMA'ya ve son w barın en yüksek/en düşüğüne ATR ile
+      ölçeklenmiş uzaklık (ATR, Indicators.calculate_atr ile aynı: true range'in basit ortalaması)
+    - low_structure_d, high_structure_d, trend_d: o barda kesinleşmiş son piyasa yapısı (bkz. multiscale)
+    - support_dist_atr, resistance_dist_atr, support_touches, resistance_touches: o bara kadar kesinleşmiş
+      ekstremumlardan kurulan destek/direnç bölgelerinden en yakınına uzaklık ve bölgenin dokunma sayısı
+    - df'de varsa base_columns (RSI, MACD, ...) sinyal barındaki değerleriyle
+    Geçmişi yetmeyen satırlarda özellik NaN olur.
+    """
+
+    def __init__(self, ema_window=20, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, atr_window=ATR_WINDOW,
+                 structure_distances=STRUCTURE_DISTANCES, sr_order=10, sr_tolerance=0.002,
+                 base_columns=BASE_COLUMNS, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        :param ema_window: Uzaklığı ölçülecek EMA (df'de EMA_{ema_window} sütunu olmalı)
+        :param structure_distances: Yapı etiketlerinin ölçekleri (boş ise yapı özellikleri üretilmez)
+        :param sr_order: Destek/direnç ekstremumlarının arama penceresi (bkz. find_support_resistance_zones);
+                         None ise destek/direnç özellikleri üretilmez
+        :param chunk_rows: Tek seferde işlenecek satır sayısı (pencere matrislerinin bellek sınırı)
+        """
+        self.ema_window = ema_window
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.atr_window = atr_window
+        self.structure_distances = tuple(structure_distances)
+        self.sr_order = sr_order
+        self.sr_tolerance = sr_tolerance
+        self.base_columns = tuple(base_columns)
+        self.chunk_rows = chunk_rows
+
+    def config(self):
+        """
+        Fabrikayı yeniden kurmaya yeten parametreler (JSON'a yazılabilir): FeatureFactory(**config()).
+        """
+        return {'ema_window': self.ema_window, 'lags': list(self.lags), 'windows': list(self.windows),
+                'atr_window': self.atr_window, 'structure_distances': list(self.structure_distances),
+                'sr_order': self.sr_order, 'sr_tolerance': self.sr_tolerance, 'base_columns': list(self.base_columns)}
+
+    def key(self):
+        """
+        Üretilen özellikleri belirleyen parametreler (önbellek anahtarları için).
+        """
+        return ('features', self.ema_window, self.lags, self.windows, self.atr_window, self.structure_distances,
+                self.sr_order, self.sr_tolerance, self.base_columns)
+
+    def names(self, df=None):
+        """
+        :param df: Verilirse base_columns'tan yalnızca df'de bulunanlar dahil edilir
+        :return: Matris sütunlarının adları
+        """
+        names = [f'ret_{lag}' for lag in self.lags] + [f'vol_{w}' for w in self.windows]
+        names += ['ema_dist_atr'] + [f'{side}_dist_{w}_atr' for w in self.windows for side in ('high', 'low')]
+        names += [f'{name}_{d}' for d in self.structure_distances
+                  for name in ('low_structure', 'high_structure', 'trend')]
+        if self.sr_order:
+            names += ['support_dist_atr', 'resistance_dist_atr', 'support_touches', 'resistance_touches']
+        names += [c for c in self.base_columns if df is None or c in df.columns]
+        return names
+
+    def build(self, df, rows, scale_index=None):
+        """
+        :param df: Close, High, Low ve EMA_{ema_window} içeren DataFrame (High/Low yoksa Close kullanılır)
+        :param rows: Artan sıralı bar konumları
+        :param scale_index: Önceden kurulmuş multiscale.ScaleIndex (structure_distances'ı içermeli); verilmezse kurulur
+        :return: (len(rows), len(names(df))) boyutlu, C-contiguous float32 matris
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        names = self.names(df)
+        matrix = np.empty((len(rows), len(names)), dtype=np.float32)
+        close = df['Close'].to_numpy(dtype=np.float64)
+        high = df['High'].to_numpy(dtype=np.float64) if 'High' in df else close
+        low = df['Low'].to_numpy(dtype=np.float64) if 'Low' in df else close
+        ema = df[f'EMA_{self.ema_window}'].to_numpy(dtype=np.float64)
+
+        atr = np.empty(len(rows))
+        for start in range(0, len(rows), self.chunk_rows):
+            block = rows[start:start + self.chunk_rows]
+            out = matrix[start:start + len(block)]
+            atr[start:start + len(block)] = self._price_features(out, block, close, high, low, ema)
+        col = len(self.lags) + len(self.windows) * 3 + 1
+
+        if self.structure_distances:
+            if scale_index is None:
+                scale_index = build_scale_index(close, self.structure_distances)
+            codes = structure_features_at(scale_index, close, rows, self.structure_distances)
+            matrix[:, col:col + codes.shape[1]] = codes.to_numpy()
+            col += codes.shape[1]
+        if self.sr_order:
+            matrix[:, col:col + 4] = self._level_features(close, rows, atr)
+            col += 4
+        for name in names[col:]:
+            matrix[:, col] = df[name].to_numpy()[rows]
+            col += 1
+        return matrix
+
+    def frame(self, df, rows, scale_index=None, index=None):
+        """
+        build'in DataFrame hali (matris kopyalanmaz).
+        :param index: Satır indeksi (varsayılan: rows)
+        """
+        return pd.DataFrame(self.build(df, rows, scale_index), columns=self.names(df),
+                            index=rows if index is None else index, copy=False)
+
+    def _price_features(self, out, rows, close, high, low, ema):
+        # Pencereler en uzun geriye bakış için bir kez toplanır, kısa pencereler bunların dilimleridir
+        span = max(max(self.windows, default=0), self.atr_window)
+        width = max(max(self.lags, default=0), span) + 1
+        closes = _windows(close, rows, width)
+        highs = _windows(high, rows, span)
+        lows = _windows(low, rows, span)
+        price = closes[:, -1]
+        col = 0
+        for lag in self.lags:
+            out[:, col] = price / closes[:, -1 - lag] - 1
+            col += 1
+        log_returns = np.diff(np.log(closes[:, -max(self.windows, default=0) - 1:]), axis=1)
+        for w in self.windows:
+            out[:, col] = np.std(log_returns[:, -w:], axis=1, ddof=1)
+            col += 1
+        # True range: ilk barda önceki kapanış yoktur (High - Low)
+        h, l = highs[:, -self.atr_window:], lows[:, -self.atr_window:]
+        prev = closes[:, -self.atr_window - 1:-1]
+        ranges = np.fmax(h - l, np.fmax(np.abs(h - prev), np.abs(l - prev)))
+        atr = ranges.mean(axis=1)
+        out[:, col] = (price - ema[rows]) / atr
+        col += 1
+        for w in self.windows:
+            out[:, col] = (np.max(highs[:, -w:], axis=1) - price) / atr
+            out[:, col + 1] = (price - np.min(lows[:, -w:], axis=1)) / atr
+            col += 2
+        return atr
+
+    def _level_features(self, close, rows, atr):
+        # order bar sonra kesinleşen ekstremumlar, kesinleştikleri sırayla bölge indeksine eklenir
+        from scipy.signal import argrelextrema
+        events = []
+        for side, comparator in (('support', np.less), ('resistance', np.greater)):
+            idx = argrelextrema(close, comparator, order=self.sr_order)[0]
+            events += [(i + self.sr_order, side, i) for i in idx]
+        events.sort()
+        levels = SRLevelIndex(self.sr_tolerance)
+        out = np.full((len(rows), 4), np.nan)
+        k = 0
+        for j, row in enumerate(rows):
+            while k < len(events) and events[k][0] <= row:
+                _, side, i = events[k]
+                levels.add(side, close[i], i)
+                k += 1
+            price = close[row]
+            support, resistance = levels.nearest_support(price), levels.nearest_resistance(price)
+            if support:
+                out[j, 0], out[j, 2] = (price - support['level']) / atr[j], support['touches']
+            if resistance:
+                out[j, 1], out[j, 3] = (resistance['level'] - price) / atr[j], resistance['touches']
+        return out
+
+
+# Örnek kullanım: python features.py
+if __name__ == "__main__":
+    from veri_onisleme import load_processed
+    from indicators import Indicators
+    from strategy import crossover_signals
+    df = load_processed("EURUSD_Daily")
+    df_with_ind = Indicators(df).get_all_indicators()
+    signal, _, _ = crossover_signals(df_with_ind['Close'], df_with_ind['EMA_20'])
+    factory = FeatureFactory(ema_window=20)
+    features = factory.frame(df_with_ind, np.flatnonzero(signal))
+    print(features.describe().T)
@@ -1,98 +1,424 @@
+import copy
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from resample import resample_ohlc
+from lod import plot_line, envelope, axes_pixels
+import kernels
+
+DEFAULT_COLUMNS = ['RSI_14', 'MACD_Line', 'Signal_Line', 'MACD_Histogram', 'ATR_14', 'SMA_20', 'EMA_20',
+                   'RSI_MA_7', 'RSI_Upper', 'RSI_Middle', 'RSI_Lower']
+RSI_BANDS = {'RSI_Upper': 70, 'RSI_Middle': 50, 'RSI_Lower': 30}
+# engine='auto' bu uzunluktan itibaren NumPy çekirdeklerini kullanır; daha kısa serilerde
+# pandas yolu zaten hızlıdır ve StreamingIndicators ile bit düzeyinde aynı sonucu verir.
+# Bu uzunluktan itibaren sonuçlar bit düzeyinde aynı değildir: kayan pencere toplamları farklı sırayla
+# yapıldığından fark SMA_20'de ~7e-16, RSI_MA_7'de ~4e-14 mertebesindedir (RSI, ATR, MACD, EMA aynıdır).
+KERNEL_MIN_BARS = 50_000
+
 
 class Indicators:
-    def __init__(self, data):
-        self.data = data.copy()
-        
+    """
+    İndikatörler bir bağımlılık grafiği üzerinden hesaplanır: fark, kazanç/kayıp, EWM, true range gibi
+    ara sonuçlar parametre setine göre bir kez hesaplanıp boyutu sınırlı (LRU) bir önbellekte tutulur.
+    Örn. RSI_14, calculate_rsi ve calculate_rsi_with_bands tarafından paylaşılır; MACD, EMA ile aynı
+    EWM'leri kullanır.
+    Düğümler uygun veride kernels modülündeki birleşik NumPy çekirdeklerine yönlendirilir,
+    aksi halde pandas yoluna dönülür.
+    """
+
+    def __init__(self, data, timeframe=None, cache_size=32, engine='auto', float32=False):
+        """
+        :param data: OHLC DataFrame
+        :param timeframe: Verilirse ('H1', 'H4', 'D1', ...) veri önce bu zaman dilimine toplanır
+        :param cache_size: Önbellekte tutulacak en fazla ara sonuç sayısı
+        :param engine: 'auto' (büyük ve NaN içermeyen veride çekirdekler), 'numpy' (mümkünse her zaman
+                       çekirdekler) veya 'pandas'
+        :param float32: True ise çekirdekler float32 çalışır (bellek yarıya iner, hassasiyet düşer)
+        """
+        if engine not in ('auto', 'numpy', 'pandas'):
+            raise ValueError(f"Bilinmeyen engine: {engine}")
+        self.data = resample_ohlc(data, timeframe) if timeframe else data.copy()
+        self.cache_size = cache_size
+        self.engine = engine
+        self.dtype = np.float32 if float32 else np.float64
+        self._cache = OrderedDict()
+
+    def _node(self, key, compute):
+        """
+        Graf düğümü: key ile tanımlanan ara sonucu bir kez hesaplar, önbellekten döndürür.
+        """
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = compute()
+        self._cache[key] = value
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def _use_kernels(self, *columns):
+        """
+        Bu sütunlar için NumPy çekirdeklerinin kullanılıp kullanılmayacağı.
+        """
+        if self.engine == 'pandas':
+            return False
+        if self.engine == 'auto' and self.dtype is np.float64 and len(self.data) < KERNEL_MIN_BARS:
+            return False
+        return all(self._node(('supported', c), lambda c=c: kernels.is_supported(self.data[c].to_numpy()))
+                   for c in columns)
+
+    def _series(self, values):
+        return pd.Series(values, index=self.data.index)
+
+    def _delta(self):
+        return self._node(('delta',), lambda: self.data['Close'].diff())
+
+    def _gains_losses(self):
+        def compute():
+            delta = self._delta()
+            return delta.where(delta > 0, 0), -delta.where(delta < 0, 0)
+        return self._node(('gains_losses',), compute)
+
+    def _ewm(self, span):
+        def compute():
+            if self._use_kernels('Close'):
+                return self._series(kernels.ema(self.data['Close'].to_numpy(), span, dtype=self.dtype))
+            return self.data['Close'].ewm(span=span, adjust=False).mean()
+        return self._node(('ewm', span), compute)
+
+    def _rolling_mean(self, series, window):
+        # Çekirdek NaN içeren pencerelerde NaN üretir (pandas min_periods=window ile aynı)
+        if self._use_kernels('Close'):
+            return self._series(kernels.rolling_mean(series.to_numpy(), window, dtype=self.dtype))
+        return series.rolling(window=window).mean()
+
+    def _sma(self, window):
+        return self._node(('sma', window), lambda: self._rolling_mean(self.data['Close'], window))
+
+    def _true_range(self):
+        def compute():
+            if self._use_kernels('High', 'Low', 'Close'):
+                return self._series(kernels.true_range(self.data['High'].to_numpy(), self.data['Low'].to_numpy(),
+                                                       self.data['Close'].to_numpy(), dtype=self.dtype))
+            prev_close = self.data['Close'].shift(1)
+            high_low = self.data['High'] - self.data['Low']
+            high_close = abs(self.data['High'] - prev_close)
+            low_close = abs(self.data['Low'] - prev_close)
+            return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return self._node(('true_range',), compute)
+
+    def _rsi(self, window):
+        def compute():
+            if self._use_kernels('Close'):
+                return self._series(kernels.rsi(self.data['Close'].to_numpy(), window, dtype=self.dtype))
+            gains, losses = self._gains_losses()
+            gain = gains.rolling(window=window).mean()
+            loss = losses.rolling(window=window).mean()
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+        return self._node(('rsi', window), compute)
+
+    def _macd(self, short_window, long_window, signal_window):
+        def compute():
+            macd_line = self._ewm(short_window) - self._ewm(long_window)
+            if self._use_kernels('Close'):
+                signal_line = self._series(kernels.ema(macd_line.to_numpy(), signal_window, dtype=self.dtype))
+            else:
+                signal_line = macd_line.ewm(span=signal_window, adjust=False).mean()
+            return macd_line, signal_line, macd_line - signal_line
+        return self._node(('macd', short_window, long_window, signal_window), compute)
+
     def calculate_rsi(self, window=14):
-        delta = self.data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        self.data[f'RSI_{window}'] = 100 - (100 / (1 + rs))
+        self.data[f'RSI_{window}'] = self._rsi(window)
         return self.data[f'RSI_{window}']
     
     def calculate_macd(self, short_window=12, long_window=26, signal_window=9):
-        self.data['MACD_Line'] = self.data['Close'].ewm(span=short_window, adjust=False).mean() - \
-                                 self.data['Close'].ewm(span=long_window, adjust=False).mean()
-        self.data['Signal_Line'] = self.data['MACD_Line'].ewm(span=signal_window, adjust=False).mean()
-        self.data['MACD_Histogram'] = self.data['MACD_Line'] - self.data['Signal_Line']
+        macd_line, signal_line, histogram = self._macd(short_window, long_window, signal_window)
+        self.data['MACD_Line'] = macd_line
+        self.data['Signal_Line'] = signal_line
+        self.data['MACD_Histogram'] = histogram
         return self.data[['MACD_Line', 'Signal_Line', 'MACD_Histogram']]
     
     def calculate_atr(self, window=14):
-        high_low = self.data['High'] - self.data['Low']
-        high_close = abs(self.data['High'] - self.data['Close'].shift(1))
-        low_close = abs(self.data['Low'] - self.data['Close'].shift(1))
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        self.data[f'ATR_{window}'] = true_range.rolling(window=window).mean()
+        self.data[f'ATR_{window}'] = self._node(('atr', window), lambda: self._rolling_mean(self._true_range(), window))
         return self.data[f'ATR_{window}']
     
     def calculate_sma(self, window=20):
-        self.data[f'SMA_{window}'] = self.data['Close'].rolling(window=window).mean()
+        self.data[f'SMA_{window}'] = self._sma(window)
         return self.data[f'SMA_{window}']
     
     def calculate_ema(self, window=20):
-        self.data[f'EMA_{window}'] = self.data['Close'].ewm(span=window, adjust=False).mean()
+        self.data[f'EMA_{window}'] = self._ewm(window)
         return self.data[f'EMA_{window}']
+
+    def calculate_rsi_ma(self, window=14, ma_window=7):
+        self.data[f'RSI_MA_{ma_window}'] = self._node(('rsi_ma', window, ma_window),
+                                                      lambda: self._rolling_mean(self._rsi(window), ma_window))
+        return self.data[f'RSI_MA_{ma_window}']
     
     def calculate_rsi_with_bands(self, window=14, ma_window=7):
         self.calculate_rsi(window)
-        self.data[f'RSI_MA_{ma_window}'] = self.data[f'RSI_{window}'].rolling(window=ma_window).mean()
-        self.data['RSI_Upper'] = 70
-        self.data['RSI_Middle'] = 50
-        self.data['RSI_Lower'] = 30
+        self.calculate_rsi_ma(window, ma_window)
+        for name, level in RSI_BANDS.items():
+            self.data[name] = level
         return self.data[[f'RSI_{window}', f'RSI_MA_{ma_window}', 'RSI_Upper', 'RSI_Middle', 'RSI_Lower']]
+
+    def _materialize(self, column):
+        """
+        Tek bir sütun adını (ör: 'RSI_14', 'EMA_50', 'RSI_MA_7', 'MACD_Line') ilgili hesaplamaya yönlendirir.
+        """
+        if column in RSI_BANDS:
+            self.data[column] = RSI_BANDS[column]
+        elif column in ('MACD_Line', 'Signal_Line', 'MACD_Histogram'):
+            self.data[column] = self._macd(12, 26, 9)[['MACD_Line', 'Signal_Line', 'MACD_Histogram'].index(column)]
+        elif column.startswith('RSI_MA_'):
+            self.calculate_rsi_ma(ma_window=int(column[len('RSI_MA_'):]))
+        else:
+            name, _, window = column.rpartition('_')
+            methods = {'RSI': self.calculate_rsi, 'ATR': self.calculate_atr,
+                       'SMA': self.calculate_sma, 'EMA': self.calculate_ema}
+            if name not in methods or not window.isdigit():
+                raise ValueError(f"Bilinmeyen indikatör sütunu: {column}")
+            methods[name](int(window))
     
-    def get_all_indicators(self):
-        self.calculate_rsi()
-        self.calculate_macd()
-        self.calculate_atr()
-        self.calculate_sma(window=20)
-        self.calculate_ema(window=20)
-        self.calculate_rsi_with_bands()
+    def get_all_indicators(self, columns=None):
+        """
+        :param columns: Yalnızca istenen indikatör sütunları (ör: ['RSI_14', 'EMA_50']); None ise tüm varsayılanlar
+        :return: İndikatör sütunları eklenmiş DataFrame
+        """
+        for column in columns or DEFAULT_COLUMNS:
+            self._materialize(column)
         return self.data 
 
+class _RollingMean:
+    """
+    Sabit pencereli hareketli ortalamanın tek bar güncellemesi (halka tampon).
+    pandas rolling().mean() ile aynı aritmetiği izler (Kahan toplamı, NaN sayımı,
+    sabit seri ve işaret düzeltmeleri); böylece sonuçlar toplu hesapla birebir aynıdır.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [np.nan] * window
+        self.count = 0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = np.nan
+
+    def update(self, val):
+        val = float(val)
+        if self.count == 0:
+            self.prev_value = val
+        # Pencereden çıkan değer
+        pos = self.count % self.window
+        if self.count >= self.window:
+            old = self.buffer[pos]
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.sum_x + y
+                self.comp_remove = t - self.sum_x - y
+                self.sum_x = t
+                if np.signbit(old):
+                    self.neg_ct -= 1
+        # Pencereye giren değer
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp_add
+            t = self.sum_x + y
+            self.comp_add = t - self.sum_x - y
+            self.sum_x = t
+            if np.signbit(val):
+                self.neg_ct += 1
+            self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+            self.prev_value = val
+        self.buffer[pos] = val
+        self.count += 1
+
+        if self.nobs < self.window:
+            return np.nan
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class _Ewm:
+    """
+    ewm(span=span, adjust=False).mean() özyinelemesinin tek bar güncellemesi (pandas ile aynı aritmetik).
+    """
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.weighted = np.nan
+        self.started = False
+
+    def update(self, cur):
+        cur = float(cur)
+        if not self.started:
+            self.started = True
+            self.weighted = cur
+        elif self.weighted == self.weighted:
+            if cur == cur and self.weighted != cur:
+                old_wt = self.old_wt_factor
+                self.weighted = (old_wt * self.weighted + self.new_wt * cur) / (old_wt + self.new_wt)
+        elif cur == cur:
+            self.weighted = cur
+        return self.weighted
+
+
+class StreamingIndicators:
+    """
+    Indicators sınıfının canlı veri için durumlu karşılığı: her yeni bar geçmiş yeniden hesaplanmadan
+    O(1) maliyetle işlenir. EMA/MACD özyinelemeli, SMA/RSI/ATR pencereleri halka tamponla güncellenir.
+    Aynı veride get_all_indicators (pandas yolu) ile birebir aynı sütunları üretir.
+    """
+
+    def __init__(self, rsi_window=14, short_window=12, long_window=26, signal_window=9,
+                 atr_window=14, sma_window=20, ema_window=20, rsi_ma_window=7):
+        self.rsi_window = rsi_window
+        self.atr_window = atr_window
+        self.sma_window = sma_window
+        self.ema_window = ema_window
+        self.rsi_ma_window = rsi_ma_window
+        self.prev_close = np.nan
+        self._gain = _RollingMean(rsi_window)
+        self._loss = _RollingMean(rsi_window)
+        self._rsi_ma = _RollingMean(rsi_ma_window)
+        self._macd_short = _Ewm(short_window)
+        self._macd_long = _Ewm(long_window)
+        self._macd_signal = _Ewm(signal_window)
+        self._tr = _RollingMean(atr_window)
+        self._sma = _RollingMean(sma_window)
+        self._ema = _Ewm(ema_window)
+
+    def update(self, bar):
+        """
+        Yeni bir barı işler.
+        :param bar: High, Low, Close alanlarını içeren sözlük veya Series
+        :return: Bu bar için indikatör değerleri (get_all_indicators ile aynı sütun adları)
+        """
+        high, low, close = float(bar['High']), float(bar['Low']), float(bar['Close'])
+        prev_close = self.prev_close
+        self.prev_close = close
+
+        # RSI: delta.where(delta > 0, 0) ve -delta.where(delta < 0, 0) ile aynı (ilk barda delta NaN -> 0)
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain = self._gain.update(gain)
+        avg_loss = self._loss.update(loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(avg_gain) / np.float64(avg_loss)
+            rsi = float(100 - (100 / (1 + rs)))
+
+        macd_line = self._macd_short.update(close) - self._macd_long.update(close)
+        signal_line = self._macd_signal.update(macd_line)
+
+        # True range: NaN olan bileşenler atlanır (ilk barda yalnızca High - Low)
+        ranges = [high - low, abs(high - prev_close), abs(low - prev_close)]
+        ranges = [r for r in ranges if r == r]
+        true_range = max(ranges) if ranges else np.nan
+
+        return {
+            f'RSI_{self.rsi_window}': rsi,
+            'MACD_Line': macd_line,
+            'Signal_Line': signal_line,
+            'MACD_Histogram': macd_line - signal_line,
+            f'ATR_{self.atr_window}': self._tr.update(true_range),
+            f'SMA_{self.sma_window}': self._sma.update(close),
+            f'EMA_{self.ema_window}': self._ema.update(close),
+            f'RSI_MA_{self.rsi_ma_window}': self._rsi_ma.update(rsi),
+            'RSI_Upper': 70,
+            'RSI_Middle': 50,
+            'RSI_Lower': 30,
+        }
+
+    def update_many(self, data):
+        """
+        Birden çok barı sırayla işler (ör: geçmişi ısıtmak için).
+        :return: data'ya indikatör sütunları eklenmiş DataFrame
+        """
+        rows = [self.update(bar) for bar in data[['High', 'Low', 'Close']].to_dict('records')]
+        return pd.concat([data.reset_index(drop=True), pd.DataFrame(rows)], axis=1).set_axis(data.index)
+
+    def snapshot(self):
+        """
+        Tüm durumun bağımsız bir kopyası (restore ile geri yüklenebilir, pickle edilebilir).
+        """
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, state):
+        """
+        snapshot ile alınmış durumu geri yükler.
+        """
+        self.__dict__.update(copy.deepcopy(state))
+        return self
+
+
 def plot_indicators(data, indicators):
     """
     İndikatörleri görselleştirme
     :param data: DataFrame
     :param indicators: Indicators sınıfı instance'ı
     """
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(15, 12), gridspec_kw={'height_ratios': [3, 1, 1]})
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(15, 12))
+    ax1, ax2, ax3 = fig.subplots(3, 1, gridspec_kw={'height_ratios': [3, 1, 1]})
 
     # Fiyat grafiği ve hareketli ortalamalar
-    ax1.plot(data['Date'], data['Close'], label='Close', color='gray', alpha=0.7)
-    ax1.plot(data['Date'], data['SMA_20'], label='SMA 20', color='blue', alpha=0.7)
-    ax1.plot(data['Date'], data['EMA_20'], label='EMA 20', color='red', alpha=0.7)
+    plot_line(ax1, data['Date'], data['Close'], label='Close', color='gray', alpha=0.7)
+    plot_line(ax1, data['Date'], data['SMA_20'], label='SMA 20', color='blue', alpha=0.7)
+    plot_line(ax1, data['Date'], data['EMA_20'], label='EMA 20', color='red', alpha=0.7)
     ax1.set_title('Price and Moving Averages')
     ax1.legend()
     ax1.grid(True, alpha=0.3)
 
     # MACD
-    ax2.plot(data['Date'], data['MACD_Line'], label='MACD', color='blue')
-    ax2.plot(data['Date'], data['Signal_Line'], label='Signal', color='red')
+    plot_line(ax2, data['Date'], data['MACD_Line'], label='MACD', color='blue')
+    plot_line(ax2, data['Date'], data['Signal_Line'], label='Signal', color='red')
     macd_hist = data['MACD_Histogram']
-    ax2.bar(data['Date'][macd_hist >= 0], macd_hist[macd_hist >= 0], label='Histogram+', color='green', alpha=0.5)
-    ax2.bar(data['Date'][macd_hist < 0], macd_hist[macd_hist < 0], label='Histogram-', color='red', alpha=0.5)
+    reduced = envelope(data['Date'], macd_hist, axes_pixels(ax2))
+    if reduced is None:
+        ax2.bar(data['Date'][macd_hist >= 0], macd_hist[macd_hist >= 0], label='Histogram+', color='green', alpha=0.5)
+        ax2.bar(data['Date'][macd_hist < 0], macd_hist[macd_hist < 0], label='Histogram-', color='red', alpha=0.5)
+    else:
+        # Uzun serilerde piksel sütunu başına pozitif/negatif zarf çizilir
+        hist_dates, upper, lower, width = reduced
+        ax2.bar(hist_dates, upper, width=width, label='Histogram+', color='green', alpha=0.5)
+        ax2.bar(hist_dates, lower, width=width, label='Histogram-', color='red', alpha=0.5)
     ax2.set_title('MACD')
     ax2.legend()
     ax2.grid(True, alpha=0.3)
 
     # RSI
-    ax3.plot(data['Date'], data['RSI_14'], label='RSI', color='purple')
+    plot_line(ax3, data['Date'], data['RSI_14'], label='RSI', color='purple')
     ax3.axhline(y=70, color='r', linestyle='--', alpha=0.3)
     ax3.axhline(y=30, color='g', linestyle='--', alpha=0.3)
     ax3.set_title('RSI')
     ax3.legend()
     ax3.grid(True, alpha=0.3)
 
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
-df = pd.read_excel("EURUSD_1yil_Daily_Processed.xlsx")
-indicators = Indicators(df)
-df_with_indicators = indicators.get_all_indicators()
-plot_indicators(df_with_indicators, indicators)
+# Örnek kullanım: python indicators.py
+if __name__ == "__main__":
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_1yil_Daily")
+    indicators = Indicators(df)
+    df_with_indicators = indicators.get_all_indicators()
+    plot_indicators(df_with_indicators, indicators)
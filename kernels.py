@@ -0,0 +1,138 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Ham ndarray'ler üzerinde çalışan birleşik (fused) NumPy indikatör çekirdekleri.
+# Ara Series oluşturulmaz; çıktılar önceden ayrılır ve işlemler out= ile yerinde yapılır.
+# dtype=np.float32 ile bellek kullanımı yarıya iner. Girdiler sonlu (NaN içermeyen) olmalıdır;
+# NaN içeren veriler için Indicators pandas yoluna döner.
+
+# Bu pencere boyutuna kadar hareketli toplamlar kaydırılmış dilim toplamıyla hesaplanır
+SHIFTED_SUM_MAX_WINDOW = 64
+
+
+def _output(n, dtype, out):
+    if out is None:
+        return np.empty(n, dtype=dtype)
+    if out.shape != (n,) or out.dtype != dtype:
+        raise ValueError(f"out dizisi ({n},) boyutlu ve {np.dtype(dtype).name} tipinde olmalı")
+    return out
+
+
+def rolling_mean(values, window, out=None, dtype=np.float64):
+    """
+    rolling(window).mean() karşılığı; ilk window-1 değer NaN olur.
+    Kısa pencerelerde pencere toplamı, kaydırılmış bitişik dilimlerin çıktı dizisine yerinde
+    toplanmasıyla (SIMD dostu) hesaplanır; uzun pencerelerde kayan pencere görünümü (kopyasız) kullanılır.
+    """
+    values = np.asarray(values, dtype=dtype)
+    n = len(values)
+    out = _output(n, dtype, out)
+    if n < window:
+        out[:] = np.nan
+        return out
+    out[:window - 1] = np.nan
+    acc = out[window - 1:]
+    if window <= SHIFTED_SUM_MAX_WINDOW:
+        acc[:] = values[:n - window + 1]
+        for k in range(1, window):
+            acc += values[k:n - window + 1 + k]
+    else:
+        np.add.reduce(sliding_window_view(values, window), axis=1, out=acc)
+    acc /= window
+    return out
+
+
+def ema(values, span, out=None, dtype=np.float64):
+    """
+    ewm(span=span, adjust=False).mean() karşılığı: y[0] = x[0], y[t] = a*x[t] + (1-a)*y[t-1].
+    Özyineleme scipy.signal.lfilter ile C seviyesinde tek geçişte çözülür.
+    """
+    from scipy.signal import lfilter
+    values = np.asarray(values, dtype=dtype)
+    out = _output(len(values), dtype, out)
+    if len(values) == 0:
+        return out
+    alpha = dtype(2.0 / (span + 1.0)) if dtype is np.float32 else 2.0 / (span + 1.0)
+    b = np.array([alpha], dtype=dtype)
+    a = np.array([1.0, alpha - 1.0], dtype=dtype)
+    zi = np.array([(1.0 - alpha) * values[0]], dtype=dtype)
+    out[:] = lfilter(b, a, values, zi=zi)[0]
+    return out
+
+
+def rsi(close, window=14, out=None, dtype=np.float64):
+    """
+    Indicators.calculate_rsi karşılığı (basit hareketli ortalamalı RSI).
+    """
+    close = np.asarray(close, dtype=dtype)
+    n = len(close)
+    out = _output(n, dtype, out)
+    gains = np.zeros(n, dtype=dtype)
+    losses = np.zeros(n, dtype=dtype)
+    if n > 1:
+        np.subtract(close[1:], close[:-1], out=gains[1:])
+        np.negative(gains[1:], out=losses[1:])
+        np.maximum(gains, 0, out=gains)
+        np.maximum(losses, 0, out=losses)
+    # Ortalama kazanç çıktı dizisine, ortalama kayıp artık gerekmeyen kazanç tamponuna yazılır
+    avg_gain = rolling_mean(gains, window, out=out, dtype=dtype)
+    avg_loss = rolling_mean(losses, window, out=gains, dtype=dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # rsi = 100 - 100 / (1 + gain / loss)
+        np.divide(avg_gain, avg_loss, out=out)
+        np.add(out, 1, out=out)
+        np.divide(100, out, out=out)
+        np.subtract(100, out, out=out)
+    return out
+
+
+def true_range(high, low, close, out=None, dtype=np.float64):
+    """
+    max(High - Low, |High - önceki Close|, |Low - önceki Close|); ilk barda yalnızca High - Low.
+    """
+    high = np.asarray(high, dtype=dtype)
+    low = np.asarray(low, dtype=dtype)
+    close = np.asarray(close, dtype=dtype)
+    n = len(close)
+    out = _output(n, dtype, out)
+    np.subtract(high, low, out=out)
+    if n > 1:
+        tmp = np.empty(n - 1, dtype=dtype)
+        np.subtract(high[1:], close[:-1], out=tmp)
+        np.abs(tmp, out=tmp)
+        np.fmax(out[1:], tmp, out=out[1:])
+        np.subtract(low[1:], close[:-1], out=tmp)
+        np.abs(tmp, out=tmp)
+        np.fmax(out[1:], tmp, out=out[1:])
+    return out
+
+
+def atr(high, low, close, window=14, out=None, dtype=np.float64):
+    """
+    Indicators.calculate_atr karşılığı (true range'in basit hareketli ortalaması).
+    """
+    tr = true_range(high, low, close, dtype=dtype)
+    return rolling_mean(tr, window, out=out, dtype=dtype)
+
+
+def macd(close, short_window=12, long_window=26, signal_window=9, dtype=np.float64):
+    """
+    Indicators.calculate_macd karşılığı.
+    :return: (macd_line, signal_line, histogram)
+    """
+    macd_line = ema(close, short_window, dtype=dtype)
+    macd_line -= ema(close, long_window, dtype=dtype)
+    signal_line = ema(macd_line, signal_window, dtype=dtype)
+    histogram = np.subtract(macd_line, signal_line)
+    return macd_line, signal_line, histogram
+
+
+def is_supported(*arrays):
+    """
+    Çekirdekler yalnızca sayısal ve tamamen sonlu girdilerle pandas ile aynı sonucu verir.
+    """
+    for values in arrays:
+        values = np.asarray(values)
+        if values.dtype.kind not in 'fiu' or not np.isfinite(values).all():
+            return False
+    return True
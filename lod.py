@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Çizgi grafikleri için ayrıntı seviyesi (level of detail) indirgemesi
+# Seri, eksenin piksel sütunu başına bir kovaya bölünür ve her kovadan yalnızca ilk, son, en küçük ve
+# en büyük nokta (zaman sırasıyla) tutulur (M4). Rasterleştirilmiş çizgi tam seriyle aynı görünür,
+# tepe ve dipler kaybolmaz; nokta sayısı ise en fazla 4 x piksel genişliği olur.
+
+# Eksen genişliği bilinmediğinde kullanılan piksel sütunu sayısı
+DEFAULT_PIXELS = 1600
+
+
+def axes_pixels(ax):
+    """
+    Eksenin piksel cinsinden genişliği (şekil genişliği x dpi x eksenin göreli genişliği).
+    """
+    fig = ax.get_figure()
+    return max(1, int(fig.get_figwidth() * fig.dpi * ax.get_position().width))
+
+
+def _take(values, idx):
+    # Series ise tipini (datetime, tarih nesnesi vb.) koruyarak seç
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values[idx] if isinstance(values, pd.Index) else values.iloc[idx]
+    return np.asarray(values)[idx]
+
+
+def minmax_indices(y, buckets):
+    """
+    Her kovanın ilk, son, en küçük ve en büyük noktasının konumlarını (sıralı, tekrarsız) döndürür.
+    NaN'lar min/max seçiminde yok sayılır; tamamı NaN olan kovalarda ilk/son noktalar boşluğu korur.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    step = int(np.ceil(n / buckets))
+    starts = np.arange(0, n, step)
+    ends = np.minimum(starts + step, n) - 1
+    n_full = n // step
+    full = y[:n_full * step].reshape(n_full, step)
+    nan = np.isnan(full)
+    offsets = starts[:n_full]
+    mins = offsets + np.where(nan, np.inf, full).argmin(axis=1)
+    maxs = offsets + np.where(nan, -np.inf, full).argmax(axis=1)
+    if n_full < len(starts):
+        tail = y[n_full * step:]
+        if np.isnan(tail).all():
+            tail_min = tail_max = 0
+        else:
+            tail_min, tail_max = np.nanargmin(tail), np.nanargmax(tail)
+        mins = np.append(mins, n_full * step + tail_min)
+        maxs = np.append(maxs, n_full * step + tail_max)
+    return np.unique(np.concatenate([starts, ends, mins, maxs]))
+
+
+def downsample(x, y, pixels=DEFAULT_PIXELS):
+    """
+    Seriyi piksel sütunu başına en fazla 4 noktaya indirger; kısa seriler olduğu gibi döner.
+    :param x: Tarihler / x değerleri (Series, Index ya da dizi)
+    :param y: Değerler (aynı uzunlukta)
+    :param pixels: Eksenin piksel genişliği
+    :return: (x, y) -> girdiyle aynı tipte, indirgenmiş seriler
+    """
+    if len(y) <= 4 * pixels:
+        return x, y
+    idx = minmax_indices(y, pixels)
+    return _take(x, idx), _take(y, idx)
+
+
+def plot_line(ax, x, y, *args, **kwargs):
+    """
+    ax.plot'un indirgenmiş karşılığı; eksenin piksel genişliğine göre yalnızca görünür ayrıntı çizilir.
+    """
+    x, y = downsample(x, y, axes_pixels(ax))
+    return ax.plot(x, y, *args, **kwargs)
+
+
+def envelope(dates, y, pixels=DEFAULT_PIXELS):
+    """
+    Tarih eksenli çubuk grafikler (ör. MACD histogramı) için kova başına pozitif ve negatif zarf.
+    :return: Kısa serilerde None (olduğu gibi çizilmeli); aksi halde (dates, upper, lower, width) ->
+             upper kovadaki en büyük pozitif değer (yoksa 0), lower en küçük negatif değer (yoksa 0),
+             width kova genişliği (Timedelta)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) <= 4 * pixels:
+        return None
+    step = int(np.ceil(len(y) / pixels))
+    starts = np.arange(0, len(y), step)
+    stamps = pd.to_datetime(pd.Series(np.asarray(dates)))
+    bucket_dates = stamps.iloc[starts]
+    width = bucket_dates.iloc[1] - bucket_dates.iloc[0]
+    upper = np.maximum.reduceat(np.where(y > 0, y, 0.0), starts)
+    lower = np.minimum.reduceat(np.where(y < 0, y, 0.0), starts)
+    return bucket_dates, upper, lower, width
@@ -1,16 +1,32 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 from indicators import Indicators
-from strategy import ema_crossover_strategy, simulate_ema_strategy_trades, add_risk_reward_column
+from strategy import ema_crossover_strategy, simulate_ema_strategy_trades, add_risk_reward_column, \
+    crossover_signals, TradeResolver
+from cache import content_hash
 
 # 1. VERİYİ HAZIRLA
 
-def prepare_ml_data(df, ema_window=20, risk_reward=2):
+ML_CACHE_DIR = '.ml_cache'
+
+
+def feature_columns(ema_window=20):
+    return ['Close', f'EMA_{ema_window}', 'RSI_14', 'MACD_Line', 'Signal_Line', 'MACD_Histogram']
+
+
+def prepare_ml_data(df, ema_window=20, risk_reward=2, structure_features=None, factory=None, scale_index=None):
     """
     Feature engineering ve hedef sütunu oluşturma.
     Hedef: Sinyalden sonra TP mi SL mi olmuş? (1: TP, 0: SL)
+    :param structure_features: Verilirse (multiscale.structure_feature_matrix, df ile aynı indeksli)
+                               sinyal barında bilinen çok ölçekli yapı kodları da özelliklere eklenir
+    :param factory: Verilirse (features.FeatureFactory) özellikler yalnızca sinyal barlarında float32 matris
+                    olarak üretilir; geçmişi yetmeyen özellikler 0 yerine NaN kalır
+    :param scale_index: factory'nin yapı özellikleri için önceden kurulmuş multiscale.ScaleIndex
     """
     # EMA stratejisi uygula
     result = ema_crossover_strategy(df, ema_window=ema_window, risk_reward=risk_reward)
@@ -21,28 +37,238 @@ def prepare_ml_data(df, ema_window=20, risk_reward=2):
     # Hedef sütunu: TP ise 1, SL ise 0
     trades['target'] = trades['result'].map({'TP': 1, 'SL': 0})
     # Feature engineering: EMA, RSI, MACD, fiyat, vs.
-    features = [
-        'Close',
-        f'EMA_{ema_window}',
-        'RSI_14',
-        'MACD_Line',
-        'Signal_Line',
-        'MACD_Histogram',
-    ]
+    if factory is not None:
+        X = factory.frame(df, df.index.get_indexer(trades.index), scale_index, index=trades.index)
+        if structure_features is not None:
+            X = X.join(structure_features)
+        return X, trades['target'], trades
+    features = feature_columns(ema_window)
+    if structure_features is not None:
+        trades = trades.join(structure_features)
+        features += list(structure_features.columns)
     X = trades[features].fillna(0)
     y = trades['target']
     return X, y, trades
 
+
+def signal_dataset(df, ema_window=20, risk_reward=2, structure_features=None, stop_buffer=0.001, factory=None,
+                   scale_index=None):
+    """
+    prepare_ml_data'nın zaman sıralı eğitim için hafif karşılığı: strateji DataFrame'i kurulmaz, etiketler
+    crossover_signals + TradeResolver ile yalnızca sinyal barlarında hesaplanır. Sonuçlanmamış sinyaller atılır.
+    :param df: İndikatörleri içeren DataFrame (Indicators.get_all_indicators + EMA_{ema_window})
+    :param factory: Verilirse özellikler features.FeatureFactory ile üretilir (bkz. prepare_ml_data)
+    :return: Bar konumuyla ('bar') indeksli, zaman sıralı DataFrame: özellikler + 'exit_bar' + 'target' (1: TP, 0: SL)
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    signal, stop, tp = crossover_signals(close, df[f'EMA_{ema_window}'].to_numpy(),
+                                         stop_buffer=stop_buffer, risk_reward=risk_reward)
+    outcome, exit_pos = TradeResolver(close).resolve(signal, stop, tp)
+    rows = np.flatnonzero(outcome != 0)
+    if factory is not None:
+        features = factory.frame(df, rows, scale_index, index=df.index[rows])
+    else:
+        features = df.iloc[rows][feature_columns(ema_window)]
+    if structure_features is not None:
+        features = features.join(structure_features)
+    if factory is None:
+        features = features.fillna(0)
+    data = features.set_axis(pd.Index(rows, name='bar'))
+    data['exit_bar'] = exit_pos[rows]
+    data['target'] = (outcome[rows] == 1).astype(np.int8)
+    return data
+
+
+def dataset_features(data):
+    """
+    signal_dataset çıktısını (X, y) çiftine ayırır.
+    """
+    return data.drop(columns=['exit_bar', 'target']), data['target']
+
+
+def frame_hash(frame):
+    """
+    DataFrame/Series içeriğinin (indeks ve sütun adları dahil) özeti.
+    """
+    names = repr(list(frame.columns) if isinstance(frame, pd.DataFrame) else frame.name).encode()
+    return content_hash(names + pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+def cached_signal_dataset(df, ema_window=20, risk_reward=2, structure_features=None, factory=None,
+                          scale_index=None, cache_dir=ML_CACHE_DIR):
+    """
+    signal_dataset'in diskte önbelleklenen hali. Anahtar: veri özeti + ema_window + risk_reward
+    (+ verildiyse yapı özelliklerinin özeti ve factory parametreleri); aynı anahtar için matris Parquet
+    dosyasından okunur.
+    """
+    parts = [frame_hash(df), str(ema_window), str(risk_reward)]
+    if structure_features is not None:
+        parts.append(frame_hash(structure_features))
+    if factory is not None:
+        parts.append(repr(factory.key()))
+    path = os.path.join(cache_dir, f"features_{content_hash('|'.join(parts).encode())}.parquet")
+    if os.path.exists(path):
+        # Son kullanım zamanı güncellenir (bkz. prune_cache)
+        os.utime(path)
+        return pd.read_parquet(path)
+    data = signal_dataset(df, ema_window=ema_window, risk_reward=risk_reward, structure_features=structure_features,
+                          factory=factory, scale_index=scale_index)
+    os.makedirs(cache_dir, exist_ok=True)
+    data.to_parquet(path)
+    return data
+
+
+def prune_cache(prefix, keep, cache_dir=ML_CACHE_DIR):
+    """
+    Önbellekte adı prefix ile başlayan dosyalardan (ör. 'features_', 'fold_') en son kullanılan keep tanesi
+    dışındakileri siler. Önbellekten okunan dosyaların zamanı güncellendiğinden sık kullanılanlar kalır.
+    :return: Silinen dosya yolları
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    paths = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.startswith(prefix)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    removed = paths[keep:]
+    for path in removed:
+        if os.path.exists(path):
+            os.remove(path)
+    return removed
+
+
 # 2. MODEL EĞİTİMİ ve TAHMİN
 
-def train_and_evaluate_ml(X, y):
+DEFAULT_FOLDS = 5
+DEFAULT_MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+
+def walk_forward_folds(n_samples, test_size, min_train=None, window='expanding', train_size=None):
+    """
+    Zaman sıralı eğitim/test katlamaları. i. katlama [min_train + i*test_size, + test_size) aralığını test eder;
+    son katlama eksik olabilir. test_size sabit tutulursa veri büyüdükçe önceki katlamalar değişmez.
+    :param window: 'expanding' (eğitim baştan başlar) veya 'rolling' (son train_size örnek)
+    :param train_size: Rolling pencere boyu (varsayılan min_train)
+    :return: [(train_start, test_start, test_end), ...] -> eğitim [train_start, test_start), test [test_start, test_end)
+    """
+    if window not in ('expanding', 'rolling'):
+        raise ValueError(f"Geçersiz pencere: {window} (geçerli: expanding, rolling)")
+    min_train = test_size if min_train is None else min_train
+    train_size = min_train if train_size is None else train_size
+    folds = []
+    for test_start in range(min_train, n_samples, test_size):
+        train_start = max(0, test_start - train_size) if window == 'rolling' else 0
+        folds.append((train_start, test_start, min(test_start + test_size, n_samples)))
+    return folds
+
+
+def _fit_fold(X_train, y_train, X_test, y_test, params):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    model = RandomForestClassifier(**params)
+    # Kopya: pandas dilimleri salt okunurdur, sklearn NaN içeren float32 diziler için yazılabilir dizi ister
+    model.fit(X_train.to_numpy(copy=True), y_train.to_numpy())
+    y_pred = model.predict(X_test.to_numpy(copy=True))
+    metrics = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, zero_division=0),
+        'recall': recall_score(y_test, y_pred, zero_division=0),
+        'tp_rate': float(np.mean(y_test)),
+    }
+    return metrics, y_pred
+
+
+def walk_forward(data, n_folds=DEFAULT_FOLDS, test_size=None, min_train=None, window='expanding', train_size=None,
+                 params=None, n_jobs=None, cache_dir=ML_CACHE_DIR):
+    """
+    signal_dataset çıktısı üzerinde walk-forward eğitim ve değerlendirme.
+    Eğitim örneklerinden işlemi test aralığının ilk sinyal barında hâlâ açık olanlar atılır (etiket sızıntısı).
+    Her katlamanın sonucu, katlamanın verisi + model parametrelerinin özetiyle diskte saklanır; yeni barlar
+    eklendiğinde (sabit test_size ile) yalnızca değişen/yeni katlamalar eğitilir.
+    :param n_folds: test_size verilmezse örnekler n_folds + 1 parçaya bölünür (ilk parça yalnızca eğitim);
+                    bu durumda katlama sınırları örnek sayısına bağlıdır ve her yeni sinyalde tüm katlamalar
+                    yeniden eğitilir
+    :param params: RandomForestClassifier parametreleri (varsayılan DEFAULT_MODEL_PARAMS)
+    :param n_jobs: Paralel eğitilecek katlama sayısı (None: tüm çekirdekler, 1: aynı süreçte çalıştır);
+                   tek katlama eğitilecekse ağaçlar paralel eğitilir
+    :return: (metrics, predictions) -> katlama başına metrik tablosu, test barlarının örneklem dışı tahminleri
+    """
+    params = {**DEFAULT_MODEL_PARAMS, **(params or {})}
+    X, y = dataset_features(data)
+    bars = data.index.to_numpy()
+    exits = data['exit_bar'].to_numpy()
+    test_size = test_size or max(1, len(data) // (n_folds + 1))
+    folds = walk_forward_folds(len(data), test_size, min_train=min_train, window=window, train_size=train_size)
+
+    jobs, paths, sizes, results = [], [], [], {}
+    for i, (train_start, test_start, test_end) in enumerate(folds):
+        # Test aralığı başladığında sonucu henüz belli olmayan eğitim örnekleri kullanılamaz
+        train = np.arange(train_start, test_start)
+        train = train[exits[train] < bars[test_start]]
+        sizes.append(len(train))
+        args = (X.iloc[train], y.iloc[train], X.iloc[test_start:test_end], y.iloc[test_start:test_end])
+        key = content_hash('|'.join([*(frame_hash(part) for part in args), repr(sorted(params.items()))]).encode())
+        paths.append(os.path.join(cache_dir, f"fold_{key}.pkl"))
+        if os.path.exists(paths[i]):
+            os.utime(paths[i])
+            with open(paths[i], 'rb') as f:
+                results[i] = pickle.load(f) + (True,)
+        elif len(train) and y.iloc[train].nunique() > 1:
+            jobs.append((i, args))
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(1, len(jobs)))
+    if n_jobs == 1:
+        tree_jobs = -1 if len(jobs) == 1 else 1
+        trained = [_fit_fold(*args, {**params, 'n_jobs': tree_jobs}) for _, args in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            trained = list(pool.map(_fit_fold, *zip(*(args for _, args in jobs)), [params] * len(jobs)))
+    os.makedirs(cache_dir, exist_ok=True)
+    for (i, _), result in zip(jobs, trained):
+        with open(paths[i], 'wb') as f:
+            pickle.dump(result, f)
+        results[i] = result + (False,)
+
+    rows, predictions = [], []
+    for i, (train_start, test_start, test_end) in enumerate(folds):
+        if i not in results:
+            # Eğitim verisi tek sınıftan oluşan katlama atlanır
+            continue
+        metrics, y_pred, cached = results[i]
+        rows.append({'fold': i, 'train_from': bars[train_start], 'test_from': bars[test_start],
+                     'test_to': bars[test_end - 1], 'n_train': sizes[i],
+                     'n_test': test_end - test_start, **metrics, 'cached': cached})
+        predictions.append(pd.Series(y_pred, index=data.index[test_start:test_end]))
+    predictions = pd.concat(predictions) if predictions else pd.Series(dtype=np.int8)
+    return pd.DataFrame(rows), predictions.rename('prediction')
+
+
+def train_model(data, params=None, n_jobs=None):
+    """
+    signal_dataset'in tüm satırlarıyla nihai modeli eğitir (canlı sinyaller için; bkz. model_store).
+    :param params: RandomForestClassifier parametreleri (varsayılan DEFAULT_MODEL_PARAMS)
+    :param n_jobs: Ağaçları eğitecek çekirdek sayısı (None: tüm çekirdekler)
+    :return: Numpy matrisle eğitilmiş model (tahminde sütun sırası data'daki özellik sırasıdır)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    X, y = dataset_features(data)
+    model = RandomForestClassifier(**{**DEFAULT_MODEL_PARAMS, **(params or {})}, n_jobs=n_jobs or -1)
+    model.fit(X.to_numpy(dtype=np.float32, copy=True), y.to_numpy())
+    return model
+
+
+def train_and_evaluate_ml(X, y, n_jobs=None, params=None):
     """
     RandomForest ile model eğitimi ve değerlendirme (gerçekçi: train/test split ile).
+    Zaman sıralı değerlendirme için bkz. walk_forward.
+    :param n_jobs: Ağaçları eğitecek çekirdek sayısı (None: tüm çekirdekler)
+    :param params: RandomForestClassifier parametreleri (varsayılan DEFAULT_MODEL_PARAMS; ör. tuning.tune_random_forest çıktısı)
     """
+    from sklearn.ensemble import RandomForestClassifier
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+    # sklearn, NaN içeren salt okunur float32 dizileri (pandas görünümleri) işleyemez; float64'e çevrilir
+    X = X.astype(np.float64)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(**{**DEFAULT_MODEL_PARAMS, **(params or {})}, n_jobs=n_jobs or -1)
     model.fit(X_train, y_train)
     y_pred = model.predict(X_test)
     acc = accuracy_score(y_test, y_pred)
@@ -50,13 +276,36 @@ def train_and_evaluate_ml(X, y):
     cr = classification_report(y_test, y_pred, output_dict=True)
     return model, cm, acc, cr
 
+
+def plot_confusion_matrix(cm):
+    """
+    Confusion matrix ısı haritası (pyplot kullanılmadan oluşturulur).
+    :param cm: train_and_evaluate_ml'in döndürdüğü confusion matrix
+    :return: fig
+    """
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    fig = Figure(figsize=(3, 3))
+    ax = fig.subplots()
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax, cbar=False)
+    ax.set_xlabel('Tahmin')
+    ax.set_ylabel('Gerçek')
+    ax.set_title('Confusion Matrix')
+    fig.tight_layout()
+    return fig
+
 # 3. KULLANIM ÖRNEĞİ
 if __name__ == "__main__":
-    df = pd.read_excel("EURUSD_1yil_Daily_Processed.xlsx")
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_1yil_Daily")
     indicators = Indicators(df)
     df_with_ind = indicators.get_all_indicators()
     risk_reward = 2
     X, y, trades = prepare_ml_data(df_with_ind, ema_window=20, risk_reward=risk_reward)
     model, cm, acc, cr = train_and_evaluate_ml(X, y)
     # trades['ml_pred'] = model.predict(X)
-    # print(trades[['Date','Close','signal','result','ml_pred']]) 
\ No newline at end of file
+    # print(trades[['Date','Close','signal','result','ml_pred']])
+    # Walk-forward: katlamalar diskte saklanır, tekrar çalıştırıldığında yalnızca değişen katlamalar eğitilir
+    data = cached_signal_dataset(df_with_ind, ema_window=20, risk_reward=risk_reward)
+    metrics, predictions = walk_forward(data, test_size=20)
+    print(metrics)
\ No newline at end of file
@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# Model deposu ve toplu tahmin
+# Eğitilmiş işlem filtresi modelleri <isim>.joblib olarak (sıkıştırmasız, böylece numpy dizileri mmap ile
+# açılabilir) ve yanında <isim>.meta.json (özellikler, ema_window, risk_reward, veri özeti, eğitim aralığı,
+# parametreler) ile saklanır. Random forest modellerinin ağaçları ayrıca düz diziler halinde
+# <isim>.forest.joblib'e yazılır: bu dosya sklearn yüklenmeden bellek eşlemeli açılır ve küçük partileri
+# (canlı sinyaller) sklearn'ün çağrı başına sabit maliyeti olmadan puanlar. Modeller ilk kullanıldıklarında
+# yüklenir ve sınırlı sayıda bellekte tutulur; serve aynı tahmini yerel bir HTTP uç noktasından sunar.
+
+MODEL_DIR = '.models'
+DEFAULT_MAX_MODELS = 4
+DEFAULT_PORT = 8765
+# Bu sayıya kadar satır düz ağaç dizileriyle, daha büyük partiler sklearn ile puanlanır
+FLAT_MAX_ROWS = 128
+
+
+def _paths(directory, name):
+    return os.path.join(directory, f"{name}.joblib"), os.path.join(directory, f"{name}.meta.json")
+
+
+def _forest_path(directory, name):
+    return os.path.join(directory, f"{name}.forest.joblib")
+
+
+def save_model(model, name, directory=MODEL_DIR, **metadata):
+    """
+    Modeli ve meta verisini diske yazar.
+    :param metadata: JSON'a yazılacak bilgiler (features, ema_window, risk_reward, data_hash, train_from, train_to, ...)
+    :return: Model dosyasının yolu
+    """
+    import joblib
+    import sklearn
+    model_path, meta_path = _paths(directory, name)
+    os.makedirs(directory, exist_ok=True)
+    joblib.dump(model, model_path)
+    if hasattr(model, 'estimators_') and hasattr(model, 'classes_'):
+        joblib.dump(vars(FlatForest.from_model(model)), _forest_path(directory, name))
+    meta = {'name': name, 'model': type(model).__name__, 'sklearn': sklearn.__version__,
+            'created': pd.Timestamp.now().isoformat(), **metadata}
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+    return model_path
+
+
+def load_metadata(name, directory=MODEL_DIR):
+    with open(_paths(directory, name)[1]) as f:
+        return json.load(f)
+
+
+def load_model(name, directory=MODEL_DIR, mmap_mode='r'):
+    """
+    :param mmap_mode: Modeldeki numpy dizileri bu kipte bellek eşlemeli açılır (None: tamamen okunur)
+    """
+    import joblib
+    return joblib.load(_paths(directory, name)[0], mmap_mode=mmap_mode)
+
+
+def load_forest(name, directory=MODEL_DIR, mmap_mode='r'):
+    """
+    Modelin düz ağaç dizilerini açar (dosya yoksa None).
+    """
+    import joblib
+    path = _forest_path(directory, name)
+    return FlatForest(**joblib.load(path, mmap_mode=mmap_mode)) if os.path.exists(path) else None
+
+
+def predict(model, X):
+    """
+    Toplu tahmin: her satır için TP olasılığı.
+    :param X: (satır, özellik) matris; float32 C-contiguous değilse bir kez dönüştürülür
+    :return: float64 dizi (eğitimde TP sınıfı yoksa sıfırlar)
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if len(X) == 0:
+        return np.zeros(0)
+    classes = list(model.classes_)
+    if 1 not in classes:
+        return np.zeros(len(X))
+    return model.predict_proba(X)[:, classes.index(1)]
+
+
+class FlatForest:
+    """
+    RandomForestClassifier ağaçlarının tek düz dizilere açılmış hali. Yalnızca numpy dizilerinden oluştuğu için
+    joblib ile gerçekten bellek eşlemeli (mmap) açılır ve tahmin için sklearn yüklenmesi gerekmez.
+    Tahmin tüm satır x ağaç çiftleri için aynı anda, en büyük ağaç derinliği kadar adımda ilerler; yapraklar
+    kendilerine döndüğünden erken biten yollar için maske gerekmez.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, proba, roots, depth):
+        # np.memmap alt sınıfının indeksleme ek yükünden kaçınmak için düz ndarray görünümleri (kopya değil)
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.right = np.asarray(right)
+        self.missing_left = np.asarray(missing_left)
+        self.proba = np.asarray(proba)
+        self.roots = np.asarray(roots)
+        self.depth = depth
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        :param model: Eğitilmiş RandomForestClassifier (tek çıktılı)
+        """
+        classes = list(model.classes_)
+        parts = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'missing_left', 'proba')}
+        roots, offset = [], 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            value = tree.value[:, 0, :]
+            parts['feature'].append(np.where(leaf, 0, tree.feature))
+            parts['threshold'].append(tree.threshold)
+            parts['left'].append(np.where(leaf, nodes, tree.children_left) + offset)
+            parts['right'].append(np.where(leaf, nodes, tree.children_right) + offset)
+            parts['missing_left'].append(np.asarray(tree.missing_go_to_left, dtype=bool))
+            parts['proba'].append(value[:, classes.index(1)] / value.sum(axis=1) if 1 in classes
+                                  else np.zeros(tree.node_count))
+            roots.append(offset)
+            offset += tree.node_count
+        arrays = {k: np.concatenate(v) for k, v in parts.items()}
+        for k in ('feature', 'left', 'right'):
+            arrays[k] = arrays[k].astype(np.int32)
+        return cls(**arrays, roots=np.asarray(roots, dtype=np.int32),
+                   depth=max(e.tree_.max_depth for e in model.estimators_))
+
+    def predict(self, X, chunk_rows=4096):
+        """
+        :return: Her satır için TP olasılığı (RandomForestClassifier.predict_proba ile aynı)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), chunk_rows):
+            block = X[start:start + chunk_rows]
+            rows = np.arange(len(block))[:, None]
+            node = np.repeat(self.roots[None, :], len(block), axis=0)
+            for _ in range(self.depth):
+                x = block[rows, self.feature[node]]
+                go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.missing_left[node])
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[start:start + len(block)] = self.proba[node].mean(axis=1)
+        return out
+
+
+class ModelStore:
+    """
+    Bir dizindeki modellere isimle erişim. Meta veriler küçük olduğundan her istekte dosyadan okunur;
+    modeller (ve düz ağaç dizileri) ilk istekte yüklenir ve en son kullanılan max_models tanesi bellekte
+    tutulur (iş parçacığı güvenli; eşzamanlı isteklerde aynı model bir kez yüklenir).
+    """
+
+    def __init__(self, directory=MODEL_DIR, max_models=DEFAULT_MAX_MODELS, mmap_mode='r'):
+        self.directory = directory
+        self.max_models = max_models
+        self.mmap_mode = mmap_mode
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}      # Yüklenmekte olan anahtarlar -> anahtar kilidi
+
+    def names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-len('.meta.json')] for f in os.listdir(self.directory) if f.endswith('.meta.json'))
+
+    def __contains__(self, name):
+        return all(os.path.exists(path) for path in _paths(self.directory, name))
+
+    def metadata(self, name):
+        return load_metadata(name, self.directory)
+
+    def find(self, **criteria):
+        """
+        Meta verisi tüm kriterlerle eşleşen en yeni modelin adı (yoksa None).
+        Örn: store.find(ema_window=20, risk_reward=2)
+        """
+        matches = [meta for meta in map(self.metadata, self.names())
+                   if all(meta.get(k) == v for k, v in criteria.items())]
+        return max(matches, key=lambda meta: meta['created'])['name'] if matches else None
+
+    def _lookup(self, key):
+        # self._lock altında çağrılır
+        if key in self._models:
+            self._models.move_to_end(key)
+            return True, self._models[key]
+        return False, None
+
+    def _cached(self, key, load):
+        # Aynı anahtarı isteyen eşzamanlı oturumlar modeli bir kez yükler: ilk gelen anahtar kilidini alıp
+        # yükler, diğerleri kilidi bekleyip önbellekten okur. Yükleme sırasında diğer anahtarlar beklemez.
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                found, value = self._lookup(key)
+            if found:
+                return value
+            try:
+                value = load()
+                with self._lock:
+                    self._models[key] = value
+                    while len(self._models) > self.max_models:
+                        self._models.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def get(self, name):
+        """
+        sklearn modeli (ilk istekte yüklenir).
+        """
+        return self._cached(('model', name), lambda: load_model(name, self.directory, self.mmap_mode))
+
+    def forest(self, name):
+        """
+        Modelin FlatForest hali (yoksa None).
+        """
+        return self._cached(('forest', name), lambda: load_forest(name, self.directory, self.mmap_mode))
+
+    def save(self, model, name, **metadata):
+        path = save_model(model, name, self.directory, **metadata)
+        self._forget(name)
+        return path
+
+    def delete(self, name):
+        """
+        Modelin tüm dosyalarını siler.
+        """
+        for path in (*_paths(self.directory, name), _forest_path(self.directory, name)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._forget(name)
+
+    def prune(self, prefix, keep):
+        """
+        Adı prefix ile başlayan modellerden en yeni keep tanesi dışındakileri siler.
+        :return: Silinen model adları
+        """
+        metas = sorted((self.metadata(name) for name in self.names() if name.startswith(prefix)),
+                       key=lambda meta: meta['created'], reverse=True)
+        removed = [meta['name'] for meta in metas[keep:]]
+        for name in removed:
+            self.delete(name)
+        return removed
+
+    def _forget(self, name):
+        with self._lock:
+            self._models.pop(('model', name), None)
+            self._models.pop(('forest', name), None)
+
+    def predict(self, name, X):
+        """
+        Satırları puanlar: küçük partiler düz ağaç dizileriyle (sklearn yüklenmeden), büyükler sklearn ile.
+        :raises ValueError: X iki boyutlu değilse ya da sütun sayısı meta verideki özellik sayısından farklıysa
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        features = self.metadata(name).get('features')
+        if X.ndim != 2 or (features is not None and X.shape[1] != len(features)):
+            raise ValueError(f"{name} modeli (satır, {len(features) if features is not None else '?'}) boyutlu "
+                             f"veri bekliyor, gelen: {X.shape}")
+        if len(X) <= FLAT_MAX_ROWS:
+            forest = self.forest(name)
+            if forest is not None:
+                return forest.predict(X)
+        return predict(self.get(name), X)
+
+
+def signal_features(metadata, df, rows, scale_index=None):
+    """
+    Modelin eğitildiği özellikleri verilen barlarda float32 matris olarak üretir.
+    Meta veride 'factory' varsa features.FeatureFactory ile, yoksa df'nin 'features' sütunlarından
+    (ml.prepare_ml_data gibi eksikler 0 ile doldurularak) oluşturulur.
+    """
+    if metadata.get('factory'):
+        from features import FeatureFactory
+        return FeatureFactory(**metadata['factory']).build(df, rows, scale_index)
+    return df.iloc[rows][metadata['features']].fillna(0).to_numpy(dtype=np.float32)
+
+
+def score_signals(store, name, strategy_df, scale_index=None):
+    """
+    ema_crossover_strategy çıktısındaki sinyalleri modelle puanlar.
+    :param strategy_df: ema_crossover_strategy çıktısı (modelin özellik sütunlarını da içermeli)
+    :return: Sinyal satırları için signal, stop_loss, take_profit ve tp_proba içeren DataFrame
+    """
+    rows = np.flatnonzero(strategy_df['signal'].notna().to_numpy())
+    X = signal_features(store.metadata(name), strategy_df, rows, scale_index)
+    scored = strategy_df.iloc[rows][['signal', 'stop_loss', 'take_profit']].copy()
+    scored['tp_proba'] = store.predict(name, X)
+    return scored
+
+
+def _handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        # GET /models -> meta veriler; POST /predict {"model": isim, "rows": [[...], ...]} -> {"tp_proba": [...]}
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path != '/models':
+                return self._reply(404, {'error': 'bulunamadı'})
+            self._reply(200, [store.metadata(name) for name in store.names()])
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._reply(404, {'error': 'bulunamadı'})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                name = request['model']
+                if name not in store:
+                    return self._reply(404, {'error': f"model yok: {name}"})
+                proba = store.predict(name, np.asarray(request['rows'], dtype=np.float32).reshape(len(request['rows']), -1))
+            except (KeyError, ValueError, TypeError) as e:
+                return self._reply(400, {'error': str(e)})
+            self._reply(200, {'tp_proba': proba.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(store=None, host='127.0.0.1', port=DEFAULT_PORT):
+    """
+    Canlı sinyalleri puanlamak için yerel HTTP sunucusu (Ctrl+C ile durur).
+    """
+    store = store or ModelStore()
+    server = ThreadingHTTPServer((host, port), _handler(store))
+    print(f"http://{host}:{server.server_port} üzerinde {len(store.names())} model sunuluyor")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# Örnek kullanım: python model_store.py train --source EURUSD_Daily
+#                 python model_store.py serve --port 8765
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="İşlem filtresi modelleri: eğitim, saklama ve tahmin sunucusu")
+    parser.add_argument('--models', default=MODEL_DIR, help="Model dizini")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('train', help="Modeli tüm sinyallerle eğitip depoya yazar")
+    p.add_argument('--source', default='EURUSD_Daily')
+    p.add_argument('--ema-window', type=int, default=20)
+    p.add_argument('--risk-reward', type=float, default=2)
+    p = sub.add_parser('serve', help="Yerel HTTP tahmin sunucusu")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    store = ModelStore(args.models)
+    if args.command == 'train':
+        from veri_onisleme import load_processed
+        from indicators import Indicators
+        from features import FeatureFactory
+        from ml import signal_dataset, train_model, frame_hash
+        from strategy import ema_crossover_strategy
+        indicators = Indicators(load_processed(args.source))
+        df_with_ind = indicators.get_all_indicators()
+        df_with_ind[f'EMA_{args.ema_window}'] = indicators.calculate_ema(args.ema_window)
+        factory = FeatureFactory(ema_window=args.ema_window)
+        data = signal_dataset(df_with_ind, ema_window=args.ema_window, risk_reward=args.risk_reward, factory=factory)
+        name = f"rf_{args.source}_ema{args.ema_window}_rr{args.risk_reward:g}"
+        store.save(train_model(data), name, features=factory.names(df_with_ind), factory=factory.config(),
+                   ema_window=args.ema_window, risk_reward=args.risk_reward, data_hash=frame_hash(df_with_ind),
+                   train_from=df_with_ind['Date'].iloc[data.index[0]], train_to=df_with_ind['Date'].iloc[data.index[-1]],
+                   samples=len(data))
+        strategy_df = ema_crossover_strategy(df_with_ind, ema_window=args.ema_window, risk_reward=args.risk_reward)
+        print(score_signals(store, name, strategy_df).tail())
+    else:
+        serve(store, args.host, args.port)
@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+
+from structers import (PEAK, TROUGH, priority_rank, select_ranked, alternate_extremes, structure_table,
+                       find_trend_by_extremes)
+
+# Çok ölçekli yapı analizi
+# Tepe/dip adayları (find_peaks, distance'sız) ve öncelik sıraları bir kez hesaplanır; her distance için
+# yalnızca distance filtresi ve alternation tekrarlanır. Sonuçlar tüm ölçekler için tek bir sıkıştırılmış
+# indekste (bar indisi int32, tür int8, ölçek başına başlangıç konumu) tutulur; fiyat ve tarihler bar
+# indisinden okunur. Arayüzde ölçek değiştirmek yalnızca bu indeksten bir tablo oluşturmaktır.
+# Her ekstremum için, bar bar çalışan StructureStream'in (stream.py) onu kesinleştireceği bar da saklanır;
+# yapı özellikleri (structure_feature_matrix) bu barlara göre hizalanır ve ileriye bakmaz.
+
+DEFAULT_DISTANCES = (3, 5, 10, 20, 50, 100)
+
+
+class ScaleIndex:
+    """
+    Ölçek (distance) başına alternation filtresinden geçmiş tepe/dipler.
+    Ölçek k'nın ekstremumları index[offsets[k]:offsets[k + 1]] aralığındadır; confirmed, ekstremumun
+    alternation filtresinde kesinleştiği bardır (veri içinde kesinleşmeyenler için n_bars). Kesinleşme barı
+    ihtiyatlıdır: StructureStream'in aynı ekstremumu kesinleştirdiği bardan önce olmaz (çoğunlukla aynıdır).
+    """
+
+    def __init__(self, distances, index, kind, confirmed, offsets, n_bars):
+        self.distances = distances
+        self.index = index
+        self.kind = kind
+        self.confirmed = confirmed
+        self.offsets = offsets
+        self.n_bars = n_bars
+
+    def _slice(self, distance):
+        if distance not in self.distances:
+            raise ValueError(f"distance={distance} indekste yok (mevcut: {', '.join(map(str, self.distances))})")
+        k = self.distances.index(distance)
+        return slice(self.offsets[k], self.offsets[k + 1])
+
+    def extremes(self, distance):
+        """
+        :return: (index, kind) -> alternating_extremes(close, distance) ile aynı bar indisleri ve türler
+        """
+        part = self._slice(distance)
+        return self.index[part].astype(np.int64), self.kind[part]
+
+    def confirmations(self, distance):
+        """
+        :return: extremes(distance) ile aynı sırada, her ekstremumun kesinleştiği bar
+        """
+        return self.confirmed[self._slice(distance)].astype(np.int64)
+
+    def optimized_extremes(self, distance):
+        """
+        :return: (peaks, troughs) -> optimized_local_extremes'in ilk iki çıktısının karşılığı
+        """
+        index, kind = self.extremes(distance)
+        return index[kind == PEAK], index[kind == TROUGH]
+
+    def structures(self, close_prices, dates, distance):
+        """
+        :return: find_trend_by_extremes(find_all_structures(close_prices, distance, dates)) karşılığı
+        """
+        index, kind = self.extremes(distance)
+        values = np.asarray(close_prices, dtype=np.float64)[index]
+        return find_trend_by_extremes(structure_table(index, values, kind, dates))
+
+
+def _selection_bars(positions, rank, distance, ready):
+    # select_ranked + her adayın StructureStream'de karar verildiği bar.
+    # ready: adayın sağ penceresinin tamamlandığı bar. Tutulan aday, penceresindeki daha öncelikli (elenmiş)
+    # adaylar kararlaştığında (en erken ready'de); elenen aday, ona distance'tan yakın ve daha öncelikli
+    # tutulanların (her yanda en fazla bir) ilki kararlaştığında kararlaşır. Kararlar öncelik sırasına göre
+    # dalgalar halinde yayılır; dalga sayısı yükselen aday zincirinin uzunluğu kadardır. Dalga bütçesi
+    # aşılırsa kalan adaylara zincirlerinin (aralarında distance'tan kısa boşluk olan kalan adaylar) son
+    # ready'si ve dışarıdan aldıkları kararların en geçi verilir: stream'inkinden hiçbir zaman önce değildir.
+    n = len(positions)
+    keep = np.zeros(n, dtype=bool)
+    keep[np.searchsorted(positions, select_ranked(positions, rank, distance))] = True
+    decided = np.where(keep, ready, np.iinfo(np.int64).max)
+    kept, lost = np.flatnonzero(keep), np.flatnonzero(~keep)
+    if len(lost) == 0:
+        return keep, decided
+    # Elenen her adayın en yakın sol/sağ tutulanı: daha öncelikliyse onu eler (min), değilse onu bekletir (max)
+    src, dst = [], []
+    right = np.searchsorted(kept, lost)
+    for side in (right - 1, right):
+        valid = (side >= 0) & (side < len(kept))
+        near, other = lost[valid], kept[side[valid]]
+        within = np.abs(positions[other] - positions[near]) < distance
+        near, other = near[within], other[within]
+        higher = rank[other] > rank[near]
+        src += [other[higher], near[~higher]]
+        dst += [near[higher], other[~higher]]
+    src, dst = np.concatenate(src), np.concatenate(dst)
+    order = np.argsort(src, kind='stable')
+    src, dst = src[order], dst[order]
+    starts = np.searchsorted(src, np.arange(n + 1))
+    pending = np.bincount(dst, minlength=n)
+    slot = np.empty(n, dtype=np.int64)
+    wave = np.flatnonzero(pending == 0)
+    for _ in range(max(1024, n // 256)):
+        if len(wave) == 0:
+            break
+        count = starts[wave + 1] - starts[wave]
+        edges = np.repeat(starts[wave] - np.cumsum(count) + count, count) + np.arange(count.sum())
+        targets = dst[edges]
+        values = decided[src[edges]]
+        to_kept = keep[targets]
+        np.maximum.at(decided, targets[to_kept], values[to_kept])
+        np.minimum.at(decided, targets[~to_kept], values[~to_kept])
+        np.subtract.at(pending, targets, 1)
+        # Bu dalgada bekleyeni kalmayanlar (tekrarlar atılır: tekrarlanan indekse son değer yazılır)
+        wave = targets[pending[targets] == 0]
+        slot[wave] = np.arange(len(wave))
+        wave = wave[slot[wave] == np.arange(len(wave))]
+    rest = np.flatnonzero(pending > 0)
+    if len(rest):
+        chain = np.r_[0, np.cumsum(np.diff(positions[rest]) >= distance)]
+        bound = ready[rest][np.r_[np.flatnonzero(np.diff(chain)), len(rest) - 1]]
+        outside = (pending[src] == 0) & (pending[dst] > 0)
+        np.maximum.at(bound, chain[np.searchsorted(rest, dst[outside])], decided[src[outside]])
+        decided[rest] = bound[chain]
+    return keep, decided
+
+
+def build_scale_index(close_prices, distances=DEFAULT_DISTANCES):
+    """
+    Tüm ölçeklerin tepe/diplerini ve kesinleşme barlarını tek geçişte hesaplar.
+    :param close_prices: Kapanış fiyatları (Series ya da dizi)
+    :param distances: Ölçekler (tepe/dip arası minimum bar mesafeleri)
+    :return: ScaleIndex
+    """
+    from scipy.signal import find_peaks
+    values = np.asarray(close_prices, dtype=np.float64)
+    n_bars = len(values)
+    distances = tuple(sorted({max(int(np.ceil(d)), 1) for d in distances}))
+    # Bir barın aday olup olmadığı ancak fiyat değiştiğinde (düzlük bittiğinde) belli olur:
+    # change_bar(x), x'ten itibaren fiyatın değiştiği ilk bar (yoksa n_bars)
+    changed = np.r_[True, values[1:] != values[:-1], True]
+    next_change = np.minimum.accumulate(np.where(changed, np.arange(n_bars + 1), n_bars)[::-1])[::-1]
+
+    def change_bar(x):
+        return next_change[np.minimum(x, n_bars)]
+
+    # Adaylar ve öncelik sıraları tüm ölçekler için ortak
+    sides = []
+    for kind, heights in ((PEAK, values), (TROUGH, -values)):
+        candidates, _ = find_peaks(heights)
+        sides.append((kind, candidates.astype(np.int64), priority_rank(candidates, heights[candidates])))
+
+    parts_index, parts_kind, parts_confirmed, offsets = [], [], [], [0]
+    for distance in distances:
+        selected = {}
+        for kind, candidates, rank in sides:
+            keep, decided = _selection_bars(candidates, rank, distance, change_bar(candidates + distance))
+            # Tutulan aday, kendisinden önceki tüm adaylar kararlaştığında yayınlanır
+            released = np.maximum.accumulate(decided) if len(decided) else decided
+            selected[kind] = (candidates, keep, decided, released)
+        index, kind, ready = [], [], []
+        for side_kind, (candidates, keep, decided, released) in selected.items():
+            other = selected[TROUGH if side_kind == PEAK else PEAK]
+            positions = candidates[keep]
+            # Diğer tarafta bu bardan önceki adayların hepsi kararlaşmış olmalı
+            before = np.searchsorted(other[0], positions, side='left') - 1
+            other_done = np.where(before >= 0, other[3][np.maximum(before, 0)], -1) if len(other[0]) else \
+                np.full(len(positions), -1)
+            index.append(positions)
+            kind.append(np.full(len(positions), side_kind))
+            ready.append(np.maximum.reduce([released[keep], other_done, change_bar(positions + 1)]))
+        index, kind, ready = np.concatenate(index), np.concatenate(kind), np.concatenate(ready)
+        order = np.argsort(index, kind='stable')
+        index, kind = index[order], kind[order]
+        # Olaylar bar sırasıyla işlenir
+        processed = np.maximum.accumulate(ready[order]) if len(order) else ready
+        # Alternation: bir grubun en iyisi, sonraki (ters yönlü) grubun ilk olayı işlendiğinde kesinleşir
+        run_starts = np.flatnonzero(np.r_[True, kind[1:] != kind[:-1]]) if len(kind) else np.zeros(0, np.int64)
+        index, _, kind = alternate_extremes(index, values[index], kind)
+        confirmed = np.r_[processed[run_starts[1:]], n_bars] if len(index) else np.zeros(0, np.int64)
+        parts_index.append(index.astype(np.int32))
+        parts_kind.append(kind)
+        parts_confirmed.append(np.minimum(confirmed, n_bars).astype(np.int32))
+        offsets.append(offsets[-1] + len(index))
+    return ScaleIndex(distances, np.concatenate(parts_index), np.concatenate(parts_kind),
+                      np.concatenate(parts_confirmed), np.asarray(offsets, dtype=np.int64), n_bars)
+
+
+def _forward_fill(n_bars, at, codes):
+    # codes[j], at[j] barından itibaren (bir sonraki koda kadar) geçerlidir; öncesi NaN
+    out = np.full(n_bars, np.nan, dtype=np.float32)
+    out[at] = codes
+    filled = np.where(np.isnan(out), 0, np.arange(n_bars))
+    np.maximum.accumulate(filled, out=filled)
+    out = out[filled]
+    out[:at[0] if len(at) else n_bars] = np.nan
+    return out
+
+
+def _structure_codes(scale_index, values, distance):
+    """
+    Bir ölçeğin yapı kodları ve kesinleştikleri barlar.
+    :return: (at, low_code, high_code, trend_code) -> at artan sıralı; yalnızca veri içinde kesinleşen yapılar
+    """
+    index, kind = scale_index.extremes(distance)
+    troughs, peaks = index[kind == TROUGH], index[kind == PEAK]
+    n = min(len(troughs), len(peaks))
+    low_now, low_prev = values[troughs[1:n]], values[troughs[:max(n - 1, 0)]]
+    high_now, high_prev = values[peaks[1:n]], values[peaks[:max(n - 1, 0)]]
+    low_code = np.where(low_now < low_prev, -1, 1)
+    high_code = np.where(high_now < high_prev, -1, 1)
+    trend_code = np.zeros(len(low_code))
+    trend_code[1:] = np.select([(low_now[1:] < low_now[:-1]) & (high_now[1:] < high_now[:-1]),
+                                (low_now[1:] > low_now[:-1]) & (high_now[1:] > high_now[:-1])], [-1, 1], 0)
+    # Yapı, dibi ve tepesi kesinleştiğinde (ve önceki yapılardan önce değil) yayınlanır
+    confirmed = scale_index.confirmations(distance)
+    at = np.maximum(confirmed[kind == TROUGH][1:n], confirmed[kind == PEAK][1:n])
+    at = np.maximum.accumulate(at) if len(at) else at
+    known = at < scale_index.n_bars
+    return at[known], low_code[known], high_code[known], trend_code[known]
+
+
+def structure_feature_matrix(scale_index, close_prices, distances=None):
+    """
+    Her bar için, o barda bilinen (kesinleşmiş) son yapının ölçek başına kodları; ML özelliği olarak
+    kullanılabilir, ileriye bakma (lookahead) içermez.
+    Bir yapı, StructureStream'in onu yayınlayacağı barda (bkz. ScaleIndex.confirmed) bilinir hale gelir;
+    satır o bara yazılır ve sonraki yapıya kadar ileri taşınır.
+    Sütunlar (ölçek d için): low_structure_d (HL: 1, LL: -1), high_structure_d (HH: 1, LH: -1),
+    trend_d (Bullish: 1, Bearish: -1, Acumulation: 0); ilk yapı kesinleşene kadar NaN.
+    :param scale_index: build_scale_index çıktısı
+    :param close_prices: İndeksin hesaplandığı kapanış fiyatları (Series ise indeksi korunur)
+    :param distances: Kullanılacak ölçekler (varsayılan: indeksteki tümü)
+    :return: float32 DataFrame (bar başına bir satır)
+    """
+    values = np.asarray(close_prices, dtype=np.float64)
+    n_bars = scale_index.n_bars
+    columns = {}
+    for distance in distances or scale_index.distances:
+        at, low_code, high_code, trend_code = _structure_codes(scale_index, values, distance)
+        columns[f'low_structure_{distance}'] = _forward_fill(n_bars, at, low_code)
+        columns[f'high_structure_{distance}'] = _forward_fill(n_bars, at, high_code)
+        columns[f'trend_{distance}'] = _forward_fill(n_bars, at, trend_code)
+    frame_index = close_prices.index if isinstance(close_prices, pd.Series) else None
+    return pd.DataFrame(columns, index=frame_index)
+
+
+def structure_features_at(scale_index, close_prices, rows, distances=None):
+    """
+    structure_feature_matrix'in yalnızca verilen bar konumlarındaki satırları; tam uzunlukta sütun oluşturulmaz,
+    her bar için son kesinleşen yapı ikili aramayla bulunur.
+    :param rows: Artan sıralı bar konumları (ör. sinyal barları)
+    :return: float32 DataFrame (rows indeksli, structure_feature_matrix ile aynı sütunlar)
+    """
+    values = np.asarray(close_prices, dtype=np.float64)
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = {}
+    for distance in distances or scale_index.distances:
+        at, low_code, high_code, trend_code = _structure_codes(scale_index, values, distance)
+        last = np.searchsorted(at, rows, side='right') - 1
+        for name, codes in (('low_structure', low_code), ('high_structure', high_code), ('trend', trend_code)):
+            column = np.asarray(codes, dtype=np.float32)[np.maximum(last, 0)] if len(at) else \
+                np.full(len(rows), np.nan, dtype=np.float32)
+            column[last < 0] = np.nan
+            columns[f'{name}_{distance}'] = column
+    return pd.DataFrame(columns, index=rows)
+
+
+# Örnek kullanım: python multiscale.py
+if __name__ == "__main__":
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_Daily")
+    scales = build_scale_index(df['Close'])
+    for distance in scales.distances:
+        print(distance, len(scales.structures(df['Close'], df['Date'], distance)), "yapı")
+    print(structure_feature_matrix(scales, df['Close']).tail())
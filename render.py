@@ -0,0 +1,76 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResultCache
+
+# Şekil oluşturma (rendering) servisi
+# Grafik fonksiyonları pyplot global durumunu kullanmadan matplotlib.figure.Figure üretir; şekiller işçi
+# iş parçacıklarında PNG/SVG'ye çevrilir, bayt çıktısı (veri özeti + grafik parametreleri) anahtarıyla
+# önbelleklenir ve şekil hemen serbest bırakılır. Aynı grafiğin tekrar gösterimi yalnızca bir önbellek okumasıdır.
+
+RENDER_WORKERS = 2
+FORMATS = ('png', 'svg')
+
+
+def figure_bytes(fig, fmt='png', dpi=100):
+    """
+    Şekli verilen biçimde bayt dizisine çevirir ve şeklin tüm çizim nesnelerini serbest bırakır.
+    :param fig: matplotlib.figure.Figure
+    :param fmt: 'png' veya 'svg'
+    :return: bytes
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Desteklenmeyen biçim: {fmt} (geçerli: {', '.join(FORMATS)})")
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi)
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+class FigureRenderer:
+    """
+    Şekilleri bir iş parçacığı havuzunda oluşturup bayt olarak önbellekler.
+    build fonksiyonları her çağrıda yeni bir Figure döndürmeli ve pyplot kullanmamalıdır
+    (pyplot'un global şekil yöneticisi iş parçacığı güvenli değildir ve şekilleri kapatılana kadar tutar).
+    """
+
+    def __init__(self, cache=None, workers=RENDER_WORKERS, dpi=100, executor=None):
+        """
+        :param cache: Bayt çıktılarının saklanacağı ResultCache (ör. oturumun sonuç önbelleği)
+        :param workers: Aynı anda oluşturulabilecek şekil sayısı (executor verilmezse)
+        :param dpi: Çıktı çözünürlüğü
+        :param executor: Paylaşılan iş parçacığı havuzu (ör. süreç genelinde tek havuz); verilmezse
+                         renderer kendi havuzunu oluşturur
+        """
+        self.cache = cache if cache is not None else ResultCache()
+        self.dpi = dpi
+        self._pool = executor if executor is not None else \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render')
+
+    def _entry(self, key, build, fmt):
+        def compute():
+            fig = build()
+            return None if fig is None else figure_bytes(fig, fmt, self.dpi)
+        return ('figure', fmt, self.dpi, *key), compute
+
+    def submit(self, key, build, fmt='png'):
+        """
+        :param key: Grafiği tanımlayan anahtar (ör: ('indicators', veri_özeti, zaman_dilimi, ema_window))
+        :param build: Argümansız, Figure (çizilecek grafik yoksa None) döndüren fonksiyon
+        :return: bytes (ya da None) döndüren Future
+        """
+        return self._pool.submit(self.cache.get_or_compute, *self._entry(key, build, fmt))
+
+    def render(self, key, build, fmt='png'):
+        """
+        submit'in bekleyen karşılığı; önbellekteyse doğrudan bayt çıktısını döndürür.
+        """
+        return self.submit(key, build, fmt).result()
+
+    def prefetch(self, key, build, fmt='png'):
+        """
+        Grafik önbellekte ya da oluşturulmakta değilse arka planda oluşturur.
+        """
+        return self.cache.prefetch(self._pool, *self._entry(key, build, fmt))
@@ -0,0 +1,126 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from veri_onisleme import load_processed, resolve_source, store_paths, source_sha1
+
+# OHLC zaman dilimi dönüştürme (M1 -> M5/H1/H4/D1)
+# Üst zaman dilimi barları depodaki en ince veriden tek vektörel geçişle üretilir ve
+# kaynağın yanına önbelleklenir.
+
+TIMEFRAMES = {
+    'M1': 60,
+    'M5': 5 * 60,
+    'M15': 15 * 60,
+    'M30': 30 * 60,
+    'H1': 60 * 60,
+    'H4': 4 * 60 * 60,
+    'D1': 24 * 60 * 60,
+}
+
+
+def timeframe_seconds(timeframe):
+    """
+    'H1' gibi bir zaman dilimi etiketini saniyeye çevirir.
+    """
+    try:
+        return TIMEFRAMES[timeframe.upper()]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen zaman dilimi: {timeframe} (geçerli: {', '.join(TIMEFRAMES)})")
+
+
+def infer_timeframe(dates):
+    """
+    Barlar arası medyan farka göre verinin zaman dilimini tahmin eder.
+    :return: En yakın zaman dilimi etiketi (ör: 'M1', 'D1')
+    """
+    stamps = pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[ns]').view(np.int64)
+    if len(stamps) < 2:
+        return 'D1'
+    step = np.median(np.diff(stamps)) / 1e9
+    return min(TIMEFRAMES, key=lambda tf: abs(np.log(TIMEFRAMES[tf] / max(step, 1))))
+
+
+def available_timeframes(dates):
+    """
+    Verinin kendi zaman dilimi ve ondan üretilebilecek daha büyük zaman dilimleri.
+    """
+    base = TIMEFRAMES[infer_timeframe(dates)]
+    return [tf for tf, seconds in TIMEFRAMES.items() if seconds >= base]
+
+
+def resample_ohlc(data, timeframe):
+    """
+    OHLC (+ TickVolume) barlarını daha büyük bir zaman dilimine tek geçişte toplar.
+    Open ilk, High en yüksek, Low en düşük, Close son değer, TickVolume toplamdır; yalnızca mevcut sütunlar üretilir.
+    :param data: Zamana göre sıralı, Date sütunlu (veya datetime indeksli) DataFrame
+    :param timeframe: Hedef zaman dilimi ('M5', 'H1', 'H4', 'D1', ...)
+    :return: Date sütunlu yeni DataFrame
+    """
+    step = timeframe_seconds(timeframe) * 1_000_000_000
+    dates = data['Date'] if 'Date' in data.columns else data.index
+    stamps = pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[ns]').view(np.int64)
+    fields = [c for c in ['Open', 'High', 'Low', 'Close', 'TickVolume'] if c in data.columns]
+    if len(stamps) == 0:
+        return pd.DataFrame({'Date': stamps.view('datetime64[ns]'), **{c: data[c].to_numpy() for c in fields}})
+
+    buckets = np.floor_divide(stamps, step) * step
+    if (np.diff(buckets) < 0).any():
+        raise ValueError("Veri zamana göre sıralı olmalı")
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(buckets)]))
+
+    aggregations = {
+        'Open': lambda v: v[starts],
+        'High': lambda v: np.maximum.reduceat(v, starts),
+        'Low': lambda v: np.minimum.reduceat(v, starts),
+        'Close': lambda v: v[ends - 1],
+        'TickVolume': lambda v: np.add.reduceat(v, starts),
+    }
+    result = {'Date': buckets[starts].view('datetime64[ns]')}
+    for field in fields:
+        result[field] = aggregations[field](data[field].to_numpy())
+    return pd.DataFrame(result)
+
+
+def _timeframe_paths(source, timeframe):
+    store_path, _ = store_paths(source)
+    stem = store_path[:-len('.parquet')]
+    return f"{stem}_{timeframe}.parquet", f"{stem}_{timeframe}.meta.json"
+
+
+def load_timeframe(source, timeframe):
+    """
+    Kaynağın verisini istenen zaman diliminde yükler. Türetilmiş barlar kaynağın yanına
+    (<isim>_Processed_<TF>.parquet) önbelleklenir ve kaynak değişmedikçe yeniden hesaplanmaz;
+    önbellek geçerliyse kaynak verisi hiç okunmaz.
+    :param source: veri_onisleme.load_processed'in kabul ettiği kaynak (dosya yolu veya isim)
+    :param timeframe: 'M5', 'H1', 'H4', 'D1', ...
+    :return: Date, Open, High, Low, Close, TickVolume içeren DataFrame
+    """
+    timeframe = timeframe.upper()
+    source = resolve_source(source)
+    tf_path, tf_meta_path = _timeframe_paths(source, timeframe)
+    if os.path.exists(tf_path) and os.path.exists(tf_meta_path):
+        with open(tf_meta_path) as f:
+            tf_meta = json.load(f)
+        # Önbellek, kaynak özeti aynıysa ve kaynağın kendi zaman dilimi (native) kaydedilmişse geçerlidir
+        base_sha1 = source_sha1(source)
+        if base_sha1 is not None and tf_meta.get('source_sha1') == base_sha1 and tf_meta.get('native'):
+            return pd.read_parquet(tf_path).reset_index()
+
+    base = load_processed(source)
+    native = infer_timeframe(base['Date'])
+    if native == timeframe:
+        return base
+    if TIMEFRAMES[native] > timeframe_seconds(timeframe):
+        raise ValueError(f"{timeframe} barları {native} verisinden üretilemez")
+
+    bars = resample_ohlc(base, timeframe)
+    bars.set_index('Date').to_parquet(tf_path)
+    with open(tf_meta_path, 'w') as f:
+        json.dump({'source_sha1': source_sha1(source), 'native': native, 'timeframe': timeframe,
+                   'rows': len(bars)}, f, indent=2)
+    return bars
@@ -1,9 +1,48 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from resample import resample_ohlc
+from lod import plot_line
+
+SIGNAL_CATEGORIES = ['buy', 'sell']
 
 # EMA tabanlı basit strateji
 
-def ema_crossover_strategy(data, ema_window=20, stop_buffer=0.001, risk_reward=2):
+def crossover_signals(close, ema, stop_buffer=0.001, risk_reward=2):
+    """
+    EMA kesişim sinyallerini tüm seri için tek seferde (vektörel) hesaplar.
+    :param close: Kapanış fiyatları (numpy dizisi veya Series)
+    :param ema: Aynı uzunlukta EMA değerleri
+    :param stop_buffer: Stop mesafesi için EMA'ya eklenecek buffer
+    :param risk_reward: TP/SL oranı
+    :return: (signal, stop_loss, take_profit) -> signal int8 (1: buy, -1: sell, 0: yok),
+             seviyeler float64 (sinyal olmayan barlarda NaN)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ema = np.asarray(ema, dtype=np.float64)
+    signal = np.zeros(len(close), dtype=np.int8)
+    stop = np.full(len(close), np.nan)
+    tp = np.full(len(close), np.nan)
+    if len(close) < 2:
+        return signal, stop, tp
+
+    price, prev_price = close[1:], close[:-1]
+    cur_ema, prev_ema = ema[1:], ema[:-1]
+    # Buy: fiyat EMA'nın altından üstüne geçerse; sell: üstünden altına geçerse
+    buy = (prev_price < prev_ema) & (price > cur_ema)
+    sell = ~buy & (prev_price > prev_ema) & (price < cur_ema)
+    signal[1:][buy] = 1
+    signal[1:][sell] = -1
+
+    buy_stop = cur_ema[buy] - stop_buffer
+    stop[1:][buy] = buy_stop
+    tp[1:][buy] = price[buy] + risk_reward * (price[buy] - buy_stop)
+    sell_stop = cur_ema[sell] + stop_buffer
+    stop[1:][sell] = sell_stop
+    tp[1:][sell] = price[sell] - risk_reward * (sell_stop - price[sell])
+    return signal, stop, tp
+
+
+def ema_crossover_strategy(data, ema_window=20, stop_buffer=0.001, risk_reward=2, timeframe=None):
     """
     Fiyat EMA'nın üstüne çıkınca buy, altına inince sell sinyali üretir.
     Stop loss, EMA'nın biraz üstü/altı, take profit ise stop mesafesinin 2 katı olur.
@@ -11,73 +50,150 @@ def ema_crossover_strategy(data, ema_window=20, stop_buffer=0.001, risk_reward=2
     :param ema_window: EMA penceresi
     :param stop_buffer: Stop mesafesi için EMA'ya eklenecek buffer (ör: 0.001)
     :param risk_reward: TP/SL oranı
+    :param timeframe: Verilirse ('H1', 'H4', 'D1', ...) veri önce bu zaman dilimine toplanır ve EMA yeniden hesaplanır
     :return: Sinyal, stop ve tp seviyeleri eklenmiş DataFrame
+             ('signal' kategorik buy/sell, 'stop_loss' ve 'take_profit' float64)
     """
     ema_col = f'EMA_{ema_window}'
-    df = data.copy()
-    df['signal'] = None
-    df['stop_loss'] = None
-    df['take_profit'] = None
-
-    for i in range(1, len(df)):
-        price = df['Close'].iloc[i]
-        ema = df[ema_col].iloc[i]
-        prev_price = df['Close'].iloc[i-1]
-        prev_ema = df[ema_col].iloc[i-1]
-
-        # Buy sinyali: fiyat EMA'nın altından üstüne geçerse
-        if prev_price < prev_ema and price > ema:
-            df.at[df.index[i], 'signal'] = 'buy'
-            stop = ema - stop_buffer
-            tp = price + risk_reward * (price - stop)
-            df.at[df.index[i], 'stop_loss'] = stop
-            df.at[df.index[i], 'take_profit'] = tp
-        # Sell sinyali: fiyat EMA'nın üstünden altına geçerse
-        elif prev_price > prev_ema and price < ema:
-            df.at[df.index[i], 'signal'] = 'sell'
-            stop = ema + stop_buffer
-            tp = price - risk_reward * (stop - price)
-            df.at[df.index[i], 'stop_loss'] = stop
-            df.at[df.index[i], 'take_profit'] = tp
+    if timeframe:
+        df = resample_ohlc(data, timeframe)
+        df[ema_col] = df['Close'].ewm(span=ema_window, adjust=False).mean()
+    else:
+        df = data.copy()
+    signal, stop, tp = crossover_signals(df['Close'].to_numpy(), df[ema_col].to_numpy(),
+                                         stop_buffer=stop_buffer, risk_reward=risk_reward)
+    codes = np.where(signal == 1, 0, np.where(signal == -1, 1, -1))
+    df['signal'] = pd.Categorical.from_codes(codes, categories=SIGNAL_CATEGORIES)
+    df['stop_loss'] = stop
+    df['take_profit'] = tp
     return df
 
 
+class TradeResolver:
+    """
+    Sinyallerin ilk TP/SL temasını tüm sinyaller için aynı anda bulur.
+    Fiyat serisi üzerinde 2^k uzunluklu pencerelerin max/min tabloları (sparse table) bir kez kurulur;
+    her sinyal için ilk temas noktası bu tablolarda ikili atlama (binary lifting) ile aranır.
+    Böylece maliyet O(bar * log + sinyal * log) olur, sinyal başına seri sonuna kadar döngü yoktur.
+    """
+
+    def __init__(self, up_prices, down_prices=None, max_level=12):
+        """
+        :param up_prices: Yukarı yönlü temaslar için fiyatlar (Close veya High)
+        :param down_prices: Aşağı yönlü temaslar için fiyatlar (Close veya Low); None ise up_prices kullanılır
+        :param max_level: En büyük pencere 2^max_level bar olur (bellek sınırı); daha uzak temaslar
+                          birden fazla turda bulunur
+        """
+        up = np.asarray(up_prices, dtype=np.float64)
+        down = up if down_prices is None else np.asarray(down_prices, dtype=np.float64)
+        self.n = len(up)
+        self._max_tables = self._build_tables(up, np.fmax, max_level)
+        self._min_tables = self._build_tables(down, np.fmin, max_level)
+
+    @staticmethod
+    def _build_tables(values, func, max_level):
+        tables = [values]
+        k = 1
+        while k <= max_level and (1 << k) <= len(values):
+            prev = tables[-1]
+            half = 1 << (k - 1)
+            tables.append(func(prev[:-half], prev[half:]))
+            k += 1
+        return tables
+
+    def _first_touch(self, start, level, above):
+        """
+        start konumundan itibaren fiyatın level'a ilk dokunduğu barı bulur.
+        above=True ise fiyat >= level, değilse fiyat <= level aranır. Bulunamazsa n döner.
+        """
+        tables = self._max_tables if above else self._min_tables
+        n = self.n
+        pos = start.astype(np.int64)
+        found = np.full(len(pos), n, dtype=np.int64)
+        active = pos < n
+        while active.any():
+            p, lvl = pos[active], level[active]
+            for k in range(len(tables) - 1, -1, -1):
+                width = 1 << k
+                valid = p + width <= n
+                ext = tables[k][np.where(valid, p, 0)]
+                # NaN bloklar temas sayılmaz (eski döngüdeki karşılaştırmalar gibi)
+                clear = ~(ext >= lvl) if above else ~(ext <= lvl)
+                p = np.where(valid & clear, p + width, p)
+            in_range = p < n
+            value = tables[0][np.minimum(p, n - 1)]
+            hit = in_range & ((value >= lvl) if above else (value <= lvl))
+            idx = np.flatnonzero(active)
+            found[idx[hit]] = p[hit]
+            # Erişim menzilinde temas yoksa bir sonraki bardan devam et
+            pos[idx] = p + 1
+            active[idx[hit | ~in_range]] = False
+            active &= pos < n
+        return found
+
+    def resolve(self, signal, stop_loss, take_profit):
+        """
+        :param signal: int8 sinyal dizisi (1: buy, -1: sell, 0: yok)
+        :param stop_loss: Stop seviyeleri
+        :param take_profit: TP seviyeleri
+        :return: (outcome, exit_pos) -> outcome int8 (1: TP, -1: SL, 0: sonuçlanmadı / sinyal yok),
+                 exit_pos int64 (çıkış barının konumu, yoksa -1)
+        """
+        signal = np.asarray(signal)
+        stop_loss = np.asarray(stop_loss, dtype=np.float64)
+        take_profit = np.asarray(take_profit, dtype=np.float64)
+        outcome = np.zeros(self.n, dtype=np.int8)
+        exit_pos = np.full(self.n, -1, dtype=np.int64)
+
+        for side in (1, -1):
+            rows = np.flatnonzero(signal == side)
+            if len(rows) == 0:
+                continue
+            # Sinyalden sonraki bardan itibaren bak
+            start = rows + 1
+            tp_pos = self._first_touch(start, take_profit[rows], above=side == 1)
+            sl_pos = self._first_touch(start, stop_loss[rows], above=side == -1)
+            # Aynı barda ikisi de tetiklenirse eski davranıştaki gibi TP öncelikli
+            is_tp = (tp_pos <= sl_pos) & (tp_pos < self.n)
+            is_sl = (sl_pos < tp_pos)
+            outcome[rows[is_tp]] = 1
+            outcome[rows[is_sl]] = -1
+            exit_pos[rows[is_tp]] = tp_pos[is_tp]
+            exit_pos[rows[is_sl]] = sl_pos[is_sl]
+        return outcome, exit_pos
 
 
-def simulate_ema_strategy_trades(df, price_col='Close'):
+def simulate_ema_strategy_trades(df, price_col='Close', use_high_low=False, high_col='High', low_col='Low'):
     """
     EMA stratejisiyle üretilen sinyallerin TP mi SL mi olduğunu simüle eder.
     Her sinyalden sonra, fiyat hareketini izler ve önce TP mi SL mi tetiklenmiş belirler.
-    Sonuçları df'ye 'result' sütunu olarak ekler.
+    Sonuçları df'ye 'result', 'bars_to_exit' ve 'exit_time' sütunları olarak ekler.
+    :param use_high_low: True ise temaslar High/Low ile kontrol edilir (bar içi temaslar da yakalanır)
     """
     df = df.copy()
-    df['result'] = None
-
-    signals = df.dropna(subset=['signal']).index
-
-    for idx in signals:
-        signal = df.at[idx, 'signal']
-        entry_price = df.at[idx, price_col]
-        stop = df.at[idx, 'stop_loss']
-        tp = df.at[idx, 'take_profit']
-
-        # Sinyalden sonraki barlardan itibaren bak
-        for j in range(idx+1, len(df)):
-            price = df.at[df.index[j], price_col]
-            if signal == 'buy':
-                if price >= tp:
-                    df.at[idx, 'result'] = 'TP'
-                    break
-                elif price <= stop:
-                    df.at[idx, 'result'] = 'SL'
-                    break
-            elif signal == 'sell':
-                if price <= tp:
-                    df.at[idx, 'result'] = 'TP'
-                    break
-                elif price >= stop:
-                    df.at[idx, 'result'] = 'SL'
-                    break
+    if use_high_low:
+        resolver = TradeResolver(df[high_col].to_numpy(), df[low_col].to_numpy())
+    else:
+        resolver = TradeResolver(df[price_col].to_numpy())
+
+    signal = np.zeros(len(df), dtype=np.int8)
+    signal[(df['signal'] == 'buy').to_numpy()] = 1
+    signal[(df['signal'] == 'sell').to_numpy()] = -1
+    outcome, exit_pos = resolver.resolve(signal,
+                                         df['stop_loss'].to_numpy(dtype=np.float64),
+                                         df['take_profit'].to_numpy(dtype=np.float64))
+
+    result = np.full(len(df), None, dtype=object)
+    result[outcome == 1] = 'TP'
+    result[outcome == -1] = 'SL'
+    df['result'] = pd.Series(result, index=df.index, dtype=object)
+    resolved = exit_pos >= 0
+    bars = pd.array(np.where(resolved, exit_pos - np.arange(len(df)), 0), dtype='Int64')
+    bars[~resolved] = pd.NA
+    df['bars_to_exit'] = bars
+    if 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date']).to_numpy()
+        df['exit_time'] = pd.Series(dates[np.where(resolved, exit_pos, 0)], index=df.index).where(resolved)
     return df
 
 def add_risk_reward_column(df, risk_reward=2):
@@ -111,49 +227,53 @@ def sum_risk_reward(rr_results, risk_reward=2):
             total -= 1
     return total
 
-from indicators import Indicators
-df = pd.read_excel("EURUSD_1yil_Daily_Processed.xlsx")
-indicators = Indicators(df)
-df_with_ind = indicators.get_all_indicators()
-risk_reward = 5  # veya istediğin oran
-result = ema_crossover_strategy(df_with_ind, ema_window=20, risk_reward=risk_reward)
-simulated = simulate_ema_strategy_trades(result)
-simulated = add_risk_reward_column(simulated, risk_reward=risk_reward)
-print(simulated[['Date','Close','signal','stop_loss','take_profit','result','rr_result']].dropna())
-
-total_r = sum_risk_reward(simulated['rr_result'], risk_reward=risk_reward)
-print(f"Toplam R: {total_r}")
-
 def plot_ema_strategy_trades(df, ema_window=20):
     """
     EMA stratejisi işlemlerini fiyat grafiği üzerinde gösterir.
     Buy/sell sinyalleri, TP ve SL sonuçları renkli olarak işaretlenir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(df['Date'], df['Close'], label='Close', color='gray', alpha=0.7)
-    plt.plot(df['Date'], df[f'EMA_{ema_window}'], label=f'EMA {ema_window}', color='blue', alpha=0.7)
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, df['Date'], df['Close'], label='Close', color='gray', alpha=0.7)
+    plot_line(ax, df['Date'], df[f'EMA_{ema_window}'], label=f'EMA {ema_window}', color='blue', alpha=0.7)
 
     # Buy sinyalleri
     buys = df[df['signal'] == 'buy']
-    plt.scatter(buys['Date'], buys['Close'], marker='^', color='green', s=100, label='Buy Signal')
+    ax.scatter(buys['Date'], buys['Close'], marker='^', color='green', s=100, label='Buy Signal')
 
     # Sell sinyalleri
     sells = df[df['signal'] == 'sell']
-    plt.scatter(sells['Date'], sells['Close'], marker='v', color='red', s=100, label='Sell Signal')
+    ax.scatter(sells['Date'], sells['Close'], marker='v', color='red', s=100, label='Sell Signal')
 
     # TP ve SL sonuçları
     tp = df[df['result'] == 'TP']
     sl = df[df['result'] == 'SL']
-    plt.scatter(tp['Date'], tp['take_profit'], marker='*', color='lime', s=150, label='Take Profit (TP)')
-    plt.scatter(sl['Date'], sl['stop_loss'], marker='x', color='darkred', s=100, label='Stop Loss (SL)')
+    ax.scatter(tp['Date'], tp['take_profit'], marker='*', color='lime', s=150, label='Take Profit (TP)')
+    ax.scatter(sl['Date'], sl['stop_loss'], marker='x', color='darkred', s=100, label='Stop Loss (SL)')
+
+    ax.set_title('EMA Crossover Strategy Trades')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
 
-    plt.title('EMA Crossover Strategy Trades')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    return plt.gcf()
 
-plot_ema_strategy_trades(simulated, ema_window=20)
+# Örnek kullanım: python strategy.py
+if __name__ == "__main__":
+    from indicators import Indicators
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_1yil_Daily")
+    indicators = Indicators(df)
+    df_with_ind = indicators.get_all_indicators()
+    risk_reward = 5  # veya istediğin oran
+    result = ema_crossover_strategy(df_with_ind, ema_window=20, risk_reward=risk_reward)
+    simulated = simulate_ema_strategy_trades(result)
+    simulated = add_risk_reward_column(simulated, risk_reward=risk_reward)
+    print(simulated[['Date','Close','signal','stop_loss','take_profit','result','rr_result']].dropna())
 
+    total_r = sum_risk_reward(simulated['rr_result'], risk_reward=risk_reward)
+    print(f"Toplam R: {total_r}")
+    plot_ema_strategy_trades(simulated, ema_window=20)
@@ -0,0 +1,253 @@
+import bisect
+import math
+from collections import deque
+
+import pandas as pd
+
+from structers import PEAK, TROUGH, STRUCTURE_COLUMNS
+
+# Canlı barlar için artımlı (streaming) tepe/dip ve piyasa yapısı tespiti
+# Her yeni bar yalnızca sınırlı bir tampon üzerinde işlenir: tepe/dip adayları find_peaks'in yerel
+# maksimum kuralıyla (düzlükler dahil) bulunur, distance filtresi select_by_distance ile aynı öncelik
+# kuralıyla (yükseklik, eşitlikte önce gelen) çözülür. Bir aday, sağındaki distance barlık pencere
+# tamamlandığında kesinleşir. Kesinleşen tepe/dipler alternation filtresinden geçirilir ve her yeni
+# dip/tepe çifti find_all_structures + find_trend_by_extremes ile aynı yapı satırı olarak yayınlanır.
+
+
+class SwingSide:
+    """
+    Tek bir taraf için (tepeler: yükseklik = fiyat, dipler: yükseklik = -fiyat) aday tespiti ve distance filtresi.
+    Adaylar normalde distance bar sonra kesinleşir; yalnızca birbirine distance'tan yakın ve giderek yükselen
+    aday zinciri sürdükçe (toplu sonucun da gelecek barlara bağlı olduğu durum) karar ertelenir.
+    Tampon sınırı: kararsız kalan her aday ya son distance - 1 bar içindedir (penceresi tamamlanmamıştır) ya da
+    distance'tan yakın, daha öncelikli ve kararsız bir adayı bekler. Bu yüzden tampon yalnızca, adımları
+    distance'tan kısa ve önceliği artan bir zincirle son distance - 1 bara bağlanan adayları tutar (aralarında en
+    az bir bar olduğundan, zincirin bar uzunluğunun yarısından fazla değil). Böyle bir zincir kırılmadıkça
+    (distance barlık boşluk ya da penceresi tamamlanan bir zirve) toplu sonuç da belirsizdir; tampon bu yüzden
+    kırpılmaz.
+    """
+
+    def __init__(self, distance):
+        self.distance = max(int(math.ceil(distance)), 1)
+        self.n = 0
+        self._last = None
+        self._run_start = 0
+        self._run_rising = False
+        self._run = []          # Son eşit değerli barların (düzlük) verileri
+        self._undecided = []    # (bar, yükseklik, veri); bar sırasına göre
+        self._positions = []    # _undecided'in bar indisleri (bisect için)
+        self._kept = []         # Tutulan ama henüz yayınlanmamış adaylar (bar sırasına göre)
+        self._scan = 0          # _undecided'de bundan öncekiler incelenmiş ve (şimdilik) tutulamayan adaylardır
+        self._final = False
+
+    def update(self, height, item):
+        """
+        :param height: Barın yüksekliği
+        :param item: Aday tutulursa geri döndürülecek bar verisi (ör. (tarih, fiyat))
+        """
+        i = self.n
+        if self._last is None:
+            self._run = [item]
+        elif height == self._last:
+            self._run.append(item)
+        else:
+            # Yükselişle başlayıp düşüşle biten düzlüğün ortası adaydır (find_peaks kuralı)
+            if height < self._last and self._run_rising:
+                middle = (self._run_start + i - 1) // 2
+                self._add_candidate(middle, self._last, self._run[middle - self._run_start])
+            self._run_rising = height > self._last
+            self._run_start = i
+            self._run = [item]
+        self._last = height
+        self.n += 1
+        self._resolve()
+
+    def flush(self):
+        """
+        Veri sonu: sona dayanan düzlük aday olamaz; kalan tüm adaylar kesinleşir.
+        """
+        self._final = True
+        self._run = []
+        self._resolve()
+
+    def safe_position(self):
+        """
+        Bu bardan önceki tüm tutulan adaylar kesinleşmiş ve yayınlanabilir durumdadır.
+        """
+        if self._undecided:
+            return self._undecided[0][0]
+        return math.inf if self._final else self._run_start
+
+    def release(self):
+        """
+        Kesinleşen ve bar sırası artık değişmeyecek adayları döndürür: [(bar, veri), ...]
+        """
+        safe = self.safe_position()
+        count = 0
+        while count < len(self._kept) and self._kept[count][0] < safe:
+            count += 1
+        released, self._kept = self._kept[:count], self._kept[count:]
+        return released
+
+    def _add_candidate(self, position, height, item):
+        self._undecided.append((position, height, item))
+        self._positions.append(position)
+
+    def _window(self, k):
+        position = self._positions[k]
+        lo = bisect.bisect_left(self._positions, position - self.distance + 1)
+        hi = bisect.bisect_right(self._positions, position + self.distance - 1)
+        return lo, hi
+
+    def _resolve(self):
+        # Penceresi tamamlanmış ve penceresindeki kararsız adayların en önceliklisi olan aday tutulur,
+        # penceresindeki diğer adaylar elenir; değişiklik kalmayana kadar tekrarlanır.
+        # Penceresi tamamlanmış bir adayın penceresine yeni aday girmez; durumu ancak penceresinden aday
+        # silindiğinde değişir. Bu yüzden tarama kaldığı yerden (_scan) sürer, bir aday tutulduğunda yalnızca
+        # penceresi silinen aralığa değen adaylara geri dönülür.
+        frontier = math.inf if self._final else self._run_start
+        k = self._scan
+        while k < len(self._undecided):
+            position, height, item = self._undecided[k]
+            if position + self.distance - 1 >= frontier:
+                break
+            lo, hi = self._window(k)
+            if all((h, -p) < (height, -position) for p, h, _ in self._undecided[lo:hi] if p != position):
+                bisect.insort(self._kept, (position, item), key=lambda entry: entry[0])
+                del self._undecided[lo:hi]
+                del self._positions[lo:hi]
+                k = bisect.bisect_left(self._positions, position - 2 * self.distance + 2)
+            else:
+                k += 1
+        self._scan = k
+
+
+class StructureStream:
+    """
+    Bar bar beslenen piyasa yapısı dedektörü.
+    update her çağrıda yeni kesinleşen yapı satırlarını (HH/HL/LH/LL ve Bullish/Bearish/Acumulation)
+    döndürür; satırlar find_trend_by_extremes tablosunun satırlarıyla aynı anahtarlara sahiptir.
+    Geçmiş veri baştan sona beslenip flush çağrıldığında toplu sonuçla birebir aynı satırlar üretilir.
+    """
+
+    def __init__(self, distance):
+        self.distance = distance
+        self.trend = None
+        self._sides = {PEAK: SwingSide(distance), TROUGH: SwingSide(distance)}
+        self._queues = {PEAK: deque(), TROUGH: deque()}
+        self._run = None        # Alternation: (tür, bar, fiyat, tarih) -> aynı türün şimdiye kadarki en iyisi
+        self._swings = {PEAK: [], TROUGH: []}
+        self._row = 1           # Sıradaki yapı satırının numarası (find_all_structures'taki i)
+
+    def update(self, date, close):
+        """
+        :param date: Barın tarihi
+        :param close: Kapanış fiyatı
+        :return: Yeni kesinleşen yapı satırları (dict listesi)
+        """
+        close = float(close)
+        self._sides[PEAK].update(close, (date, close))
+        self._sides[TROUGH].update(-close, (date, close))
+        return self._advance()
+
+    def flush(self):
+        """
+        Veri sonu: bekleyen adaylar ve son tepe/dip grubu kesinleşir.
+        """
+        for side in self._sides.values():
+            side.flush()
+        rows = self._advance()
+        if self._run is not None:
+            self._confirm(*self._run)
+            self._run = None
+            rows += self._structures()
+        return rows
+
+    def _advance(self):
+        for kind, side in self._sides.items():
+            self._queues[kind].extend(side.release())
+        rows = []
+        # İki tarafın yayınlanan adayları bar sırasıyla birleştirilir; diğer tarafta daha önce gelebilecek
+        # bir aday kalmadığında alternation filtresine verilir
+        while True:
+            bounds = {kind: queue[0][0] if queue else self._sides[kind].safe_position()
+                      for kind, queue in self._queues.items()}
+            kind = min(bounds, key=bounds.get)
+            other = TROUGH if kind == PEAK else PEAK
+            if not self._queues[kind] or bounds[kind] >= bounds[other]:
+                break
+            position, (date, close) = self._queues[kind].popleft()
+            self._alternate(kind, position, close, date)
+            rows += self._structures()
+        return rows
+
+    def _alternate(self, kind, position, close, date):
+        # Aynı türden ardışık tepe/diplerde en yüksek tepe / en düşük dip (eşitlikte ilki) tutulur
+        if self._run is None or self._run[0] != kind:
+            if self._run is not None:
+                self._confirm(*self._run)
+            self._run = (kind, position, close, date)
+        elif close * kind > self._run[2] * kind:
+            self._run = (kind, position, close, date)
+
+    def _confirm(self, kind, position, close, date):
+        self._swings[kind].append((date, close))
+
+    def _structures(self):
+        # i. dip ve i. tepe (ve öncekiler) hazırsa i. yapı satırı yayınlanır; tampon yalnızca son çifti tutar
+        rows = []
+        troughs, peaks = self._swings[TROUGH], self._swings[PEAK]
+        while len(troughs) > 1 and len(peaks) > 1:
+            (low_date, low_now), (_, low_prev) = troughs[1], troughs[0]
+            (high_date, high_now), (_, high_prev) = peaks[1], peaks[0]
+            if self._row == 1:
+                trend = None
+            elif low_now < low_prev and high_now < high_prev:
+                trend = "Bearish"
+            elif low_now > low_prev and high_now > high_prev:
+                trend = "Bullish"
+            else:
+                trend = "Acumulation"
+            rows.append({
+                'low_date': low_date,
+                'low_structure': 'LL' if low_now < low_prev else 'HL',
+                'low_value': low_now,
+                'low_prev_value': low_prev,
+                'high_date': high_date,
+                'high_structure': 'LH' if high_now < high_prev else 'HH',
+                'high_value': high_now,
+                'high_prev_value': high_prev,
+                'trend_by_extremes': trend,
+            })
+            self.trend = trend
+            self._row += 1
+            del troughs[0], peaks[0]
+        return rows
+
+
+def stream_structures(close_prices, distance, dates):
+    """
+    Geçmiş veriyi StructureStream'e bar bar besler (toplu sonuçla karşılaştırma ve geri test için).
+    :return: find_trend_by_extremes(find_all_structures(...)) ile aynı DataFrame
+    """
+    stream = StructureStream(distance)
+    rows = []
+    for date, close in zip(dates.tolist(), close_prices.tolist()):
+        rows += stream.update(date, close)
+    rows += stream.flush()
+    frame = pd.DataFrame(rows, columns=STRUCTURE_COLUMNS)
+    # İlk satırın trendi None kalmalı (DataFrame kurucusu None'ı NaN'a çevirir)
+    frame['trend_by_extremes'] = pd.Series([row['trend_by_extremes'] for row in rows], dtype=object)
+    return frame
+
+
+# Örnek kullanım: python stream.py
+if __name__ == "__main__":
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_Daily")
+    stream = StructureStream(distance=10)
+    for date, close in zip(df['Date'], df['Close']):
+        for row in stream.update(date, close):
+            print(row['low_date'], row['low_structure'], row['high_date'], row['high_structure'], row['trend_by_extremes'])
+    for row in stream.flush():
+        print(row['low_date'], row['low_structure'], row['high_date'], row['high_structure'], row['trend_by_extremes'])
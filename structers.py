@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
+from resample import resample_ohlc
+from lod import plot_line
 
 #gecici fonksiyon sonra değiştirecem amacım distanceyi belirelmek hangi aralık yani
 def calculate_window(data, min_distance=3):
@@ -18,6 +19,60 @@ def calculate_window(data, min_distance=3):
     date_range_years = (end_date - start_date).days / 365.25  # Toplam yıl
     return max(min_distance, int(date_range_years))
 
+def select_by_distance(positions, heights, distance):
+    """
+    find_peaks'in distance filtresi: yüksekten alçağa gidilerek her tutulan adayın distance'tan yakın
+    komşuları elenir. Eşit yükseklikte önce gelen (daha eski) aday önceliklidir; bu kural barlar geldikçe
+    de uygulanabilir (bkz. stream.py). scipy eşitlikleri kararsız bir sıralamayla çözer; bu yüzden seçimden önce
+    yükseklikler kararlı bir sıralamayla tekil önceliklere çevrilir (priority_rank), seçimi scipy yapar.
+    :param positions: Aday bar indisleri (artan sırada)
+    :param heights: Adayların yüksekliği (dipler için -fiyat)
+    :param distance: Tutulan adaylar arası minimum bar mesafesi
+    :return: Tutulan adayların bar indisleri
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    return select_ranked(positions, priority_rank(positions, heights), distance)
+
+
+def priority_rank(positions, heights):
+    """
+    select_by_distance'ın öncelik sırası (büyük olan önce): yükseklik, eşitlikte daha küçük indeks.
+    Aynı adaylar birden fazla distance için seçilecekse bir kez hesaplanır (bkz. multiscale.py).
+    """
+    rank = np.empty(len(positions), dtype=np.int64)
+    rank[np.lexsort((-np.asarray(positions), np.asarray(heights, dtype=np.float64)))] = np.arange(len(positions))
+    return rank
+
+
+def select_ranked(positions, rank, distance):
+    """
+    select_by_distance'ın öncelik sırası önceden hesaplanmış (priority_rank) karşılığı.
+    Adaylar, yüksekliği öncelik sırası olan bir sinyale yerleştirilir ve find_peaks(distance=) ile seçilir;
+    öncelikler tekil olduğundan sonuç kesindir. Her aday iki barlık aralıkla yerleştirilir (arada 0 kalır,
+    her aday yerel maksimumdur); mesafe de buna göre 2 * distance - 1 olur.
+    """
+    from scipy.signal import find_peaks
+    distance = int(np.ceil(distance))
+    if len(positions) == 0 or distance <= 1:
+        return positions
+    signal = np.zeros(2 * int(positions[-1] - positions[0]) + 3)
+    signal[2 * (positions - positions[0]) + 1] = np.asarray(rank, dtype=np.float64) + 1
+    selected, _ = find_peaks(signal, distance=2 * distance - 1)
+    return positions[0] + (selected - 1) // 2
+
+
+def swing_points(close_prices, distance):
+    """
+    find_peaks(close, distance) ve find_peaks(-close, distance) karşılığı (eşitlik kuralı için bkz. select_by_distance).
+    :return: (peaks, troughs) -> bar indisleri
+    """
+    from scipy.signal import find_peaks
+    values = np.asarray(close_prices, dtype=np.float64)
+    peaks, _ = find_peaks(values)
+    troughs, _ = find_peaks(-values)
+    return select_by_distance(peaks, values[peaks], distance), select_by_distance(troughs, -values[troughs], distance)
+
+
 def find_local_extremes(close_prices, distance, dates):
     """
     Lokal dip ve tepe noktalarını bulur ve hem indekslerini hem de fiyat değerlerini döndürür.
@@ -26,8 +81,7 @@ def find_local_extremes(close_prices, distance, dates):
     :param dates: Tarihlerin pandas Series formatında listesi
     :return: (tepe_indisleri, dip_indisleri, tepe_fiyatları, dip_fiyatları, tepe_tarihleri, dip_tarihleri)
     """
-    peaks, _ = find_peaks(close_prices, distance=distance)
-    troughs, _ = find_peaks(-close_prices, distance=distance)
+    peaks, troughs = swing_points(close_prices, distance)
 
     peak_values   = close_prices.iloc[peaks].tolist()
     trough_values = close_prices.iloc[troughs].tolist()
@@ -37,66 +91,69 @@ def find_local_extremes(close_prices, distance, dates):
     return peaks, troughs, peak_values, trough_values, peak_dates, trough_dates
 
 
+# Ekstremum türleri (alternating_extremes'in kind dizisi)
+PEAK = np.int8(1)
+TROUGH = np.int8(-1)
+
+
+def alternate_extremes(index, value, kind):
+    """
+    Bar sırasına dizilmiş ekstremumlardan peak→trough→peak→... ardışıklığını korur.
+    Aynı türden ardışık ekstremumlar tek bir grup (run) oluşturur; her gruptan peak'ler için en yükseği,
+    trough'lar için en düşüğü (eşitlikte ilki) tutulur. Python döngüsü yoktur, grup başına tek indirgeme yapılır.
+    :param index: Bar indisleri (artan sırada)
+    :param value: Fiyatlar
+    :param kind: PEAK (1) / TROUGH (-1), int8
+    :return: (index, value, kind) -> filtrelenmiş diziler
+    """
+    if len(index) == 0:
+        return index, value, kind
+    run_starts = np.flatnonzero(np.r_[True, kind[1:] != kind[:-1]])
+    run_lengths = np.diff(np.r_[run_starts, len(kind)])
+    # Peak'lerde değer, trough'larda -değer büyütülür; her grubun en büyük skorlu ilk elemanı seçilir
+    score = value * kind
+    best = np.repeat(np.maximum.reduceat(score, run_starts), run_lengths)
+    candidates = np.flatnonzero(score == best)
+    run_id = np.repeat(np.arange(len(run_starts)), run_lengths)[candidates]
+    keep = candidates[np.r_[True, run_id[1:] != run_id[:-1]]]
+    return index[keep], value[keep], kind[keep]
+
+
+def alternating_extremes(close_prices, distance):
+    """
+    find_local_extremes + alternation filtresi; sonuçlar yapı dizileri (struct of arrays) olarak döner.
+    :param close_prices: Kapanış fiyatları (Series ya da dizi)
+    :param distance: ekströmler arası minimum mesafe
+    :return: (index, value, kind) -> int64 bar indisleri, float64 fiyatlar, int8 türler (PEAK / TROUGH)
+    """
+    values = np.asarray(close_prices, dtype=np.float64)
+    peaks, troughs = swing_points(values, distance)
+    index = np.concatenate([peaks, troughs]).astype(np.int64)
+    kind = np.concatenate([np.full(len(peaks), PEAK), np.full(len(troughs), TROUGH)])
+    # Bir bar hem peak hem trough olamaz; sıralama indekse göre
+    order = np.argsort(index, kind='stable')
+    index, kind = index[order], kind[order]
+    return alternate_extremes(index, values[index], kind)
+
+
 def optimized_local_extremes(close_prices, distance, dates):
     """
     - Önce find_local_extremes ile tüm peak ve trough'ları alır.
     - Ardından tarihe (indekse) göre sıralar ve yalnızca peak→trough→peak→... ya da trough→peak→trough→... 
       ardışıklığını koruyacak şekilde filtreler.
     - Eğer iki aynı tür ekström ardışık gelirse, peak'ler için en yükseğini; trough'lar için en düşüğünü tutar.
+    Hesaplama alternating_extremes ile dizi üzerinde yapılır; bu fonksiyon yalnızca listelere ayrıştırır.
     :param close_prices: pandas Series kapanış fiyatları
     :param distance: ekströmler arası minimum mesafe
     :param dates: pandas Series tarihleri
     :return: (opt_peaks, opt_troughs, opt_peak_vals, opt_trough_vals, opt_peak_dates, opt_trough_dates)
     """
-    # 1) İlk haller
-    peaks, troughs, p_vals, t_vals, p_dates, t_dates = \
-        find_local_extremes(close_prices, distance, dates)
-
-    # 2) Tümünü bir listeye toplayıp sırala
-    events = []
-    for idx, val, dt in zip(peaks, p_vals, p_dates):
-        events.append({'type':'peak',   'index':idx, 'value':val, 'date':dt})
-    for idx, val, dt in zip(troughs, t_vals, t_dates):
-        events.append({'type':'trough', 'index':idx, 'value':val, 'date':dt})
-    events.sort(key=lambda x: x['index'])
-
-    # 3) Ardışık aynı tipleri elenmiş, alternation sağlanmış yeni liste
-    filtered = []
-    for ev in events:
-        if not filtered:
-            filtered.append(ev)
-            continue
-
-        last = filtered[-1]
-        if ev['type'] != last['type']:
-            # Tür değişmiş: ekle
-            filtered.append(ev)
-        else:
-            # Aynı tür → peak ise yüksek olanı, trough ise düşük olanı tut
-            if ev['type'] == 'peak':
-                if ev['value'] > last['value']:
-                    filtered[-1] = ev
-            else:  # trough
-                if ev['value'] < last['value']:
-                    filtered[-1] = ev
-
-    # 4) Sonuçları ayrıştır
-    opt_peaks, opt_peak_vals, opt_peak_dates     = [], [], []
-    opt_troughs, opt_trough_vals, opt_trough_dates = [], [], []
-
-    for ev in filtered:
-        if ev['type'] == 'peak':
-            opt_peaks.append(ev['index'])
-            opt_peak_vals.append(ev['value'])
-            opt_peak_dates.append(ev['date'])
-        else:
-            opt_troughs.append(ev['index'])
-            opt_trough_vals.append(ev['value'])
-            opt_trough_dates.append(ev['date'])
-
-    return (opt_peaks, opt_troughs,
-            opt_peak_vals, opt_trough_vals,
-            opt_peak_dates, opt_trough_dates)
+    index, value, kind = alternating_extremes(close_prices, distance)
+    is_peak = kind == PEAK
+    peaks, troughs = index[is_peak], index[~is_peak]
+    return (peaks.tolist(), troughs.tolist(),
+            value[is_peak].tolist(), value[~is_peak].tolist(),
+            dates.iloc[peaks].tolist(), dates.iloc[troughs].tolist())
 
 
 
@@ -104,45 +161,38 @@ def visualize_extremes(dates, close_prices, peaks, troughs):
     """
     find_local_extremes fonksiyonundan dönen tepe ve dip indekslerini fiyat grafiği üzerinde gösterir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(dates, close_prices, label='Close Price', color='gray', alpha=0.7)
-    plt.scatter([dates.iloc[i] for i in peaks], [close_prices.iloc[i] for i in peaks], color='red', marker='^', s=100, label='Peaks')
-    plt.scatter([dates.iloc[i] for i in troughs], [close_prices.iloc[i] for i in troughs], color='blue', marker='v', s=100, label='Troughs')
-    plt.title('find_local_extremes: Peaks and Troughs')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    return plt.gcf()
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, label='Close Price', color='gray', alpha=0.7)
+    ax.scatter([dates.iloc[i] for i in peaks], [close_prices.iloc[i] for i in peaks], color='red', marker='^', s=100, label='Peaks')
+    ax.scatter([dates.iloc[i] for i in troughs], [close_prices.iloc[i] for i in troughs], color='blue', marker='v', s=100, label='Troughs')
+    ax.set_title('find_local_extremes: Peaks and Troughs')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
 
 def visualize_optimized_extremes(dates, close_prices, opt_peaks, opt_troughs):
     """
     optimized_local_extremes fonksiyonundan dönen tepe ve dip indekslerini fiyat grafiği üzerinde gösterir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(dates, close_prices, label='Close Price', color='gray', alpha=0.7)
-    plt.scatter([dates.iloc[i] for i in opt_peaks], [close_prices.iloc[i] for i in opt_peaks], color='green', marker='^', s=100, label='Optimized Peaks')
-    plt.scatter([dates.iloc[i] for i in opt_troughs], [close_prices.iloc[i] for i in opt_troughs], color='purple', marker='v', s=100, label='Optimized Troughs')
-    plt.title('optimized_local_extremes: Ordered Peaks and Troughs')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    return plt.gcf()
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, label='Close Price', color='gray', alpha=0.7)
+    ax.scatter([dates.iloc[i] for i in opt_peaks], [close_prices.iloc[i] for i in opt_peaks], color='green', marker='^', s=100, label='Optimized Peaks')
+    ax.scatter([dates.iloc[i] for i in opt_troughs], [close_prices.iloc[i] for i in opt_troughs], color='purple', marker='v', s=100, label='Optimized Troughs')
+    ax.set_title('optimized_local_extremes: Ordered Peaks and Troughs')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
 
-# Veriyi yükle
-df = pd.read_excel("EURUSD_1yil_Daily_Processed.xlsx")
-close_prices = df['Close']
-dates = pd.to_datetime(df['Date'])
-# Dinamik pencere (window) hesapla
-distance = calculate_window(df, min_distance=4)
-peaks, troughs, peak_values, trough_values, peak_dates, trough_dates = find_local_extremes(close_prices, distance, dates)
-visualize_extremes(dates, close_prices, peaks, troughs)
-# Call optimized visualization
-opt_peaks, opt_troughs, opt_peak_vals, opt_trough_vals, opt_peak_dates, opt_trough_dates = optimized_local_extremes(close_prices, distance, dates)
-visualize_optimized_extremes(dates, close_prices, opt_peaks, opt_troughs)
 
 
 
@@ -175,87 +225,143 @@ def find_current_structure(current_value, previous_value, structure_type):
             return 'HH'  # Higher High
 
 
-def find_all_structures(close_prices, distance,dates):
+# find_all_structures / find_trend_by_extremes çıktısının sütunları (yapı başına bir satır)
+STRUCTURE_COLUMNS = ['low_date', 'low_structure', 'low_value', 'low_prev_value',
+                     'high_date', 'high_structure', 'high_value', 'high_prev_value']
+
+
+def find_all_structures(close_prices, distance,dates, timeframe=None):
     """
-    Tepe ve dip noktalarının yapısını analiz eder ve sözlük formatında birleştirir.
+    Tepe ve dip noktalarının yapısını analiz eder ve yapı başına bir satırlık tabloda birleştirir.
+    i. satır i. dip ve i. tepeyi bir öncekilerle karşılaştırır (dip/tepe sayısından küçük olanı kadar satır).
+    Eski sözlük listesi biçimi için structures_to_records kullanılabilir.
 
     :param close_prices: Fiyatların pandas Series formatında listesi
     :param distance: Tepe ve dip noktaları arasındaki minimum mesafe
-    :return: Sözlük formatında birleşik yapı listesi.
+    :param timeframe: Verilirse ('H1', 'H4', 'D1', ...) kapanışlar önce bu zaman dilimine toplanır
+    :return: DataFrame (STRUCTURE_COLUMNS)
     """
+    if timeframe:
+        bars = resample_ohlc(pd.DataFrame({'Date': pd.to_datetime(dates).to_numpy(),
+                                           'Close': close_prices.to_numpy()}), timeframe)
+        close_prices, dates = bars['Close'], bars['Date']
+
     # Tepe ve dip noktalarını bul
-    peaks, troughs, peak_values, trough_values, peak_dates, trough_dates = optimized_local_extremes(close_prices, distance,dates)
-
-    # Dip ve tepe noktalarının trend bilgilerini saklamak için sözlük listesi
-    trend_data = []
-
-    # Uzunluğa göre en küçük listeyi temel alarak indeksleme
-    for i in range(1, min(len(trough_values), len(peak_values))):
-        # Dip ve tepe noktalarını sözlük formatında birleştir
-        trend_data.append({
-            "low": {
-                "dates": trough_dates[i],
-                "structure": find_current_structure(trough_values[i], trough_values[i - 1], 'low'),
-                "current_value": trough_values[i],
-                "previous_value": trough_values[i - 1]
-            },
-            "high": {
-                "dates": peak_dates[i],
-                "structure": find_current_structure(peak_values[i], peak_values[i - 1], 'high'),
-                "current_value": peak_values[i],
-                "previous_value": peak_values[i - 1]
-            }
-        })
-
-    return trend_data
+    index, value, kind = alternating_extremes(close_prices, distance)
+    return structure_table(index, value, kind, dates)
+
+
+def structure_table(index, value, kind, dates):
+    """
+    alternating_extremes çıktısından find_all_structures tablosunu oluşturur.
+    :param dates: Tarihler (Series)
+    :return: DataFrame (STRUCTURE_COLUMNS)
+    """
+    is_peak = kind == PEAK
+    peaks, troughs = index[is_peak], index[~is_peak]
+    peak_values, trough_values = value[is_peak], value[~is_peak]
+
+    # Uzunluğa göre en küçük listeyi temel alarak indeksleme (find_current_structure karşılığı)
+    n = min(len(troughs), len(peaks))
+    n_structures = max(n - 1, 0)
+    low_now, low_prev = trough_values[1:n], trough_values[:n_structures]
+    high_now, high_prev = peak_values[1:n], peak_values[:n_structures]
+    return pd.DataFrame({
+        'low_date': dates.iloc[troughs[1:n]].to_numpy(),
+        'low_structure': np.where(low_now < low_prev, 'LL', 'HL'),
+        'low_value': low_now,
+        'low_prev_value': low_prev,
+        'high_date': dates.iloc[peaks[1:n]].to_numpy(),
+        'high_structure': np.where(high_now < high_prev, 'LH', 'HH'),
+        'high_value': high_now,
+        'high_prev_value': high_prev,
+    }, columns=STRUCTURE_COLUMNS)
 
 
 def find_trend_by_extremes(trend_data):
     """
-    find_all_structures fonksiyonundan dönen trend_data listesini kullanarak,
+    find_all_structures fonksiyonundan dönen tabloyu kullanarak,
     her bir yapı için bir öncekiyle karşılaştırmalı trend belirler.
+    :param trend_data: find_all_structures tablosu (ya da eski sözlük listesi)
+    :return: trend_by_extremes sütunu eklenmiş kopya (sözlük listesi verildiyse sözlük listesi)
     """
-    for i in range(1, len(trend_data)):
-        prev = trend_data[i-1]
-        curr = trend_data[i]
-        low_now = curr["low"]["current_value"]
-        low_prev = prev["low"]["current_value"]
-        high_now = curr["high"]["current_value"]
-        high_prev = prev["high"]["current_value"]
-
-        if low_now < low_prev and high_now < high_prev:
-            trend = "Bearish"
-        elif low_now > low_prev and high_now > high_prev:
-            trend = "Bullish"
-        else:
-            trend = "Acumulation"
-        curr["trend_by_extremes"] = trend
+    if isinstance(trend_data, list):
+        return structures_to_records(find_trend_by_extremes(structures_from_records(trend_data)))
+    low = trend_data['low_value'].to_numpy(dtype=np.float64)
+    high = trend_data['high_value'].to_numpy(dtype=np.float64)
+    trend = np.empty(len(trend_data), dtype=object)
     # İlk elemana trend atanamaz, None bırakıyoruz
-    if trend_data:
-        trend_data[0]["trend_by_extremes"] = None
-    return trend_data
-
-
-
-
-df = pd.read_excel("EURUSD_Daily_Processed.xlsx")
-close_prices = df['Close']
-dates = pd.to_datetime(df['Date'])
-
-# Dinamik pencere (window) hesapla
-distance = calculate_window(df, min_distance=10)
-
-structures = find_all_structures(close_prices, distance, dates)
-trend_data = find_trend_by_extremes(structures)
-
-print(trend_data)
-
-
-
-
-
-
-
-
+    trend[:1] = None
+    trend[1:] = np.select([(low[1:] < low[:-1]) & (high[1:] < high[:-1]),
+                           (low[1:] > low[:-1]) & (high[1:] > high[:-1])],
+                          ["Bearish", "Bullish"], "Acumulation")
+    return trend_data.assign(trend_by_extremes=pd.Series(trend, index=trend_data.index, dtype=object))
 
 
+def structures_to_records(trend_data):
+    """
+    Yapı tablosunu eski sözlük listesi biçimine çevirir:
+    [{"low": {"dates", "structure", "current_value", "previous_value"}, "high": {...}, "trend_by_extremes"}, ...]
+    """
+    columns = {name: trend_data[name].tolist() for name in trend_data.columns}
+    records = []
+    for i in range(len(trend_data)):
+        record = {side: {"dates": columns[f'{side}_date'][i],
+                         "structure": columns[f'{side}_structure'][i],
+                         "current_value": columns[f'{side}_value'][i],
+                         "previous_value": columns[f'{side}_prev_value'][i]}
+                  for side in ('low', 'high')}
+        if 'trend_by_extremes' in columns:
+            record["trend_by_extremes"] = columns['trend_by_extremes'][i]
+        records.append(record)
+    return records
+
+
+def structures_from_records(records):
+    """
+    structures_to_records'un tersi; eski sözlük listesini yapı tablosuna çevirir.
+    """
+    rows = [{f'{side}_{column}': record[side][key]
+             for side in ('low', 'high')
+             for column, key in (('date', 'dates'), ('structure', 'structure'),
+                                 ('value', 'current_value'), ('prev_value', 'previous_value'))}
+            for record in records]
+    frame = pd.DataFrame(rows, columns=STRUCTURE_COLUMNS)
+    if any("trend_by_extremes" in record for record in records):
+        frame['trend_by_extremes'] = pd.Series([record.get("trend_by_extremes") for record in records], dtype=object)
+    return frame
+
+
+def structure_frame(trend_data):
+    """
+    Yapı tablosunu olduğu gibi, eski sözlük listesini tabloya çevirerek döndürür.
+    """
+    return structures_from_records(trend_data) if isinstance(trend_data, list) else trend_data
+
+
+# Örnek kullanım: python structers.py
+if __name__ == "__main__":
+    # Veriyi yükle
+    from veri_onisleme import load_processed
+    df = load_processed("EURUSD_1yil_Daily")
+    close_prices = df['Close']
+    dates = pd.to_datetime(df['Date'])
+    # Dinamik pencere (window) hesapla
+    distance = calculate_window(df, min_distance=4)
+    peaks, troughs, peak_values, trough_values, peak_dates, trough_dates = find_local_extremes(close_prices, distance, dates)
+    visualize_extremes(dates, close_prices, peaks, troughs)
+    # Call optimized visualization
+    opt_peaks, opt_troughs, opt_peak_vals, opt_trough_vals, opt_peak_dates, opt_trough_dates = optimized_local_extremes(close_prices, distance, dates)
+    visualize_optimized_extremes(dates, close_prices, opt_peaks, opt_troughs)
+
+    df = load_processed("EURUSD_Daily")
+    close_prices = df['Close']
+    dates = pd.to_datetime(df['Date'])
+
+    # Dinamik pencere (window) hesapla
+    distance = calculate_window(df, min_distance=10)
+
+    structures = find_all_structures(close_prices, distance, dates)
+    trend_data = find_trend_by_extremes(structures)
+
+    print(trend_data)
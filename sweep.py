@@ -0,0 +1,124 @@
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from strategy import crossover_signals, TradeResolver
+from veri_onisleme import load_processed
+
+# Paralel parametre taraması (grid backtest)
+# Her EMA penceresi bir kez hesaplanır; fiyat tabloları her işçi sürecinde bir kez kurulur
+# ve tüm parametre kombinasyonları tarafından paylaşılır.
+
+_worker_state = {}
+
+
+def _init_worker(close, emas, up_prices, down_prices):
+    _worker_state['close'] = close
+    _worker_state['emas'] = emas
+    _worker_state['resolver'] = TradeResolver(up_prices, down_prices)
+
+
+def _run_configs(configs):
+    close = _worker_state['close']
+    emas = _worker_state['emas']
+    resolver = _worker_state['resolver']
+    rows = []
+    for ema_window, stop_buffer, risk_reward in configs:
+        signal, stop, tp = crossover_signals(close, emas[ema_window],
+                                             stop_buffer=stop_buffer, risk_reward=risk_reward)
+        outcome, _ = resolver.resolve(signal, stop, tp)
+        wins = int((outcome == 1).sum())
+        losses = int((outcome == -1).sum())
+        trades = wins + losses
+        rows.append({
+            'ema_window': ema_window,
+            'stop_buffer': stop_buffer,
+            'risk_reward': risk_reward,
+            # sum_risk_reward ile aynı: TP -> +risk_reward, SL -> -1
+            'total_r': risk_reward * wins - losses,
+            'win_rate': wins / trades if trades else np.nan,
+            'trades': trades,
+            'signals': int((signal != 0).sum()),
+        })
+    return rows
+
+
+def run_sweep(df, ema_windows, stop_buffers, risk_rewards, n_jobs=None, use_high_low=False, chunk_size=None):
+    """
+    ema_window, stop_buffer ve risk_reward ızgarasının tüm kombinasyonlarını backtest eder.
+    :param df: OHLC DataFrame (Close; use_high_low=True ise High ve Low da gerekli)
+    :param ema_windows: Denenecek EMA pencereleri
+    :param stop_buffers: Denenecek stop buffer değerleri
+    :param risk_rewards: Denenecek TP/SL oranları
+    :param n_jobs: İşçi süreç sayısı (None: tüm çekirdekler, 1: aynı süreçte çalıştır)
+    :param use_high_low: True ise TP/SL temasları High/Low ile kontrol edilir
+    :param chunk_size: Bir işçiye tek seferde gönderilecek kombinasyon sayısı
+    :return: Her kombinasyon için total_r, win_rate ve trades içeren DataFrame (total_r'ye göre sıralı)
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    # Her EMA penceresi yalnızca bir kez hesaplanır (Indicators.calculate_ema ile aynı tanım)
+    emas = {w: df['Close'].ewm(span=w, adjust=False).mean().to_numpy() for w in sorted(set(ema_windows))}
+    if use_high_low:
+        up_prices, down_prices = df['High'].to_numpy(dtype=np.float64), df['Low'].to_numpy(dtype=np.float64)
+    else:
+        up_prices, down_prices = close, None
+
+    configs = list(itertools.product(sorted(set(ema_windows)), stop_buffers, risk_rewards))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_jobs = min(n_jobs, max(1, len(configs)))
+    init_args = (close, emas, up_prices, down_prices)
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        rows = _run_configs(configs)
+    else:
+        chunk_size = chunk_size or max(1, math.ceil(len(configs) / (n_jobs * 4)))
+        chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+        rows = []
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+            for chunk_rows in pool.map(_run_configs, chunks):
+                rows.extend(chunk_rows)
+
+    results = pd.DataFrame(rows)
+    return results.sort_values('total_r', ascending=False, ignore_index=True)
+
+
+def _parse_grid(text, cast):
+    """
+    '10,20,50' biçiminde liste ya da 'başlangıç:bitiş:adım' biçiminde (bitiş dahil) aralık okur.
+    """
+    if ':' in text:
+        start, stop, step = (cast(x) for x in text.split(':'))
+        count = int(round((stop - start) / step)) + 1
+        return [cast(round(start + i * step, 10)) for i in range(count)]
+    return [cast(x) for x in text.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMA stratejisi için parametre taraması")
+    parser.add_argument('--file', default="EURUSD_Daily_Processed.xlsx", help="Kaynak veri (.csv, _Processed.xlsx, .parquet ya da isim)")
+    parser.add_argument('--ema-windows', default="10:50:5", help="Ör: 10,20,50 veya 10:50:5")
+    parser.add_argument('--stop-buffers', default="0.0005:0.003:0.0005")
+    parser.add_argument('--risk-rewards', default="1:5:1")
+    parser.add_argument('--jobs', type=int, default=None, help="İşçi süreç sayısı (varsayılan: tüm çekirdekler)")
+    parser.add_argument('--high-low', action='store_true', help="TP/SL temaslarını High/Low ile kontrol et")
+    parser.add_argument('--out', default=None, help="Sonuçların yazılacağı CSV dosyası")
+    parser.add_argument('--top', type=int, default=20, help="Ekrana yazılacak en iyi sonuç sayısı")
+    args = parser.parse_args()
+
+    df = load_processed(args.file)
+    results = run_sweep(df,
+                        ema_windows=_parse_grid(args.ema_windows, int),
+                        stop_buffers=_parse_grid(args.stop_buffers, float),
+                        risk_rewards=_parse_grid(args.risk_rewards, float),
+                        n_jobs=args.jobs,
+                        use_high_low=args.high_low)
+    print(results.head(args.top).to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"Sonuçlar {args.out} olarak kaydedildi.")
@@ -0,0 +1,215 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from cache import content_hash
+from ml import dataset_features, frame_hash, DEFAULT_MODEL_PARAMS, ML_CACHE_DIR
+
+# RandomForest hiperparametre araması (successive halving)
+# Ağaç sayısı bütçedir: tüm yapılandırmalar az ağaçla zaman sıralı çapraz doğrulamadan geçer, her turda en iyi
+# 1/eta'lık kısım eta kat daha fazla ağaçla devam eder (warm_start ile mevcut ağaçlara yenileri eklenir).
+# Modeller ana sürece gönderilmez; her işçi değerlendirdiği yapılandırmaların son turdaki modellerini tutar.
+# Bir sonraki turda yapılandırma başka bir işçiye düşerse model sıfırdan eğitilir (sonuç aynıdır).
+# Her (yapılandırma, ağaç sayısı) sonucu bir JSONL dosyasına eklenir; aynı arama tekrar başlatıldığında
+# tamamlanan değerlendirmeler dosyadan okunur ve arama kaldığı yerden sürer.
+
+DEFAULT_SPACE = {
+    'max_depth': [None, 4, 8, 16],
+    'min_samples_leaf': [1, 5, 20],
+    'class_weight': [None, 'balanced', 'balanced_subsample'],
+}
+DEFAULT_CV = 5
+
+_worker_state = {}
+
+
+def _init_worker(folds, scoring):
+    _worker_state['folds'] = folds
+    _worker_state['scoring'] = scoring
+    _worker_state['models'] = {}    # Yapılandırma anahtarı -> (ağaç sayısı, katlama modelleri)
+
+
+def _evaluate(config, trees, previous=None):
+    """
+    Yapılandırmayı tüm katlamalarda trees ağaçla değerlendirir.
+    Bu işçi yapılandırmayı önceki turda (previous ağaçla) değerlendirdiyse yalnızca eksik ağaçlar eğitilir;
+    sklearn yeni ağaçların rastgele tohumlarını sıfırdan eğitimdekiyle aynı sırada ürettiğinden sonuç aynıdır.
+    :param previous: Önceki turun ağaç sayısı (ilk turda None); daha eski turların modelleri atılır
+    :return: Katlama skorları
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import get_scorer
+    scorer = get_scorer(_worker_state['scoring'])
+    cache = _worker_state['models']
+    for key in [key for key, (count, _) in cache.items() if previous is not None and count < previous]:
+        del cache[key]
+    count, models = cache.pop(_config_key(config), (None, None))
+    if count != previous:
+        models = None
+    scores, fitted = [], []
+    for i, (X_train, y_train, X_test, y_test) in enumerate(_worker_state['folds']):
+        if models:
+            model = models[i]
+        else:
+            model = RandomForestClassifier(**{**DEFAULT_MODEL_PARAMS, **config}, warm_start=True, n_jobs=1)
+        model.set_params(n_estimators=trees)
+        with warnings.catch_warnings():
+            # class_weight='balanced'/'balanced_subsample' ile warm_start uyarısı, eklenen ağaçların farklı
+            # bir veriyle eğitildiği durum içindir; burada katlamanın verisi turlar arasında değişmez
+            warnings.filterwarnings('ignore', message='class_weight presets', category=UserWarning)
+            model.fit(X_train, y_train)
+        try:
+            scores.append(float(scorer(model, X_test, y_test)))
+        except ValueError:
+            # Ör. test katlamasında tek sınıf varken roc_auc tanımsızdır
+            scores.append(float('nan'))
+        fitted.append(model)
+    cache[_config_key(config)] = (trees, fitted)
+    return scores
+
+
+def time_series_folds(data, cv=DEFAULT_CV):
+    """
+    TimeSeriesSplit katlamaları; eğitim örneklerinden işlemi test katlamasının ilk sinyal barında hâlâ açık
+    olanlar atılır (bkz. ml.walk_forward).
+    :return: [(X_train, y_train, X_test, y_test), ...] -> float32 numpy dizileri
+    """
+    from sklearn.model_selection import TimeSeriesSplit
+    X, y = dataset_features(data)
+    X = X.to_numpy(dtype=np.float32, copy=True)
+    y = y.to_numpy()
+    bars, exits = data.index.to_numpy(), data['exit_bar'].to_numpy()
+    folds = []
+    for train, test in TimeSeriesSplit(n_splits=cv).split(X):
+        train = train[exits[train] < bars[test[0]]]
+        folds.append((X[train], y[train], X[test], y[test]))
+    return folds
+
+
+def configurations(space):
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def _config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+
+def _read_results(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    done[(record['config'], record['trees'])] = record
+    return done
+
+
+def tune_random_forest(data, space=None, cv=DEFAULT_CV, min_trees=25, max_trees=400, eta=3, scoring='accuracy',
+                       n_jobs=None, results_path=None):
+    """
+    signal_dataset çıktısı üzerinde successive halving ile RandomForest araması.
+    :param space: Parametre -> denenecek değerler (varsayılan DEFAULT_SPACE); n_estimators bütçedir,
+                  turlar min_trees, min_trees*eta, ... max_trees ağaçla değerlendirilir
+    :param cv: TimeSeriesSplit katlama sayısı
+    :param eta: Her turda kalan yapılandırma oranı 1/eta, ağaç çarpanı eta
+    :param scoring: sklearn skor adı ('accuracy', 'precision', 'f1', 'roc_auc', ...)
+    :param n_jobs: İşçi süreç sayısı (None: tüm çekirdekler, 1: aynı süreçte çalıştır)
+    :param results_path: Sonuçların eklendiği JSONL dosyası (varsayılan: veri + arama ayarları özetiyle
+                         ML_CACHE_DIR altında); aynı dosyayla tekrar çalıştırma kaldığı yerden devam eder
+    :return: (best_params, results) -> train_and_evaluate_ml(params=...) için parametreler ve tur bazında
+             tüm değerlendirmeler (tur, ağaç sayısı ve skora göre sıralı)
+    """
+    space = space or DEFAULT_SPACE
+    configs = configurations(space)
+    if results_path is None:
+        search = json.dumps([frame_hash(data), space, cv, min_trees, max_trees, eta, scoring], sort_keys=True)
+        results_path = os.path.join(ML_CACHE_DIR, f"tuning_{content_hash(search.encode())}.jsonl")
+    done = _read_results(results_path)
+    folds = time_series_folds(data, cv)
+    os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+
+    survivors, previous, rung, trees = configs, None, 0, min(min_trees, max_trees)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(folds, scoring)) \
+        if n_jobs > 1 else None
+    if pool is None:
+        _init_worker(folds, scoring)
+    try:
+        with open(results_path, 'a') as out:
+            while True:
+                pending = [c for c in survivors if (_config_key(c), trees) not in done]
+
+                def record(config, scores):
+                    entry = {'config': _config_key(config), 'rung': rung, 'trees': trees, 'scores': scores,
+                             'score': float(np.nanmean(scores)) if not np.isnan(scores).all() else float('nan')}
+                    done[(entry['config'], trees)] = entry
+                    out.write(json.dumps(entry) + '\n')
+                    out.flush()
+
+                if pool is None:
+                    for config in pending:
+                        record(config, _evaluate(config, trees, previous))
+                else:
+                    futures = {pool.submit(_evaluate, config, trees, previous): config for config in pending}
+                    for future in as_completed(futures):
+                        record(futures[future], future.result())
+
+                scores = [done[(_config_key(c), trees)]['score'] for c in survivors]
+                order = sorted(range(len(survivors)), key=lambda i: -np.nan_to_num(scores[i], nan=-np.inf))
+                if len(survivors) == 1 or trees >= max_trees:
+                    best = survivors[order[0]]
+                    break
+                survivors = [survivors[i] for i in order[:max(1, math.ceil(len(survivors) / eta))]]
+                previous, rung, trees = trees, rung + 1, min(trees * eta, max_trees)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        else:
+            _worker_state.clear()
+
+    results = pd.DataFrame([{**json.loads(r['config']), 'trees': r['trees'], 'score': r['score'],
+                             'score_std': float(np.nanstd(r['scores']))}
+                            for r in done.values() if r['config'] in {_config_key(c) for c in configs}])
+    results = results.sort_values(['trees', 'score'], ascending=[False, False], ignore_index=True)
+    return {**best, 'n_estimators': trees}, results
+
+
+# Örnek kullanım: python tuning.py --source EURUSD_Daily --scoring precision
+if __name__ == "__main__":
+    from veri_onisleme import load_processed
+    from indicators import Indicators
+    from ml import signal_dataset, train_and_evaluate_ml
+    parser = argparse.ArgumentParser(description="İşlem filtresi RandomForest'ı için hiperparametre araması")
+    parser.add_argument('--source', default="EURUSD_Daily", help="Kaynak veri (.csv, _Processed.xlsx, .parquet ya da isim)")
+    parser.add_argument('--ema-window', type=int, default=20)
+    parser.add_argument('--risk-reward', type=float, default=2)
+    parser.add_argument('--cv', type=int, default=DEFAULT_CV)
+    parser.add_argument('--min-trees', type=int, default=25)
+    parser.add_argument('--max-trees', type=int, default=400)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--scoring', default='accuracy')
+    parser.add_argument('--jobs', type=int, default=None, help="İşçi süreç sayısı (varsayılan: tüm çekirdekler)")
+    parser.add_argument('--results', default=None, help="Sonuçların eklendiği JSONL dosyası")
+    args = parser.parse_args()
+
+    indicators = Indicators(load_processed(args.source))
+    df_with_ind = indicators.get_all_indicators()
+    df_with_ind[f'EMA_{args.ema_window}'] = indicators.calculate_ema(args.ema_window)
+    data = signal_dataset(df_with_ind, ema_window=args.ema_window, risk_reward=args.risk_reward)
+    best_params, results = tune_random_forest(data, cv=args.cv, min_trees=args.min_trees, max_trees=args.max_trees,
+                                              eta=args.eta, scoring=args.scoring, n_jobs=args.jobs,
+                                              results_path=args.results)
+    print(results.head(20).to_string(index=False))
+    print(f"En iyi parametreler: {best_params}")
+    for name, params in (('varsayılan', None), ('en iyi', best_params)):
+        _, _, acc, _ = train_and_evaluate_ml(*dataset_features(data), params=params)
+        print(f"train_and_evaluate_ml doğruluğu ({name} parametreler): {acc:.2%}")
@@ -1,18 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
 # Modülleri import et
 # from veri_onisleme import preprocess_data
-from structers import find_all_structures, find_trend_by_extremes, visualize_optimized_extremes
+from structers import visualize_optimized_extremes
 from visualize import plot_structures, plot_trend_by_extremes
 from indicators import plot_indicators, Indicators
-from ml import prepare_ml_data, train_and_evaluate_ml
+from ml import prepare_ml_data, train_and_evaluate_ml, plot_confusion_matrix, cached_signal_dataset, walk_forward, \
+    frame_hash, prune_cache
+from model_store import ModelStore
 from strategy import ema_crossover_strategy, simulate_ema_strategy_trades, add_risk_reward_column, sum_risk_reward, plot_ema_strategy_trades
 from candlestick import plot_candlestick
-from destek_direnc import find_support_resistance_levels, plot_candlestick_with_sr
+from destek_direnc import find_support_resistance_zones, plot_candlestick_with_sr
+from veri_onisleme import normalize_columns
+from resample import resample_ohlc, available_timeframes
+from multiscale import build_scale_index, structure_feature_matrix, DEFAULT_DISTANCES
+from cache import ResultCache, content_hash
+from render import FigureRenderer, RENDER_WORKERS
+from features import FeatureFactory
 
 def data_preparation(uploaded_file):
     # Dosya uzantısına göre oku
@@ -21,118 +29,325 @@ def data_preparation(uploaded_file):
     else:
         data = pd.read_excel(uploaded_file)
 
-    columns = data.columns.tolist()
-    if 'TIME' in [col.upper().replace('<','').replace('>','') for col in columns]:
-        # Alt zaman dilimi: DATE + TIME var
-        data.columns = ['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'TickVolume', 'Volume', 'Spread']
-        data = data[['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
-        data['Date'] = pd.to_datetime(data['Date'] + ' ' + data['Time'], errors='coerce')
-        data = data.drop(['Time'], axis=1)
-        data = data[['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
-    else:
+    # DATE/TIME açık formatla doğrudan zaman damgasına çevrilir (bkz. veri_onisleme)
+    data, intraday = normalize_columns(data)
+    if not intraday:
         # Sadece günlük: DATE var
-        data.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume', 'Volume', 'Spread']
-        data = data[['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
-        data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
         data['Date'] = data['Date'].dt.date
 
     return data
 
+
+# --- Önbelleklenen hesaplama adımları ---
+# Sonuçlar oturumun ResultCache'inde (veri özeti, zaman dilimi, parametreler) anahtarıyla saklanır;
+# widget değişikliklerinde yalnızca parametresi değişen adımlar yeniden hesaplanır.
+# Dönen nesneler önbellekle paylaşıldığından değiştirilmemelidir.
+
+def compute_structures(df, scales, distance):
+    # Tüm ölçekler build_scale_index ile bir kez hesaplanır; ölçek değiştirmek yalnızca tablo oluşturmaktır
+    trend_data = scales.structures(df['Close'], df['Date'], distance)
+    opt_peaks, opt_troughs = scales.optimized_extremes(distance)
+    return trend_data, opt_peaks, opt_troughs
+
+
+def compute_indicators(df, ema_window):
+    indicators = Indicators(df)
+    df_with_ind = indicators.get_all_indicators()
+    if f'EMA_{ema_window}' not in df_with_ind.columns:
+        df_with_ind[f'EMA_{ema_window}'] = indicators.calculate_ema(ema_window)
+    return indicators, df_with_ind
+
+
+def compute_strategy(df_with_ind, ema_window, risk_reward):
+    result = ema_crossover_strategy(df_with_ind, ema_window=ema_window, risk_reward=risk_reward)
+    simulated = simulate_ema_strategy_trades(result)
+    simulated = add_risk_reward_column(simulated, risk_reward=risk_reward)
+    total_r = sum_risk_reward(simulated['rr_result'], risk_reward=risk_reward)
+    # Sadece TP/SL olan işlemleri kontrol et
+    valid_trades = simulated[simulated['rr_result'].isin([f"+{risk_reward}R", "-1R"])]
+    return simulated, total_r, valid_trades
+
+
+# Diskte saklanan en fazla dashboard modeli sayısı
+UI_MAX_MODELS = 8
+
+
+def compute_ml(df_with_ind, ema_window, risk_reward, structure_features=None):
+    X, y, trades = prepare_ml_data(df_with_ind, ema_window=ema_window, risk_reward=risk_reward,
+                                   structure_features=structure_features)
+    X = X.replace([np.inf, -np.inf], np.nan).dropna()
+    y = y.loc[X.index]
+    # Sadece X ve y tamamen doluysa modeli eğit
+    if X.empty or y.empty or X.isnull().values.any() or y.isnull().values.any():
+        return None
+    # Model diskte saklanır; aynı özellik/hedef verisiyle sonraki çalıştırmalarda yeniden eğitilmez
+    store = ModelStore()
+    name = f"ui_{content_hash((frame_hash(X) + frame_hash(y)).encode())}"
+    if name in store:
+        meta = store.metadata(name)
+        model, cm, ml_acc = store.get(name), np.array(meta['confusion_matrix']), meta['accuracy']
+    else:
+        model, cm, ml_acc, cr = train_and_evaluate_ml(X, y)
+        dates = df_with_ind.loc[X.index, 'Date']
+        store.save(model, name, features=list(X.columns), ema_window=ema_window, risk_reward=risk_reward,
+                   data_hash=frame_hash(df_with_ind), train_from=dates.iloc[0], train_to=dates.iloc[-1],
+                   samples=len(X), accuracy=ml_acc, confusion_matrix=cm.tolist())
+        # Her parametre/veri değişikliği yeni model yazar; disk kullanımı en yeni UI_MAX_MODELS modelle sınırlıdır
+        store.prune('ui_', keep=UI_MAX_MODELS)
+    trades['ml_pred'] = model.predict(X)
+    return model, cm, ml_acc, trades
+
+
+# Walk-forward test katlaması başına sinyal sayısı
+WALK_FORWARD_TEST_SIZE = 50
+# .ml_cache'te tutulan en fazla özellik matrisi ve katlama sonucu sayısı
+UI_MAX_DATASETS = 8
+UI_MAX_FOLDS = 256
+
+
+def compute_walk_forward(df_with_ind, ema_window, risk_reward, scales):
+    # Özellik matrisi ve katlama sonuçları diskte de saklanır (bkz. ml.cached_signal_dataset, ml.walk_forward);
+    # özellikler FeatureFactory ile yalnızca sinyal barlarında üretilir
+    data = cached_signal_dataset(df_with_ind, ema_window=ema_window, risk_reward=risk_reward,
+                                 factory=FeatureFactory(ema_window=ema_window), scale_index=scales)
+    if len(data) < 2:
+        return None
+    # Sabit test boyu: yeni sinyaller eklendiğinde önceki katlamaların sınırları değişmez, yalnızca son
+    # (yeni) katlamalar eğitilir; çok az sinyalde veri ikiye bölünür
+    test_size = min(WALK_FORWARD_TEST_SIZE, len(data) // 2)
+    metrics, _ = walk_forward(data, test_size=test_size, n_jobs=1)
+    # Her parametre/veri değişikliği yeni dosyalar yazar; en son kullanılanlar dışındakiler silinir
+    # (bu çalıştırmanın katlamaları her zaman kalır)
+    prune_cache('features_', keep=UI_MAX_DATASETS)
+    prune_cache('fold_', keep=max(UI_MAX_FOLDS, len(metrics)))
+    return metrics
+
+
+def stage_specs(cache, df, data_key, ema_window, risk_reward, distance):
+    """
+    Önbelleklenen adımlar: ad -> (önbellek anahtarı, hesaplama).
+    Bağımlı adımlar (strateji, ML) indikatörleri yine önbellekten alır; böylece ön planda ya da
+    arka planda hangisi önce isterse o hesaplar, diğeri bekler.
+    """
+    def indicators_frame():
+        return cache.get_or_compute(*specs['indicators'])[1]
+
+    def scale_index():
+        return cache.get_or_compute(*specs['scales'])
+
+    specs = {
+        'scales': (('scales', *data_key, DEFAULT_DISTANCES), lambda: build_scale_index(df['Close'], DEFAULT_DISTANCES)),
+        'structures': (('structures', *data_key, distance),
+                       lambda: compute_structures(df, scale_index(), distance)),
+        'indicators': (('indicators', *data_key, ema_window), lambda: compute_indicators(df, ema_window)),
+        'strategy': (('strategy', *data_key, ema_window, risk_reward),
+                     lambda: compute_strategy(indicators_frame(), ema_window, risk_reward)),
+        'ml': (('ml', *data_key, ema_window, risk_reward, DEFAULT_DISTANCES),
+               lambda: compute_ml(indicators_frame(), ema_window, risk_reward,
+                                  structure_feature_matrix(scale_index(), df['Close']))),
+        'walk_forward': (('walk_forward', *data_key, ema_window, risk_reward, DEFAULT_DISTANCES),
+                         lambda: compute_walk_forward(indicators_frame(), ema_window, risk_reward, scale_index())),
+        'sr_levels': (('sr_levels', *data_key),
+                      lambda: find_support_resistance_zones(df, price_col='Close', order=10, tolerance=0.002)),
+    }
+    return specs
+
+
+def valid_levels(supports, resistances):
+    return not (len(supports) == 0 or len(resistances) == 0
+                or np.any(np.isnan(supports)) or np.any(np.isnan(resistances)))
+
+
+def figure_specs(cache, specs, df, ema_window):
+    """
+    Sekme grafikleri: sekme -> (grafik anahtarı, Figure döndüren argümansız fonksiyon).
+    Anahtar, grafiğin dayandığı adımın önbellek anahtarından (veri özeti + parametreler) türetilir;
+    çizilecek grafik yoksa fonksiyon None döndürür.
+    """
+    def result(stage):
+        return cache.get_or_compute(*specs[stage])
+
+    def strategy_figure():
+        simulated, _, valid_trades = result('strategy')
+        return None if valid_trades.empty else plot_ema_strategy_trades(simulated, ema_window=ema_window)
+
+    def ml_figure():
+        ml_result = result('ml')
+        return None if ml_result is None else plot_confusion_matrix(ml_result[1])
+
+    def sr_figure():
+        zones = result('sr_levels')
+        supports, resistances = zones.levels('support'), zones.levels('resistance')
+        return plot_candlestick_with_sr(df, supports, resistances) if valid_levels(supports, resistances) else None
+
+    def figure(name, stage, build):
+        return ('figure:' + name, *specs[stage][0]), build
+
+    return {
+        "Yapı Analizi": figure('extremes', 'structures',
+                               lambda: visualize_optimized_extremes(df['Date'], df['Close'], *result('structures')[1:])),
+        "İndikatörler": figure('indicators', 'indicators',
+                               lambda: plot_indicators(result('indicators')[1], result('indicators')[0])),
+        "Strateji": figure('strategy', 'strategy', strategy_figure),
+        "Makine Öğrenmesi": figure('confusion_matrix', 'ml', ml_figure),
+        "Görselleştirme": figure('candlestick_sr', 'sr_levels', sr_figure),
+        "Trend Analizi": figure('trend', 'structures',
+                                lambda: plot_trend_by_extremes(df['Date'], df['Close'], result('structures')[0])),
+    }
+
+
+# Sekme -> ihtiyaç duyduğu adımlar (sıra, kullanıcının olası gezinme sırasıdır)
+TABS = {
+    "Yapı Analizi": ['structures'],
+    "İndikatörler": ['indicators'],
+    "Strateji": ['strategy'],
+    "Makine Öğrenmesi": ['ml', 'walk_forward'],
+    "Görselleştirme": ['sr_levels'],
+    "Trend Analizi": ['structures'],
+}
+PRECOMPUTE_WORKERS = 2
+
+
+# İş parçacığı havuzları süreç genelinde tektir (st.cache_resource): oturumlar kendi havuzlarını
+# oluşturmaz, biten oturumlar arkalarında iş parçacığı bırakmaz
+@st.cache_resource
+def render_pool():
+    return ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix='render')
+
+
+@st.cache_resource
+def precompute_pool():
+    return ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS, thread_name_prefix='precompute')
+
+
 st.set_page_config(page_title="Finansal Analiz & ML Demo", layout="wide")
 st.title("📊 Finansal Zaman Serisi Analiz ve Makine Öğrenmesi")
 
 # --- Veri Yükleme ve Ön İşleme ---
 st.sidebar.header("Veri Yükle")
 uploaded_file = st.sidebar.file_uploader("Excel/CSV dosyası yükle", type=["xlsx", "csv"])
-if uploaded_file:
-    df = data_preparation(uploaded_file)
-else:
+if not uploaded_file:
     st.warning("Lütfen bir veri dosyası yükleyin.")
     st.stop()
 
+if 'result_cache' not in st.session_state:
+    st.session_state['result_cache'] = ResultCache()
+cache = st.session_state['result_cache']
+data_hash = content_hash(uploaded_file.getvalue())
+df = cache.get_or_compute(('data', data_hash), lambda: data_preparation(uploaded_file))
+
+# Alt zaman dilimi verisi daha büyük zaman dilimlerine toplanabilir
+timeframes = cache.get_or_compute(('timeframes', data_hash), lambda: available_timeframes(df['Date']))
+timeframe = timeframes[0]
+if len(timeframes) > 1:
+    timeframe = st.sidebar.selectbox("Zaman Dilimi", timeframes)
+    if timeframe != timeframes[0]:
+        def _resample(base=df):
+            bars = resample_ohlc(base, timeframe)
+            if timeframe == 'D1':
+                bars['Date'] = bars['Date'].dt.date
+            return bars
+        df = cache.get_or_compute(('data', data_hash, timeframe), _resample)
+data_key = (data_hash, timeframe)
+
 st.subheader("Veri Önizleme")
 st.dataframe(df.head())
 
 st.sidebar.header("Parametreler")
 risk_reward = st.sidebar.number_input("Risk/Ödül Oranı (R)", min_value=1, max_value=10, value=3, step=1)
+ema_window = st.sidebar.number_input("EMA Penceresi", min_value=2, max_value=200, value=20, step=1)
+distance = st.sidebar.select_slider("Tepe/Dip Mesafesi", options=DEFAULT_DISTANCES, value=10)
 
 # --- Sekmeler ---
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "Yapı Analizi", "İndikatörler", "Strateji", "Makine Öğrenmesi", "Görselleştirme", "Trend Analizi"
-])
+# Yalnızca seçili sekmenin içeriği hesaplanır; diğer sekmelerin adımları ve grafikleri arka planda sırayla
+# önceden hesaplanır ve sekmeye geçildiğinde önbellekten gelir.
+# Grafikler ana iş parçacığında değil, FigureRenderer havuzunda PNG'ye çevrilir ve bayt olarak önbelleklenir.
+tab_names = list(TABS)
+active_tab = st.radio("Sekme", tab_names, horizontal=True, label_visibility='collapsed', key='active_tab')
+specs = stage_specs(cache, df, data_key, ema_window, risk_reward, distance)
+figures = figure_specs(cache, specs, df, ema_window)
+
+# Renderer yalnızca oturum önbelleğini ve paylaşılan havuzu tutar; her çalıştırmada kurmak ucuzdur
+renderer = FigureRenderer(cache, executor=render_pool())
+# Seçili sekmenin grafiği önce kuyruğa alınır; tablolar gösterilirken arka planda çizilir
+active_figure = renderer.submit(*figures[active_tab])
+
+position = tab_names.index(active_tab)
+for name in tab_names[position + 1:] + tab_names[:position]:
+    for stage in TABS[name]:
+        if stage not in TABS[active_tab]:
+            cache.prefetch(precompute_pool(), *specs[stage])
+for name in tab_names[position + 1:] + tab_names[:position]:
+    renderer.prefetch(*figures[name])
 
-with tab1:
+
+def stage_result(stage):
+    return cache.get_or_compute(*specs[stage])
+
+
+def show_figure():
+    st.image(active_figure.result(), width='stretch')
+
+
+if active_tab == "Yapı Analizi":
     st.header("Yapı Analizi")
-    structures = find_all_structures(df['Close'], distance=10, dates=df['Date'])
-    trend_data = find_trend_by_extremes(structures)
+    trend_data, _, _ = stage_result('structures')
     st.dataframe(trend_data)
-    # optimized_local_extremes için parametreleri hazırla
-    from structers import optimized_local_extremes
-    opt_peaks, opt_troughs, opt_peak_vals, opt_trough_vals, opt_peak_dates, opt_trough_dates = optimized_local_extremes(df['Close'], 10, df['Date'])
-    fig = visualize_optimized_extremes(df['Date'], df['Close'], opt_peaks, opt_troughs)
-    st.pyplot(fig)
+    show_figure()
 
-with tab2:
+elif active_tab == "İndikatörler":
     st.header("İndikatörler")
-    indicators = Indicators(df)
-    df_with_ind = indicators.get_all_indicators()
+    _, df_with_ind = stage_result('indicators')
     st.dataframe(df_with_ind.tail())
-    fig = plot_indicators(df_with_ind, indicators)
-    st.pyplot(fig)
+    show_figure()
 
-with tab3:
+elif active_tab == "Strateji":
     st.header("Strateji")
-    result = ema_crossover_strategy(df_with_ind, ema_window=20, risk_reward=risk_reward)
-    simulated = simulate_ema_strategy_trades(result)
-    simulated = add_risk_reward_column(simulated, risk_reward=risk_reward)
-    total_r = sum_risk_reward(simulated['rr_result'], risk_reward=risk_reward)
-    # Sadece TP/SL olan işlemleri kontrol et
-    valid_trades = simulated[simulated['rr_result'].isin([f"+{risk_reward}R", "-1R"])]
+    _, total_r, valid_trades = stage_result('strategy')
     if valid_trades.empty:
         st.warning(f"Bu veri seti için bu risk/ödül oranı ({risk_reward}) desteklenmiyor. Lütfen daha küçük bir değer giriniz.")
     else:
         st.write(f"Toplam R: **{total_r}**")
         st.dataframe(valid_trades[['Date','Close','signal','stop_loss','take_profit','result','rr_result']])
-        fig = plot_ema_strategy_trades(simulated, ema_window=20)
-        st.pyplot(fig)
+        show_figure()
 
-with tab4:
+elif active_tab == "Makine Öğrenmesi":
     st.header("Makine Öğrenmesi")
-    X, y, trades = prepare_ml_data(df_with_ind, ema_window=20, risk_reward=risk_reward)
-    X = X.replace([np.inf, -np.inf], np.nan).dropna()
-    y = y.loc[X.index]
-    # Sadece X ve y tamamen doluysa modeli eğit
-    if X.empty or y.empty or X.isnull().values.any() or y.isnull().values.any():
+    ml_result = stage_result('ml')
+    if ml_result is None:
         st.warning(f"Bu veri seti için bu risk/ödül oranı ({risk_reward}) desteklenmiyor. Lütfen daha küçük bir değer giriniz.")
     else:
-        model, cm, ml_acc, cr = train_and_evaluate_ml(X, y)
-        trades['ml_pred'] = model.predict(X)
+        _, _, ml_acc, trades = ml_result
         col1, col2 = st.columns(2)
         with col1:
             st.write(f"ML Doğruluk: **{ml_acc:.2%}**")
-            fig_cm, ax = plt.subplots(figsize=(3, 3))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax, cbar=False)
-            ax.set_xlabel('Tahmin')
-            ax.set_ylabel('Gerçek')
-            ax.set_title('Confusion Matrix')
-            st.pyplot(fig_cm)
+            st.image(active_figure.result())
         with col2:
             st.dataframe(trades[['Date','Close','signal','result','ml_pred']].dropna())
+    wf_metrics = stage_result('walk_forward')
+    if wf_metrics is not None and not wf_metrics.empty:
+        st.subheader("Walk-Forward Değerlendirme")
+        st.write(f"Ortalama örneklem dışı doğruluk: **{wf_metrics['accuracy'].mean():.2%}**")
+        st.dataframe(wf_metrics)
 
-with tab5:
+elif active_tab == "Görselleştirme":
     st.header("Görselleştirme")
     st.subheader("Fiyat Mum Grafiği + Destek/Direnç")
-    supports, resistances = find_support_resistance_levels(df, price_col='Close', order=10, tolerance=0.002)
-    if len(supports) == 0 or len(resistances) == 0 or np.any(np.isnan(supports)) or np.any(np.isnan(resistances)):
+    zones = stage_result('sr_levels')
+    if not valid_levels(zones.levels('support'), zones.levels('resistance')):
         st.warning(f"Bu veri seti için bu risk/ödül oranı ({risk_reward}) desteklenmiyor. Lütfen daha küçük bir değer giriniz.")
     else:
-        fig = plot_candlestick_with_sr(df, supports, resistances)
-        st.pyplot(fig)
+        show_figure()
+        last_close = df['Close'].iloc[-1]
+        support, resistance = zones.nearest_support(last_close), zones.nearest_resistance(last_close)
+        col1, col2 = st.columns(2)
+        col1.metric("En Yakın Destek", f"{support['level']:.5f}" if support else "-",
+                    f"{support['touches']} dokunma" if support else None, delta_color='off')
+        col2.metric("En Yakın Direnç", f"{resistance['level']:.5f}" if resistance else "-",
+                    f"{resistance['touches']} dokunma" if resistance else None, delta_color='off')
+        st.dataframe(zones.zones())
 
-with tab6:
+elif active_tab == "Trend Analizi":
     st.header("Trend Analizi")
-    # Trend analizi için gerekli verileri hazırla
-    structures = find_all_structures(df['Close'], distance=10, dates=df['Date'])
-    trend_data = find_trend_by_extremes(structures)
-    fig = plot_trend_by_extremes(df['Date'], df['Close'], trend_data)
-    st.pyplot(fig)
+    # Grafik, yapı analizi sekmesiyle aynı önbellek girdisinden çizilir
+    show_figure()
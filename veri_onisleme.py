@@ -1,38 +1,311 @@
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
+# İşlenmiş veri deposu: her kaynak dosya için bir kez Parquet'e yazılır, kaynak değişmedikçe
+# tekrar kullanılır. Excel çıktısı yalnızca isteğe bağlı bir yan üründür.
+
+PROCESSED_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume']
+PROCESSED_DTYPES = {'Open': 'float64', 'High': 'float64', 'Low': 'float64', 'Close': 'float64', 'TickVolume': 'int64'}
+
+
+MT5_DATE_FORMAT = '%Y.%m.%d'
+FLOAT32_DTYPES = {'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32'}
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def _parse_clock(times):
+    """
+    MT5 TIME sütununu (HH:MM, HH:MM:SS veya HH:MM:SS.fff) sabit genişlikli karakter dizisi olarak
+    rakam rakam çözüp gün içi nanosaniyeye çevirir. Beklenmeyen biçimde pd.to_timedelta kullanılır.
+    """
+    text = np.asarray(times, dtype=str)
+    width = text.dtype.itemsize // 4
+    if len(text) == 0 or width not in (5, 8, 12):
+        return pd.to_timedelta(times).to_numpy('timedelta64[ns]').view('int64')
+    chars = text.astype(f'<U{width}').view(np.uint32).reshape(len(text), width)
+    separators = {2: ord(':'), 5: ord(':'), 8: ord('.')}
+    digit_pos = [i for i in range(width) if i not in separators]
+    digits = chars[:, digit_pos].astype(np.int64) - ord('0')
+    if ((digits < 0) | (digits > 9)).any() or any((chars[:, i] != c).any() for i, c in separators.items() if i < width):
+        return pd.to_timedelta(times).to_numpy('timedelta64[ns]').view('int64')
+    seconds = (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 2] * 10 + digits[:, 3]) * 60
+    if width >= 8:
+        seconds += digits[:, 4] * 10 + digits[:, 5]
+    nanos = seconds * 1_000_000_000
+    if width == 12:
+        nanos += (digits[:, 6] * 100 + digits[:, 7] * 10 + digits[:, 8]) * 1_000_000
+    return nanos
+
+
+def _parse_timestamps(dates, times=None):
+    """
+    MT5 DATE (YYYY.MM.DD) ve TIME (HH:MM:SS) sütunlarını açık formatla doğrudan int64 (ns) zaman damgasına çevirir.
+    Metin birleştirme yapılmaz; format tutmazsa eski genel ayrıştırmaya döner.
+    """
+    try:
+        stamps = pd.to_datetime(dates, format=MT5_DATE_FORMAT).to_numpy('datetime64[ns]').view('int64')
+        if times is not None:
+            stamps = stamps + _parse_clock(times)
+        return stamps
+    except (ValueError, TypeError):
+        text = dates if times is None else dates.astype(str) + ' ' + times.astype(str)
+        return pd.to_datetime(text, errors='coerce').to_numpy('datetime64[ns]').view('int64')
 
-def data_preparation(file_path):
-    # File pathi belirleme
-    file_path = f"{file_path}_Daily.csv"
 
-    # Veriyi tab ('\t') ile ayrılmış olarak okuma
-    data = pd.read_csv(file_path, delimiter='\t', header=0)
+def _is_intraday(columns):
+    return 'TIME' in [col.upper().replace('<','').replace('>','') for col in columns]
 
-    # Sütun isimlerini otomatik algıla
-    columns = data.columns.tolist()
 
+def normalize_columns(data, float32=False):
+    """
+    MT5 dışa aktarımının sütunlarını adlandırır ve Date sütununu datetime64 yapar.
+    :param float32: True ise OHLC sütunları float32'ye düşürülür
+    :return: (DataFrame, intraday) -> intraday: DATE + TIME sütunları var mı
+    """
     # Sütun isimlerini düzenle (günlük ve alt zaman dilimi için)
-    if 'TIME' in [col.upper().replace('<','').replace('>','') for col in columns]:
+    intraday = _is_intraday(data.columns.tolist())
+    if intraday:
         # Alt zaman dilimi: DATE + TIME var
         data.columns = ['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'TickVolume', 'Volume', 'Spread']
-        # Gereksiz sütunları kaldırma
-        data = data[['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
-        # Tarih ve saat sütununu birleştirip Date olarak adlandır
-        data['Date'] = pd.to_datetime(data['Date'] + ' ' + data['Time'], errors='coerce')
-        data = data.drop(['Time'], axis=1)
-        data = data[['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
+        stamps = _parse_timestamps(data['Date'], data['Time'])
     else:
         # Sadece günlük: DATE var
         data.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume', 'Volume', 'Spread']
-        data = data[['Date', 'Open', 'High', 'Low', 'Close', 'TickVolume']]
-        data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
-        data['Date'] = data['Date'].dt.date
+        stamps = _parse_timestamps(data['Date'])
+    # Gereksiz sütunları kaldırma
+    data = data[PROCESSED_COLUMNS].assign(Date=stamps.view('datetime64[ns]'))
+    dtypes = {**PROCESSED_DTYPES, **FLOAT32_DTYPES} if float32 else PROCESSED_DTYPES
+    return data.astype(dtypes), intraday
+
+
+def file_fingerprint(path, with_hash=False):
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        fingerprint['sha1'] = sha1.hexdigest()
+    return fingerprint
+
+
+def store_paths(source_path):
+    """
+    Kaynak dosyaya karşılık gelen Parquet ve meta dosyası yolları.
+    EURUSD_Daily.csv ve EURUSD_Daily_Processed.xlsx aynı depoyu (EURUSD_Daily_Processed.parquet) kullanır.
+    """
+    stem = os.path.splitext(source_path)[0]
+    if stem.endswith('_Processed'):
+        stem = stem[:-len('_Processed')]
+    return f"{stem}_Processed.parquet", f"{stem}_Processed.meta.json"
+
+
+def _is_fresh(source_path, store_path, meta_path, float32=None):
+    """
+    Depo, kaynak dosyanın boyut/mtime ya da içerik özeti değişmediyse geçerlidir.
+    mtime değişip içerik aynı kaldıysa meta dosyası güncellenir.
+    :param float32: None değilse deponun aynı hassasiyette yazılmış olması da gerekir
+    """
+    if not (os.path.exists(store_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if float32 is not None and bool(meta.get('float32')) != float32:
+        return False
+    source = meta.get('source', {})
+    current = file_fingerprint(source_path)
+    if source.get('size') == current['size'] and source.get('mtime_ns') == current['mtime_ns']:
+        return True
+    current = file_fingerprint(source_path, with_hash=True)
+    if source.get('sha1') != current['sha1']:
+        return False
+    meta['source'] = current
+    _write_json(meta_path, meta)
+    return True
+
+
+def _write_json(path, obj):
+    # Önce geçici dosyaya yazılır; yarıda kalan yazım mevcut dosyayı bozmaz
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _commit_store(tmp_path, store_path, meta_path, source_path, rows, intraday, float32):
+    """
+    Geçici dosyaya yazılmış Parquet'i depoya taşır ve meta dosyasını yazar.
+    Eski meta taşımadan önce silinir, yeni meta en son yazılır: işlem herhangi bir adımda kesilirse depo ya
+    eski haliyle tutarlı kalır ya da meta eksik olduğu için bir sonraki yüklemede yeniden oluşturulur.
+    """
+    meta = {
+        'source': file_fingerprint(source_path, with_hash=True),
+        'source_path': os.path.basename(source_path),
+        'rows': rows,
+        'intraday': intraday,
+        'float32': float32,
+    }
+    meta_tmp_path = meta_path + '.tmp'
+    with open(meta_tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    os.replace(tmp_path, store_path)
+    os.replace(meta_tmp_path, meta_path)
+
+
+def write_processed(data, source_path, intraday=None):
+    """
+    İşlenmiş veriyi Date indeksli, tipli sütunlarla Parquet deposuna yazar.
+    :param data: PROCESSED_COLUMNS sütunlarını içeren DataFrame
+    :param source_path: Verinin üretildiği kaynak dosya (tazelik kontrolü için)
+    :return: Parquet dosyasının yolu
+    """
+    store_path, meta_path = store_paths(source_path)
+    tmp_path = store_path + '.tmp'
+    data.set_index('Date').to_parquet(tmp_path)
+    _commit_store(tmp_path, store_path, meta_path, source_path, len(data), intraday, data['Close'].dtype == 'float32')
+    return store_path
+
+
+def ingest_csv(csv_path, chunksize=DEFAULT_CHUNKSIZE, float32=False):
+    """
+    MT5 CSV dışa aktarımını parça parça okuyup Parquet deposuna akıtır.
+    Bellek kullanımı dosya boyutundan bağımsız olarak chunksize satırla sınırlıdır.
+    :param csv_path: Tab ile ayrılmış MT5 dışa aktarımı (tick, M1, ..., D1)
+    :param chunksize: Bir seferde okunacak satır sayısı
+    :param float32: True ise OHLC sütunları float32 olarak saklanır
+    :return: Parquet dosyasının yolu
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    store_path, meta_path = store_paths(csv_path)
+    # Parçalar geçici dosyaya yazılır; depo yalnızca aktarım tamamlanınca değiştirilir
+    tmp_path = store_path + '.tmp'
+    writer = None
+    rows = 0
+    intraday = None
+    try:
+        try:
+            for chunk in pd.read_csv(csv_path, delimiter='\t', header=0, chunksize=chunksize):
+                chunk, intraday = normalize_columns(chunk, float32=float32)
+                table = pa.Table.from_pandas(chunk.set_index('Date'), preserve_index=True,
+                                             schema=writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Boş dosya: yalnızca şemayı yaz
+            empty, intraday = normalize_columns(pd.read_csv(csv_path, delimiter='\t', header=0), float32=float32)
+            empty.set_index('Date').to_parquet(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _commit_store(tmp_path, store_path, meta_path, csv_path, rows, intraday, float32)
+    return store_path
+
+
+def source_sha1(source):
+    """
+    Depodaki verinin üretildiği kaynağın içerik özeti; veri okunmaz.
+    Depo tarafından yazılmış kaynaklarda meta dosyasından alınır (kaynak değiştiyse, depo henüz
+    yenilenmediği için None döner); meta dosyası olmayan .parquet kaynaklarda dosyanın kendisi özetlenir.
+    :param source: resolve_source ile çözülmüş kaynak yolu
+    """
+    store_path, meta_path = store_paths(source)
+    if source.endswith('.parquet'):
+        if not os.path.exists(meta_path):
+            return file_fingerprint(source, with_hash=True)['sha1']
+    elif not _is_fresh(source, store_path, meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)['source'].get('sha1')
+
+
+def read_processed(store_path, date_index=False):
+    """
+    Parquet deposunu okur.
+    :param date_index: True ise datetime64 indeksli, False ise Date sütunlu DataFrame döner
+    """
+    data = pd.read_parquet(store_path)
+    return data if date_index else data.reset_index()
+
+
+def resolve_source(source):
+    """
+    'EURUSD_1yil_Daily' gibi bir ismi kaynak dosyaya çevirir: önce <isim>.csv, sonra <isim>_Processed.xlsx.
+    Uzantılı yollar olduğu gibi döner.
+    """
+    if source.endswith(('.csv', '.xlsx', '.parquet')):
+        return source
+    return f"{source}.csv" if os.path.exists(f"{source}.csv") else f"{source}_Processed.xlsx"
+
+
+def load_processed(source, date_index=False, chunksize=DEFAULT_CHUNKSIZE, float32=False):
+    """
+    İşlenmiş veriyi depodan yükler; depo yoksa veya kaynak değiştiyse bir kez yeniden oluşturur.
+    :param source: MT5 .csv dışa aktarımı, eski _Processed.xlsx dosyası ya da 'EURUSD_1yil_Daily' gibi bir isim
+                   (isimde önce <isim>.csv, sonra <isim>_Processed.xlsx aranır)
+    :param date_index: True ise datetime64 indeksli DataFrame döner
+    :param chunksize: CSV kaynaklar için parça başına satır sayısı (bkz. ingest_csv)
+    :param float32: True ise CSV kaynakların OHLC sütunları float32 saklanır
+    :return: Date, Open, High, Low, Close, TickVolume içeren DataFrame
+    """
+    if source.endswith('.parquet'):
+        return read_processed(source, date_index)
+    source = resolve_source(source)
+
+    is_csv = source.endswith('.csv')
+    store_path, meta_path = store_paths(source)
+    if _is_fresh(source, store_path, meta_path, float32 if is_csv else None):
+        return read_processed(store_path, date_index)
+
+    if is_csv:
+        ingest_csv(source, chunksize=chunksize, float32=float32)
+        return read_processed(store_path, date_index)
+    data = pd.read_excel(source)
+    data['Date'] = pd.to_datetime(data['Date'])
+    data = data[PROCESSED_COLUMNS].astype(PROCESSED_DTYPES)
+    write_processed(data, source)
+    return data.set_index('Date') if date_index else data
+
+
+def data_preparation(file_path, export_excel=False, chunksize=DEFAULT_CHUNKSIZE, float32=False):
+    """
+    CSV dışa aktarımını depoya aktarır; veri belleğe yalnızca Excel çıktısı istenirse okunur.
+    :return: Parquet deposunun yolu
+    """
+    # File pathi belirleme
+    file_path = f"{file_path}_Daily.csv"
 
-    # Düzenlenmiş veriyi tekrar Excel'e kaydetme
-    output_file_path = "{}_Processed.xlsx".format(file_path.split(".csv")[0].split("/")[-1])
-    data.to_excel(output_file_path, index=False)
+    # Depo güncelse CSV tekrar okunmaz; değilse parça parça depoya aktarılır
+    store_path, meta_path = store_paths(file_path)
+    if not _is_fresh(file_path, store_path, meta_path, float32):
+        ingest_csv(file_path, chunksize=chunksize, float32=float32)
+    print(f"Veri {store_path} deposunda hazır.")
 
-    print(f"Veri başarıyla {output_file_path} olarak kaydedildi.")
+    # İsteğe bağlı: düzenlenmiş veriyi Excel'e de kaydetme
+    if export_excel:
+        with open(meta_path) as f:
+            intraday = json.load(f).get('intraday')
+        excel_data = read_processed(store_path)
+        if not intraday:
+            excel_data['Date'] = excel_data['Date'].dt.date
+        output_file_path = "{}_Processed.xlsx".format(file_path.split(".csv")[0].split("/")[-1])
+        excel_data.to_excel(output_file_path, index=False)
+        print(f"Veri ayrıca {output_file_path} olarak kaydedildi.")
+    return store_path
 
 if __name__ == "__main__":
     data_preparation("EURUSD1saat")
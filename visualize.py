@@ -1,41 +1,137 @@
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import matplotlib.dates as mdates
+import matplotlib.colors as mcolors
+from matplotlib.artist import Artist
+from matplotlib.collections import PolyCollection
+from matplotlib.text import Text
+import numpy as np
+import pandas as pd
+from lod import plot_line
+from structers import structure_frame
+
+# Bu sayıdan fazla yapı varsa legend konumu sabitlenir (loc='best' tüm işaretleri tarar)
+BEST_LEGEND_MAX_STRUCTURES = 300
+
+
+class LabelCollection(Artist):
+    """
+    Çok sayıda kısa etiketi tek çizim nesnesiyle çizer (matplotlib'de TextCollection yoktur).
+    Etiket başına Text/Annotation nesnesi oluşturulmaz: her farklı etiketin boyutu bir kez ölçülür, metinler
+    doğrudan renderer'a yazılır ve yalnızca eksen sınırları içindeki (yakınlaştırmada görünen) noktalar
+    etiketlenir. tight_layout ve legend(loc='best') hesaplarına katılmaz.
+    """
+
+    def __init__(self, xy, labels, offset=(0, 0), ha='left', va='baseline', **text_kwargs):
+        """
+        :param xy: (n, 2) veri koordinatları (tarihler sayıya çevrilmiş)
+        :param offset: Etiketin noktaya göre kayması (punto; annotate'in textcoords='offset points' karşılığı)
+        :param ha: 'left', 'center' veya 'right'
+        :param va: 'baseline', 'bottom', 'center' veya 'top'
+        :param text_kwargs: Text özellikleri (fontsize, color, ...)
+        """
+        super().__init__()
+        self._xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        self._labels = np.asarray([str(label) for label in labels], dtype=object)
+        self._offset = offset
+        self._align = ha, va
+        self._text = Text(**text_kwargs)
+        # Metinler gibi işaretlerin üstünde çizilir
+        self.set_zorder(self._text.get_zorder())
+        self.set_in_layout(False)
+
+    def _anchor(self, renderer, label):
+        # Etiketin sol alt taban çizgisinin (draw_text'in beklediği nokta) hizalama noktasına göre kayması
+        width, height, descent = renderer.get_text_width_height_descent(
+            label, self._text.get_fontproperties(), ismath=False)
+        ha, va = self._align
+        dx = {'left': 0, 'center': -width / 2, 'right': -width}[ha]
+        dy = {'baseline': 0, 'bottom': descent, 'center': descent - height / 2, 'top': descent - height}[va]
+        return dx, dy
+
+    def draw(self, renderer):
+        if not self.get_visible() or len(self._xy) == 0:
+            return
+        points = self.get_transform().transform(self._xy)
+        box = self.axes.bbox
+        shown = (np.isfinite(points).all(axis=1) & (points[:, 0] >= box.x0) & (points[:, 0] <= box.x1)
+                 & (points[:, 1] >= box.y0) & (points[:, 1] <= box.y1))
+        ox, oy = (renderer.points_to_pixels(v) for v in self._offset)
+        height = renderer.get_canvas_width_height()[1]
+        prop = self._text.get_fontproperties()
+        gc = renderer.new_gc()
+        gc.set_foreground(mcolors.to_rgba(self._text.get_color()), isRGBA=True)
+        gc.set_alpha(self._text.get_alpha())
+        gc.set_antialiased(self._text.get_antialiased())
+        anchors = {}
+        for (x, y), label in zip(points[shown], self._labels[shown]):
+            if label not in anchors:
+                anchors[label] = self._anchor(renderer, label)
+            dx, dy = anchors[label]
+            y = y + oy + dy
+            renderer.draw_text(gc, x + ox + dx, height - y if renderer.flipy() else y, label, prop, 0)
+        gc.restore()
+        self.stale = False
+
+
+def label_points(ax, x, y, labels, offset=(0, 0), **text_kwargs):
+    """
+    Nokta başına ax.annotate(label, (x, y), textcoords='offset points', xytext=offset) çağrısının toplu karşılığı.
+    :param x: Eksen biriminde x değerleri (ör. tarihler; eksen birimi önceden, ör. scatter ile, belirlenmiş olmalı)
+    :return: LabelCollection
+    """
+    xy = np.column_stack([np.asarray(ax.xaxis.convert_units(list(x)), dtype=np.float64),
+                          np.asarray(ax.yaxis.convert_units(list(y)), dtype=np.float64)])
+    return ax.add_artist(LabelCollection(xy, labels, offset, **text_kwargs))
+
+
+def _structure_points(trend_data, side):
+    # Yapı tablosundan bir tarafın (low/high) tarih, değer ve yapı etiketlerini ayrıştırır
+    dates = trend_data[f'{side}_date'].tolist()
+    values = trend_data[f'{side}_value'].to_numpy(dtype=float)
+    labels = trend_data[f'{side}_structure'].to_numpy(dtype=object)
+    return dates, values, labels
+
+
+def _take(items, mask):
+    return [item for item, keep in zip(items, mask) if keep]
+
+
+def _legend(ax, n_structures):
+    # loc='best' tüm işaretleri tarar; çok sayıda yapıda sabit konum kullanılır
+    ax.legend(loc='best' if n_structures <= BEST_LEGEND_MAX_STRUCTURES else 'upper left')
 
 def visualize_all_structures(trend_data):
     
-    # Verileri ayrıştır
-    highs_x = [data["high"]["dates"] for data in trend_data]
-    highs_y = [data["high"]["current_value"] for data in trend_data]
-    lows_x = [data["low"]["dates"] for data in trend_data]
-    lows_y = [data["low"]["current_value"] for data in trend_data]
-
-    # Yapıları etiketle
-    high_labels = [data["high"]["structure"] for data in trend_data]
-    low_labels = [data["low"]["structure"] for data in trend_data]
+    # Verileri ayrıştır ve yapıları etiketle
+    trend_data = structure_frame(trend_data)
+    highs_x, highs_y, high_labels = _structure_points(trend_data, "high")
+    lows_x, lows_y, low_labels = _structure_points(trend_data, "low")
 
     # Grafik oluştur
-    plt.figure(figsize=(14, 7))
+    fig = Figure(figsize=(14, 7))
+    ax = fig.subplots()
 
     # Tepe noktalarını çiz
-    plt.scatter(highs_x, highs_y, color='red', label='Tepe Noktası', s=15, alpha=0.7)
+    ax.scatter(highs_x, highs_y, color='red', label='Tepe Noktası', s=15, alpha=0.7)
     for i, label in enumerate(high_labels):
-        plt.text(highs_x[i], highs_y[i], label, fontsize=6, color='red', ha='left', va='bottom')
+        ax.text(highs_x[i], highs_y[i], label, fontsize=6, color='red', ha='left', va='bottom')
 
     # Dip noktalarını çiz
-    plt.scatter(lows_x, lows_y, color='green', label='Dip Noktası', s=15, alpha=0.7)
+    ax.scatter(lows_x, lows_y, color='green', label='Dip Noktası', s=15, alpha=0.7)
     for i, label in enumerate(low_labels):
-        plt.text(lows_x[i], lows_y[i], label, fontsize=6, color='green', ha='right', va='top')
+        ax.text(lows_x[i], lows_y[i], label, fontsize=6, color='green', ha='right', va='top')
 
     # Grafik detayları
-    plt.title("Trend Yapılarının Görselleştirilmesi", fontsize=16)
-    plt.xlabel("Tarih", fontsize=12)
-    plt.ylabel("Fiyat", fontsize=12)
-    plt.legend(fontsize=10)
-    plt.grid(alpha=0.5)
-    plt.tight_layout()
+    ax.set_title("Trend Yapılarının Görselleştirilmesi", fontsize=16)
+    ax.set_xlabel("Tarih", fontsize=12)
+    ax.set_ylabel("Fiyat", fontsize=12)
+    ax.legend(fontsize=10)
+    ax.grid(alpha=0.5)
+    fig.tight_layout()
 
     # Grafiği göster
     # plt.show()
-    return plt.gcf()
+    return fig
 
 
 # Örnek çağrı
@@ -49,54 +145,50 @@ def visualize_all_structures_v2(dates, close_prices, trend_data):
 
     :param dates: Fiyatların tarih bilgilerinin pandas Series formatında listesi.
     :param close_prices: Fiyatların pandas Series formatında listesi.
-    :param trend_data: find_all_structures fonksiyonundan dönen yapılandırılmış trend verileri.
+    :param trend_data: find_all_structures fonksiyonundan dönen yapı tablosu.
     """
-    plt.figure(figsize=(16, 8))
-    plt.plot(dates, close_prices, label="Close Prices", color="blue", alpha=0.7)
-
-    # Tepe ve dip noktalarını işaretle
-    for data in trend_data:
-        # Dip noktaları (yeşil)
-        plt.scatter(data["low"]["dates"], data["low"]["current_value"], color="green", s=50,
-                    label="Troughs" if "Troughs" not in plt.gca().get_legend_handles_labels()[1] else "")
-        plt.annotate(f"{data['low']['structure']}",
-                     (data["low"]["dates"], data["low"]["current_value"]),
-                     textcoords="offset points", xytext=(-10, 10), ha='center', fontsize=8, color="green")
-
-        # Tepe noktaları (kırmızı)
-        plt.scatter(data["high"]["dates"], data["high"]["current_value"], color="red", s=50,
-                    label="Peaks" if "Peaks" not in plt.gca().get_legend_handles_labels()[1] else "")
-        plt.annotate(f"{data['high']['structure']}",
-                     (data["high"]["dates"], data["high"]["current_value"]),
-                     textcoords="offset points", xytext=(10, -10), ha='center', fontsize=8, color="red")
+    trend_data = structure_frame(trend_data)
+    fig = Figure(figsize=(16, 8))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, label="Close Prices", color="blue", alpha=0.7)
+
+    # Tepe ve dip noktaları ve tüm yapı etiketleri tek seferde çizilir
+    low_dates, low_values, low_labels = _structure_points(trend_data, "low")
+    high_dates, high_values, high_labels = _structure_points(trend_data, "high")
+    if len(trend_data):
+        ax.scatter(low_dates, low_values, color="green", s=50, label="Troughs")
+        ax.scatter(high_dates, high_values, color="red", s=50, label="Peaks")
+        label_points(ax, low_dates, low_values, low_labels, offset=(-10, 10), ha='center', fontsize=8, color="green")
+        label_points(ax, high_dates, high_values, high_labels, offset=(10, -10), ha='center', fontsize=8, color="red")
 
     # Grafik düzenlemeleri
-    plt.title("Trend Analysis Visualization", fontsize=16)
-    plt.xlabel("Date", fontsize=12)
-    plt.ylabel("Price", fontsize=12)
-    plt.xticks(rotation=45)  # Tarihlerin daha net görünmesi için eğimli gösterim
-    plt.legend()
-    plt.grid(alpha=0.3)
-    plt.tight_layout()  # Eksik kenar boşluklarını düzenler
+    ax.set_title("Trend Analysis Visualization", fontsize=16)
+    ax.set_xlabel("Date", fontsize=12)
+    ax.set_ylabel("Price", fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)  # Tarihlerin daha net görünmesi için eğimli gösterim
+    _legend(ax, len(trend_data))
+    ax.grid(alpha=0.3)
+    fig.tight_layout()  # Eksik kenar boşluklarını düzenler
     # plt.show()
-    return plt.gcf()
+    return fig
 
 def visualize_extremes(dates, close_prices, peaks, troughs):
     """
     find_local_extremes fonksiyonundan dönen tepe ve dip indekslerini fiyat grafiği üzerinde gösterir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(dates, close_prices, label='Close Price', color='gray', alpha=0.7)
-    plt.scatter([dates.iloc[i] for i in peaks], [close_prices.iloc[i] for i in peaks], color='red', marker='^', s=100, label='Peaks')
-    plt.scatter([dates.iloc[i] for i in troughs], [close_prices.iloc[i] for i in troughs], color='blue', marker='v', s=100, label='Troughs')
-    plt.title('find_local_extremes: Peaks and Troughs')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, label='Close Price', color='gray', alpha=0.7)
+    ax.scatter([dates.iloc[i] for i in peaks], [close_prices.iloc[i] for i in peaks], color='red', marker='^', s=100, label='Peaks')
+    ax.scatter([dates.iloc[i] for i in troughs], [close_prices.iloc[i] for i in troughs], color='blue', marker='v', s=100, label='Troughs')
+    ax.set_title('find_local_extremes: Peaks and Troughs')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
     # plt.show()
-    return plt.gcf()
+    return fig
 
 
 def plot_trend_market(trend_market, close_prices, dates):
@@ -108,10 +200,11 @@ def plot_trend_market(trend_market, close_prices, dates):
     """
     import matplotlib.dates as mdates
     
-    plt.figure(figsize=(15, 7))
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
     
     # Kapanış fiyatlarını çiz
-    plt.plot(dates, close_prices, label='Close Price', color='gray', alpha=0.5)
+    plot_line(ax, dates, close_prices, label='Close Price', color='gray', alpha=0.5)
     
     # Her bir trend yapısı için MSB ve BOS noktalarını işaretle
     for structure in trend_market:
@@ -125,31 +218,31 @@ def plot_trend_market(trend_market, close_prices, dates):
         color = 'green' if trend == 'Bullish' else 'red'
         
         # MSB ve BOS noktalarını işaretle
-        plt.scatter(msb_date, msb_price, color=color, s=100, marker='^' if trend == 'Bullish' else 'v', label=f'{trend} MSB')
-        plt.scatter(bos_date, bos_price, color=color, s=100, marker='o', label=f'{trend} BOS')
+        ax.scatter(msb_date, msb_price, color=color, s=100, marker='^' if trend == 'Bullish' else 'v', label=f'{trend} MSB')
+        ax.scatter(bos_date, bos_price, color=color, s=100, marker='o', label=f'{trend} BOS')
         
         # MSB ve BOS arasında çizgi çiz
-        plt.plot([msb_date, bos_date], [msb_price, bos_price], color=color, linestyle='--', alpha=0.5)
+        ax.plot([msb_date, bos_date], [msb_price, bos_price], color=color, linestyle='--', alpha=0.5)
     
     # Grafik ayarları
-    plt.title('Trend Market Structure')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.grid(True, alpha=0.3)
+    ax.set_title('Trend Market Structure')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.grid(True, alpha=0.3)
     
     # Tarih formatını ayarla
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-    plt.gca().xaxis.set_major_locator(mdates.MonthLocator())
-    plt.gcf().autofmt_xdate()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.xaxis.set_major_locator(mdates.MonthLocator())
+    fig.autofmt_xdate()
     
     # Tekrarlanan etiketleri kaldır
-    handles, labels = plt.gca().get_legend_handles_labels()
+    handles, labels = ax.get_legend_handles_labels()
     by_label = dict(zip(labels, handles))
-    plt.legend(by_label.values(), by_label.keys())
+    ax.legend(by_label.values(), by_label.keys())
     
-    plt.tight_layout()
+    fig.tight_layout()
     # plt.show()
-    return plt.gcf()
+    return fig
 
 def plot_structures(dates, close_prices, structures):
     """
@@ -157,90 +250,92 @@ def plot_structures(dates, close_prices, structures):
     HL ve HH noktalarını yeşil, LL ve LH noktalarını kırmızı gösterir.
     High noktaları yukarı üçgen (^), low noktaları aşağı üçgen (v) ile gösterilir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(dates, close_prices, color='gray', alpha=0.5, label='Close Price')
-
-    for structure in structures:
-        # Low noktası
-        low_date = structure['low']['dates']
-        low_value = structure['low']['current_value']
-        low_structure = structure['low']['structure']
-        # High noktası
-        high_date = structure['high']['dates']
-        high_value = structure['high']['current_value']
-        high_structure = structure['high']['structure']
-
-        # Low için renk ve marker
-        if low_structure == "HL":
-            color_low = 'green'
-        elif low_structure == "LL":
-            color_low = 'red'
-        else:
-            color_low = 'gray'
-        plt.scatter(low_date, low_value, color=color_low, s=100, marker='v', label=f'Low: {low_structure}')
-
-        # High için renk ve marker
-        if high_structure == "HH":
-            color_high = 'green'
-        elif high_structure == "LH":
-            color_high = 'red'
+    structures = structure_frame(structures)
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, color='gray', alpha=0.5, label='Close Price')
+
+    low_colors = {"HL": 'green', "LL": 'red'}
+    high_colors = {"HH": 'green', "LH": 'red'}
+    low_dates, low_values, low_labels = _structure_points(structures, "low")
+    high_dates, high_values, high_labels = _structure_points(structures, "high")
+    # Her yapı türü için tek scatter; legend sırası yapıların ilk görülme sırasıdır
+    groups = []
+    for low_structure, high_structure in zip(low_labels, high_labels):
+        for group in (('low', low_structure), ('high', high_structure)):
+            if group not in groups:
+                groups.append(group)
+    for side, structure in groups:
+        if side == 'low':
+            mask = low_labels == structure
+            ax.scatter(_take(low_dates, mask), low_values[mask], color=low_colors.get(structure, 'gray'),
+                        s=100, marker='v', label=f'Low: {structure}')
         else:
-            color_high = 'gray'
-        plt.scatter(high_date, high_value, color=color_high, s=100, marker='^', label=f'High: {high_structure}')
-
-    plt.title('Market Structure Analysis')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    # Legend tekrarını önle
-    handles, labels = plt.gca().get_legend_handles_labels()
-    by_label = dict(zip(labels, handles))
-    plt.legend(by_label.values(), by_label.keys())
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+            mask = high_labels == structure
+            ax.scatter(_take(high_dates, mask), high_values[mask], color=high_colors.get(structure, 'gray'),
+                        s=100, marker='^', label=f'High: {structure}')
+
+    ax.set_title('Market Structure Analysis')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    _legend(ax, len(structures))
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
     # plt.show()
-    return plt.gcf()
+    return fig
 
 
 def plot_trend_by_extremes(dates, close_prices, trend_data):
     """
-    find_trend_by_extremes fonksiyonundan dönen trend_data listesini fiyat grafiği üzerinde
+    find_trend_by_extremes fonksiyonundan dönen yapı tablosunu fiyat grafiği üzerinde
     trend tipine göre (Bullish, Bearish, Acumulation) renklendirerek gösterir.
     """
-    plt.figure(figsize=(15, 7))
-    plt.plot(dates, close_prices, color='gray', alpha=0.5, label='Close Price')
+    trend_data = structure_frame(trend_data)
+    fig = Figure(figsize=(15, 7))
+    ax = fig.subplots()
+    plot_line(ax, dates, close_prices, color='gray', alpha=0.5, label='Close Price')
 
     color_map = {
         "Bullish": 'green',
         "Bearish": 'red',
         "Acumulation": 'blue'
     }
+    # İlk elemana trend atanamaz
+    rest = trend_data.iloc[1:]
+    if 'trend_by_extremes' in rest:
+        trends = rest['trend_by_extremes'].to_numpy(dtype=object)
+    else:
+        trends = np.full(len(rest), "Acumulation", dtype=object)
+    low_dates, low_values, _ = _structure_points(rest, "low")
+    high_dates, high_values, _ = _structure_points(rest, "high")
+    # Legend'da yalnızca ilk yapının trendi yer alır
+    for trend, color in color_map.items():
+        mask = trends == trend
+        if not mask.any():
+            continue
+        labelled = trend == trends[0]
+        ax.scatter(_take(low_dates, mask), low_values[mask], color=color, marker='v', s=100,
+                   label=f"{trend} Low" if labelled else "")
+        ax.scatter(_take(high_dates, mask), high_values[mask], color=color, marker='^', s=100,
+                   label=f"{trend} High" if labelled else "")
 
-    for i, struct in enumerate(trend_data):
-        if i == 0:
-            continue  # İlk elemana trend atanamaz
-        trend = struct.get("trend_by_extremes", "Acumulation")
-        low_date = struct["low"]["dates"]
-        high_date = struct["high"]["dates"]
-        low_value = struct["low"]["current_value"]
-        high_value = struct["high"]["current_value"]
-
-        # Trend rengine göre noktaları çiz
-        plt.scatter(low_date, low_value, color=color_map[trend], marker='v', s=100, label=f"{trend} Low" if i == 1 else "")
-        plt.scatter(high_date, high_value, color=color_map[trend], marker='^', s=100, label=f"{trend} High" if i == 1 else "")
-
-        # İki yapı arası arka planı renklendir (isteğe bağlı)
-        if i > 0:
-            prev_date = trend_data[i-1]["high"]["dates"]
-            plt.axvspan(prev_date, high_date, color=color_map[trend], alpha=0.08)
-
-    # Legend tekrarını önle
-    handles, labels = plt.gca().get_legend_handles_labels()
-    by_label = dict(zip(labels, handles))
-    plt.legend(by_label.values(), by_label.keys())
-    plt.title('Trend by Extremes')
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    # İki yapı arası arka plan tek bir PolyCollection ile renklendirilir (x: tarih, y: eksen oranı)
+    if len(rest):
+        span_end = mdates.date2num(pd.to_datetime(pd.Series(high_dates)).to_numpy())
+        span_start = mdates.date2num(pd.to_datetime(trend_data['high_date'].iloc[:-1]).to_numpy())
+        spans = np.stack([np.column_stack([span_start, np.zeros(len(rest))]),
+                          np.column_stack([span_start, np.ones(len(rest))]),
+                          np.column_stack([span_end, np.ones(len(rest))]),
+                          np.column_stack([span_end, np.zeros(len(rest))])], axis=1)
+        colors = [color_map[t] for t in trends]
+        ax.add_collection(PolyCollection(spans, facecolors=colors, edgecolors=colors, alpha=0.08,
+                                         transform=ax.get_xaxis_transform()), autolim=False)
+
+    _legend(ax, len(trend_data))
+    ax.set_title('Trend by Extremes')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
     # plt.show()
-    return plt.gcf()
\ No newline at end of file
+    return fig
\ No newline at end of file